@@ -9,8 +9,30 @@ import shutil
 import sqlite3
 
 # Import database components
-from models import db, User, Category, Inventory, Order, OrderItem, AuditLog, Vendor, PurchaseOrder, PurchaseOrderItem, InventoryVendor
-from database import init_database, get_system_stats
+from models import db, User, Category, Inventory, Order, OrderItem, AuditLog, Vendor, PurchaseOrder, PurchaseOrderItem, InventoryVendor, DemandForecast, StockMovement
+from database import init_database, get_system_stats, get_stock_by_unit, get_api_performance_stats
+from settings import get_settings, save_settings
+from reorder import run_auto_reorder, scheduled_auto_reorder
+from forecasting import compute_demand_forecasts, scheduled_demand_forecast
+from ledger import (record_movement, ensure_opening_balances, quantity_at, take_snapshots, verify_ledger,
+                    scheduled_snapshot, scheduled_verify)
+from valuation import (record_price, ensure_price_history, get_valuation_series, get_valuation_at,
+                       build_period_snapshots, scheduled_valuation_snapshots)
+from scheduler import JobScheduler
+from versioning import init_versioning, cached_resource, response_cache
+from invalidation import bus
+from fragments import fragment_cache
+from metrics import request_metrics
+from sql_profiler import sql_profiler
+from sampling_profiler import sampling_profiler
+from traffic_capture import traffic_capture
+from maintenance import database_maintenance, scheduled_maintenance, TASKS as MAINTENANCE_TASKS
+from audit_store import audit_store, database_binds, scheduled_audit_rotation
+from cold_storage import cold_storage, including_archived, scheduled_archival
+from read_models import fetch
+from caches import categories as categories_cache, vendors as vendors_cache
+from serializers import (FastJSONProvider, inventory_serializer, order_serializer, purchase_order_serializer,
+                         audit_log_serializer, compile_from_request, page_response, list_response)
 from decimal import Decimal
 import json
 
@@ -18,6 +40,8 @@ import json
 load_dotenv()
 
 app = Flask(__name__)
+if os.getenv('JSON_ENCODER', 'fast').lower() == 'fast':
+    app.json = FastJSONProvider(app)
 
 # Configuration
 app.config['SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-secret-key')
@@ -26,7 +50,10 @@ app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 
 # SQLite Database Configuration
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "inventory.db")}'
+database_path = os.getenv('INVENTORY_DB', os.path.join(basedir, 'inventory.db'))
+app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database_path}'
+# Audit logs are kept in their own file next to the main database (audit_store.py)
+app.config['SQLALCHEMY_BINDS'] = database_binds(database_path)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Initialize extensions
@@ -37,10 +64,38 @@ CORS(app,
      supports_credentials=True)
 jwt = JWTManager(app)
 db.init_app(app)
+request_metrics.init_app(app)
+sql_profiler.init_app(app)
+sampling_profiler.init_app(app)
+traffic_capture.init_app(app)
+database_maintenance.init_app(app)
+audit_store.init_app(app)
+# Closed orders and received purchase orders move to an attached archive file (cold_storage.py)
+cold_storage.init_app(app)
 
 # Initialize database with sample data
 with app.app_context():
     init_database(app)
+    audit_store.reserve_legacy_ids()
+    ensure_opening_balances()
+    ensure_price_history()
+bus.init_app(app)
+init_versioning(app)
+bus.start()
+
+# Background jobs
+# Only the process holding the lock file runs the jobs (scheduler.py)
+scheduler = JobScheduler(app, lock_path=os.getenv('SCHEDULER_LOCK', f'{database_path}.scheduler.lock'))
+scheduler.add_job('auto_reorder', scheduled_auto_reorder, int(os.getenv('AUTO_REORDER_INTERVAL', 3600)))
+scheduler.add_job('demand_forecast', scheduled_demand_forecast, int(os.getenv('FORECAST_INTERVAL', 86400)))
+scheduler.add_job('stock_snapshot', scheduled_snapshot, int(os.getenv('STOCK_SNAPSHOT_INTERVAL', 86400)))
+scheduler.add_job('ledger_verify', scheduled_verify, int(os.getenv('LEDGER_VERIFY_INTERVAL', 86400)))
+scheduler.add_job('valuation_snapshots', scheduled_valuation_snapshots, int(os.getenv('VALUATION_SNAPSHOT_INTERVAL', 86400)))
+scheduler.add_job('db_maintenance', scheduled_maintenance, int(os.getenv('MAINTENANCE_INTERVAL', 900)))
+scheduler.add_job('audit_rotation', scheduled_audit_rotation, int(os.getenv('AUDIT_ROTATE_INTERVAL', 86400)))
+scheduler.add_job('order_archival', scheduled_archival, int(os.getenv('ARCHIVE_INTERVAL', 86400)))
+if os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true':
+    scheduler.start()
 
 def log_action(action, table_name=None, record_id=None, old_values=None, new_values=None, user_id=None):
     """Log user actions for audit trail"""
@@ -58,17 +113,16 @@ def log_action(action, table_name=None, record_id=None, old_values=None, new_val
             
         ip_address = request.remote_addr if request else '127.0.0.1'
         
-        audit_log = AuditLog(
-            user_id=current_user_id,
-            action=action,
+        # Written on the audit database in its own transaction, apart from the request's session
+        audit_store.write(
+            action,
             table_name=table_name,
             record_id=record_id,
             old_values=json.dumps(old_values) if old_values else None,
             new_values=json.dumps(new_values) if new_values else None,
+            user_id=current_user_id,
             ip_address=ip_address
         )
-        db.session.add(audit_log)
-        db.session.commit()
     except Exception as e:
         print(f"Error logging action: {e}")
 
@@ -127,6 +181,7 @@ def get_current_user():
 # Category Routes
 @app.route('/api/categories', methods=['GET'])
 @jwt_required()
+@cached_resource('categories', ('categories', 'inventory'))
 def get_categories():
     try:
         categories = Category.query.all()
@@ -206,6 +261,7 @@ def delete_category(category_id):
 # Inventory Routes
 @app.route('/api/inventory', methods=['GET'])
 @jwt_required()
+@cached_resource('inventory', ('inventory', 'categories', 'inventory_vendors', 'vendors'))
 def get_inventory():
     try:
         # Get query parameters
@@ -215,55 +271,27 @@ def get_inventory():
         category_id = request.args.get('category_id', type=int)
         status = request.args.get('status', '')
         
-        # Build query
-        query = Inventory.query.filter_by(is_active=True)
+        # Build query - only the requested columns, encoded straight to JSON
+        serializer, columnar = compile_from_request(inventory_serializer)
+        query = serializer.select().where(Inventory.is_active == True)
         
         if search:
             # Use like instead of contains for better SQLite compatibility
-            query = query.filter(Inventory.name.like(f'%{search}%'))
+            query = query.where(Inventory.name.like(f'%{search}%'))
         
         if category_id:
-            query = query.filter_by(category_id=category_id)
+            query = query.where(Inventory.category_id == category_id)
         
         if status == 'low_stock':
-            query = query.filter(Inventory.quantity <= Inventory.min_stock_level)
+            query = query.where(Inventory.quantity <= Inventory.min_stock_level)
         elif status == 'out_of_stock':
-            query = query.filter_by(quantity=0)
+            query = query.where(Inventory.quantity == 0)
         
-        # Execute query with pagination - using different approach for SQLite
-        try:
-            inventory = query.order_by(Inventory.name).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
-            
-            return jsonify({
-                'inventory': [item.to_dict() for item in inventory.items],
-                'pagination': {
-                    'page': page,
-                    'pages': inventory.pages,
-                    'per_page': per_page,
-                    'total': inventory.total,
-                    'has_next': inventory.has_next,
-                    'has_prev': inventory.has_prev
-                }
-            })
-        except Exception as paginate_error:
-            # Fallback: manual pagination for older SQLAlchemy versions
-            total = query.count()
-            items = query.order_by(Inventory.name).offset((page - 1) * per_page).limit(per_page).all()
-            
-            return jsonify({
-                'inventory': [item.to_dict() for item in items],
-                'pagination': {
-                    'page': page,
-                    'pages': (total + per_page - 1) // per_page,
-                    'per_page': per_page,
-                    'total': total,
-                    'has_next': page * per_page < total,
-                    'has_prev': page > 1
-                }
-            })
+        records, pagination = serializer.fetch_page(query.order_by(Inventory.name), page, per_page)
+        return page_response('inventory', serializer, records, columnar, pagination=pagination)
             
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Inventory GET error: {str(e)}")  # Debug logging
         return jsonify({'error': str(e)}), 500
@@ -305,7 +333,7 @@ def create_inventory():
         if category_id:
             try:
                 category_id = int(category_id)
-                category = Category.query.get(category_id)
+                category = categories_cache.get(category_id)
                 if not category:
                     return jsonify({'error': 'Invalid category ID'}), 400
             except (ValueError, TypeError):
@@ -333,6 +361,11 @@ def create_inventory():
         db.session.add(inventory)
         db.session.flush()  # Get inventory ID
         
+        # Opening balance in the stock ledger, dated with the item itself
+        record_movement(inventory.id, quantity, 'opening', user_id=int(get_jwt_identity()),
+                        created_at=inventory.created_at)
+        record_price(inventory.id, price_per_uom)
+        
         # Process vendor associations if provided
         if 'vendors' in data and isinstance(data['vendors'], list):
             for vendor_data in data['vendors']:
@@ -342,7 +375,7 @@ def create_inventory():
                         unit_price = Decimal(str(vendor_data['unit_price']))
                         
                         # Verify the vendor exists
-                        vendor = Vendor.query.get(vendor_id)
+                        vendor = vendors_cache.get(vendor_id)
                         if not vendor:
                             continue  # Skip this invalid vendor
                             
@@ -373,6 +406,7 @@ def update_inventory(inventory_id):
     try:
         inventory = Inventory.query.get_or_404(inventory_id)
         old_values = inventory.to_dict()
+        old_quantity = inventory.quantity
         
         data = request.get_json()
         
@@ -386,11 +420,18 @@ def update_inventory(inventory_id):
         # Update fields
         inventory.name = data.get('name', inventory.name)
         inventory.category_id = data.get('category_id', inventory.category_id)
-        inventory.quantity = data.get('quantity', inventory.quantity)
+        inventory.quantity = int(data.get('quantity', inventory.quantity))
+        
+        # Record manual quantity changes in the stock ledger
+        record_movement(inventory_id, inventory.quantity - old_quantity, 'adjustment',
+                        user_id=int(get_jwt_identity()))
         
         # Update UOM fields
         if 'price_per_uom' in data:
-            inventory.price_per_uom = Decimal(str(data['price_per_uom']))
+            new_price = Decimal(str(data['price_per_uom']))
+            if new_price != inventory.price_per_uom:
+                record_price(inventory_id, new_price)
+            inventory.price_per_uom = new_price
             # Recalculate total price
             inventory.price = inventory.price_per_uom * inventory.quantity
         
@@ -415,7 +456,7 @@ def update_inventory(inventory_id):
                         unit_price = Decimal(str(vendor_data['unit_price']))
                         
                         # Verify the vendor exists
-                        vendor = Vendor.query.get(vendor_id)
+                        vendor = vendors_cache.get(vendor_id)
                         if not vendor:
                             continue
                             
@@ -458,6 +499,55 @@ def delete_inventory(inventory_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/inventory/<int:inventory_id>/movements', methods=['GET'])
+@jwt_required()
+def get_stock_movements(inventory_id):
+    try:
+        Inventory.query.get_or_404(inventory_id)
+        
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        
+        query = StockMovement.query.filter_by(inventory_id=inventory_id)
+        total = query.count()
+        movements = query.order_by(StockMovement.id.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        
+        return jsonify({
+            'movements': [movement.to_dict() for movement in movements],
+            'pagination': {
+                'page': page,
+                'pages': (total + per_page - 1) // per_page,
+                'per_page': per_page,
+                'total': total,
+                'has_next': page * per_page < total,
+                'has_prev': page > 1
+            }
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/inventory/<int:inventory_id>/stock-at', methods=['GET'])
+@jwt_required()
+def get_stock_at(inventory_id):
+    try:
+        inventory = Inventory.query.get_or_404(inventory_id)
+        
+        as_of = datetime.utcnow()
+        if request.args.get('date'):
+            try:
+                as_of = datetime.fromisoformat(request.args['date'].replace('Z', ''))
+            except ValueError:
+                return jsonify({'error': 'Invalid date format'}), 400
+        
+        return jsonify({
+            'inventory_id': inventory.id,
+            'name': inventory.name,
+            'as_of': as_of.isoformat(),
+            'quantity': quantity_at(inventory.id, as_of)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Debug endpoint to test what data is being sent
 @app.route('/api/debug/inventory', methods=['POST'])
 @jwt_required()
@@ -497,27 +587,38 @@ def get_orders():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status', '')
+        include_archived = request.args.get('archived', 'false').lower() == 'true'
         
-        query = Order.query
+        serializer, columnar = compile_from_request(order_serializer)
+        query = serializer.select()
         
         if status:
-            query = query.filter_by(status=status)
-        
-        orders = query.order_by(Order.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        return jsonify({
-            'orders': [order.to_dict() for order in orders.items],
-            'pagination': {
-                'page': page,
-                'pages': orders.pages,
-                'per_page': per_page,
-                'total': orders.total,
-                'has_next': orders.has_next,
-                'has_prev': orders.has_prev
-            }
-        })
+            query = query.where(Order.status == status)
+        
+        # ?archived=true also lists the closed orders moved to cold storage
+        with including_archived(include_archived):
+            records, pagination = serializer.fetch_page(query.order_by(Order.created_at.desc()), page, per_page)
+            return page_response('orders', serializer, records, columnar, pagination=pagination,
+                                 filters={'status': status, 'archived': include_archived})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/orders/<int:order_id>', methods=['GET'])
+@jwt_required()
+def get_order(order_id):
+    try:
+        include_archived = request.args.get('archived', 'false').lower() == 'true'
+        serializer, _ = compile_from_request(order_serializer)
+        
+        with including_archived(include_archived):
+            records = fetch(serializer.select().where(Order.id == order_id), serializer.record)
+            if not records:
+                return jsonify({'error': 'Order not found'}), 404
+            return list_response('order', serializer.encode_rows(records)[0])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -581,10 +682,20 @@ def create_order():
             order_item = OrderItem(**item_data)
             db.session.add(order_item)
             
-            # Update inventory quantity
-            inventory = Inventory.query.get(item_data['inventory_id'])
-            inventory.quantity -= item_data['quantity']
-            inventory.updated_at = datetime.utcnow()
+            # Update inventory quantity in one conditional statement, so concurrent orders
+            # cannot both take the last units or overwrite each other's decrement
+            updated = Inventory.query.filter(
+                Inventory.id == item_data['inventory_id'],
+                Inventory.quantity >= item_data['quantity']
+            ).update({
+                Inventory.quantity: Inventory.quantity - item_data['quantity'],
+                Inventory.updated_at: datetime.utcnow()
+            }, synchronize_session='fetch')
+            if not updated:
+                db.session.rollback()
+                inventory = Inventory.query.get(item_data['inventory_id'])
+                return jsonify({'error': f'Insufficient stock for {inventory.name}'}), 400
+            record_movement(item_data['inventory_id'], -item_data['quantity'], 'order', order.id, int(get_jwt_identity()))
         
         db.session.commit()
         
@@ -648,12 +759,12 @@ def admin_stats():
         
         # Get comprehensive system statistics
         stats = get_system_stats()
+        stats['api_performance'] = get_api_performance_stats()
+        stats['storage'] = database_maintenance.storage_summary()
         
         # Add additional admin-specific stats
         # stats.update({
-        #     'database_size': get_database_size(),
         #     'system_uptime': get_system_uptime(),
-        #     'api_performance': get_api_performance_stats(),
         #     'storage_usage': get_storage_usage(),
         #     'recent_activity': get_recent_system_activity()
         # })
@@ -672,38 +783,7 @@ def admin_get_settings():
         if user.role != 'admin':
             return jsonify({'error': 'Admin access required'}), 403
         
-        # For now, return default settings
-        # In a production environment, these would be stored in a database table
-        settings = {
-            'company_name': 'TechFlow Inventory Solutions',
-            'company_address': '123 Business Ave, Suite 100, Tech City, TC 12345',
-            'company_phone': '+1-555-INVENTORY',
-            'company_email': 'support@techflow-inventory.com',
-            'currency': 'USD',
-            'timezone': 'America/New_York',
-            'email_notifications': True,
-            'low_stock_alerts': True,
-            'order_notifications': True,
-            'system_alerts': True,
-            'max_login_attempts': 3,
-            'account_lockout_duration': 30,
-            'session_timeout': 30,
-            'password_min_length': 8,
-            'require_uppercase': True,
-            'require_numbers': True,
-            'require_special_characters': True,
-            'two_factor_authentication': False,
-            'backup_frequency': 'daily',
-            'backup_time': '02:00',
-            'backup_retention_days': 30,
-            'auto_backup_enabled': True,
-            'low_stock_threshold': 10,
-            'auto_reorder': False,
-            'default_category': 'Miscellaneous',
-            'sku_auto_generation': True,
-            'sku_prefix': 'INV',
-            'track_serial_numbers': False
-        }
+        settings = get_settings()
         
         return jsonify(settings)
     except Exception as e:
@@ -724,24 +804,10 @@ def admin_update_settings():
         if not data:
             return jsonify({'error': 'No settings data provided'}), 400
         
-        # Validate settings data
-        valid_settings = {
-            'company_name', 'company_address', 'company_phone', 'company_email',
-            'currency', 'timezone', 'email_notifications', 'low_stock_alerts',
-            'order_notifications', 'system_alerts', 'max_login_attempts',
-            'account_lockout_duration', 'session_timeout', 'password_min_length',
-            'require_uppercase', 'require_numbers', 'require_special_characters',
-            'two_factor_authentication', 'backup_frequency', 'backup_time',
-            'backup_retention_days', 'auto_backup_enabled', 'low_stock_threshold',
-            'auto_reorder', 'default_category', 'sku_auto_generation',
-            'sku_prefix', 'track_serial_numbers'
-        }
-        
-        # Filter out invalid settings
-        filtered_settings = {k: v for k, v in data.items() if k in valid_settings}
-        
-        # In a production environment, you would save these to a database table
-        # For now, we'll just log the action and return success
+        # Persist valid settings, ignoring unknown keys
+        filtered_settings = save_settings(data)
+        db.session.commit()
+        
         log_action('UPDATE_SETTINGS', 'system_settings', None, None, {
             'updated_settings': list(filtered_settings.keys()),
             'updated_by': current_user_id,
@@ -753,6 +819,7 @@ def admin_update_settings():
             'updated_settings': filtered_settings
         })
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/logs', methods=['GET'])
@@ -771,62 +838,70 @@ def admin_logs():
         action_filter = request.args.get('action', '')
         user_filter = request.args.get('user_id', type=int)
         table_filter = request.args.get('table', '')
+        include_archived = request.args.get('archived', 'true').lower() != 'false'
         
         # Build query
-        query = AuditLog.query
+        serializer, columnar = compile_from_request(audit_log_serializer)
+        query = serializer.select()
         
         if action_filter:
-            query = query.filter(AuditLog.action.ilike(f'%{action_filter}%'))
+            query = query.where(AuditLog.action.ilike(f'%{action_filter}%'))
         
         if user_filter:
-            query = query.filter_by(user_id=user_filter)
+            query = query.where(AuditLog.user_id == user_filter)
         
         if table_filter:
-            query = query.filter(AuditLog.table_name.ilike(f'%{table_filter}%'))
+            query = query.where(AuditLog.table_name.ilike(f'%{table_filter}%'))
+        
+        # Live audit database first, then the monthly archives, newest first
+        records, pagination = audit_store.fetch_page(serializer, query.order_by(AuditLog.created_at.desc()),
+                                                     page, per_page, include_archived)
+        return page_response('logs', serializer, records, columnar, pagination=pagination, filters={
+            'action': action_filter,
+            'user_id': user_filter,
+            'table': table_filter,
+            'archived': include_archived
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/logs/rotation', methods=['GET', 'POST'])
+@jwt_required()
+def admin_logs_rotation():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
         
-        # Execute query with pagination
-        try:
-            logs = query.order_by(AuditLog.created_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
-            
-            return jsonify({
-                'logs': [log.to_dict() for log in logs.items],
-                'pagination': {
-                    'page': page,
-                    'pages': logs.pages,
-                    'per_page': per_page,
-                    'total': logs.total,
-                    'has_next': logs.has_next,
-                    'has_prev': logs.has_prev
-                },
-                'filters': {
-                    'action': action_filter,
-                    'user_id': user_filter,
-                    'table': table_filter
-                }
-            })
-        except Exception as paginate_error:
-            # Fallback: manual pagination
-            total = query.count()
-            items = query.order_by(AuditLog.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-            
-            return jsonify({
-                'logs': [log.to_dict() for log in items],
-                'pagination': {
-                    'page': page,
-                    'pages': (total + per_page - 1) // per_page,
-                    'per_page': per_page,
-                    'total': total,
-                    'has_next': page * per_page < total,
-                    'has_prev': page > 1
-                },
-                'filters': {
-                    'action': action_filter,
-                    'user_id': user_filter,
-                    'table': table_filter
-                }
-            })
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        if request.method == 'POST':
+            result = audit_store.rotate()
+            log_action('ROTATE_AUDIT_LOGS', 'audit_logs', None, None, result)
+            return jsonify({'result': result, 'status': audit_store.status()})
+        
+        return jsonify(audit_store.status())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/archive', methods=['GET', 'POST'])
+@jwt_required()
+def admin_archive():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        if request.method == 'POST':
+            result = cold_storage.run()
+            log_action('ARCHIVE_ORDERS', 'orders', None, None, result)
+            return jsonify({'result': result, 'status': cold_storage.status()})
+        
+        return jsonify(cold_storage.status())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -846,7 +921,7 @@ def admin_backup_database():
         
         # Get database file path
         basedir = os.path.abspath(os.path.dirname(__file__))
-        source_db_path = os.path.join(basedir, 'inventory.db')
+        source_db_path = database_path
         backup_db_path = os.path.join(basedir, 'backups', backup_filename)
         
         # Create backups directory if it doesn't exist
@@ -989,6 +1064,198 @@ def admin_delete_backup(filename):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/ledger/checkpoint', methods=['POST'])
+@jwt_required()
+def admin_ledger_checkpoint():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        result = take_snapshots()
+        
+        log_action('LEDGER_CHECKPOINT', 'stock_snapshots', None, None, result)
+        
+        return jsonify(result)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/ledger/verify', methods=['GET'])
+@jwt_required()
+def admin_ledger_verify():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        return jsonify(verify_ledger())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/caches', methods=['GET'])
+@jwt_required()
+def admin_caches():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        return jsonify({
+            'invalidation': bus.stats(),
+            'responses': response_cache.stats(),
+            'fragments': fragment_cache.stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/sql-profile', methods=['GET', 'DELETE'])
+@jwt_required()
+def admin_sql_profile():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        if request.method == 'DELETE':
+            sql_profiler.reset()
+            return jsonify({'message': 'SQL profile reset'})
+        
+        limit = min(int(request.args.get('limit', 20)), 200)
+        return jsonify(sql_profiler.report(limit))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/profiler', methods=['GET', 'POST', 'DELETE'])
+@jwt_required()
+def admin_profiler():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            try:
+                status = sampling_profiler.start(
+                    routes=data.get('routes'),
+                    sample_rate=float(data.get('sample_rate', 0.1)),
+                    duration_seconds=float(data.get('duration_seconds', 300)),
+                    max_samples=int(data.get('max_samples', 10000)),
+                    interval_ms=float(data.get('interval_ms', 5))
+                )
+            except (TypeError, ValueError) as e:
+                return jsonify({'error': str(e)}), 400
+            log_action('START_PROFILER', None, None, None, {
+                'routes': status['routes'],
+                'sample_rate': status['sample_rate'],
+                'deadline': status['deadline']
+            })
+            return jsonify(status), 201
+        
+        if request.method == 'DELETE':
+            sampling_profiler.stop()
+        
+        return jsonify(sampling_profiler.status())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/profiler/stacks', methods=['GET'])
+@jwt_required()
+def admin_profiler_stacks():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        filename = f'profile_{datetime.now().strftime("%Y%m%d_%H%M%S")}.collapsed'
+        return app.response_class(
+            sampling_profiler.collapsed(),
+            mimetype='text/plain',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/traffic-capture', methods=['GET'])
+@jwt_required()
+def admin_traffic_capture():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        return jsonify(traffic_capture.status())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/maintenance', methods=['GET', 'POST'])
+@jwt_required()
+def admin_maintenance():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        if request.method == 'POST':
+            # Run now: outside the window and regardless of load, within the time budget
+            data = request.get_json() or {}
+            tasks = data.get('tasks')
+            if tasks is not None and (not isinstance(tasks, list) or set(tasks) - set(MAINTENANCE_TASKS)):
+                return jsonify({'error': f"tasks must be a list of {', '.join(MAINTENANCE_TASKS)}"}), 400
+            try:
+                budget = float(data['budget_seconds']) if 'budget_seconds' in data else None
+            except (TypeError, ValueError):
+                return jsonify({'error': 'budget_seconds must be a number'}), 400
+            results = database_maintenance.run(tasks, force=True, budget_seconds=budget)
+            log_action('RUN_MAINTENANCE', None, None, None, {'tasks': tasks or list(MAINTENANCE_TASKS)})
+            return jsonify({'results': results, 'status': database_maintenance.status()})
+        
+        return jsonify(database_maintenance.status())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/storage', methods=['GET'])
+@jwt_required()
+def admin_storage():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        # Walks every page of the database file; admin stats shows the last snapshot instead
+        report = database_maintenance.storage_report()
+        report['trend'] = database_maintenance.growth_trend(days=request.args.get('days', 30, type=int))
+        return jsonify(report)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Scrapers cannot log in; require METRICS_TOKEN as a bearer token when it is set
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Invalid metrics token'}), 401
+    return app.response_class(request_metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
 # Analytics Routes
 @app.route('/api/analytics/low-stock', methods=['GET'])
 @jwt_required()
@@ -1028,6 +1295,59 @@ def get_inventory_value():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analytics/stock-by-unit', methods=['GET'])
+@jwt_required()
+def get_stock_by_unit_report():
+    try:
+        target_unit = request.args.get('unit') or None
+        return jsonify({'unit': target_unit, 'stock': get_stock_by_unit(target_unit)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/inventory-valuation', methods=['GET'])
+@jwt_required()
+def get_inventory_valuation():
+    try:
+        # Single point in time
+        if request.args.get('date'):
+            try:
+                as_of = datetime.fromisoformat(request.args['date'].replace('Z', ''))
+            except ValueError:
+                return jsonify({'error': 'Invalid date format'}), 400
+            return jsonify({'valuation': get_valuation_at(as_of)})
+        
+        # Month-end series
+        months = request.args.get('months', 12, type=int)
+        if months <= 0 or months > 120:
+            return jsonify({'error': 'months must be between 1 and 120'}), 400
+        
+        return jsonify({'series': get_valuation_series(months)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/inventory-valuation/rebuild', methods=['POST'])
+@jwt_required()
+def rebuild_inventory_valuation():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        result = build_period_snapshots(months=int(data.get('months', 36)), rebuild=True)
+        
+        log_action('REBUILD_VALUATION', 'valuation_snapshots', None, None, {
+            'periods_built': len(result['periods_built'])
+        })
+        
+        return jsonify(result)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Add new analytics endpoints
 @app.route('/api/analytics/dashboard-stats', methods=['GET'])
 @jwt_required()
@@ -1046,25 +1366,24 @@ def get_dashboard_stats():
             db.func.sum(Inventory.quantity * Inventory.price)
         ).filter_by(is_active=True).scalar() or 0
         
-        # Order stats
-        total_orders = Order.query.count()
-        pending_orders = Order.query.filter_by(status='pending').count()
-        completed_orders = Order.query.filter(
-            Order.status.in_(['delivered', 'completed'])
-        ).count()
-        
-        # Calculate total revenue from completed orders
-        total_revenue = db.session.query(
-            db.func.sum(Order.total)
-        ).filter(Order.status.in_(['delivered', 'completed'])).scalar() or 0
+        # Order stats in one pass: totals, pending, completed with their revenue, and recent
+        # orders (last 7 days); ?archived=true also counts the orders in cold storage
+        include_archived = request.args.get('archived', 'false').lower() == 'true'
+        completed = Order.status.in_(['delivered', 'completed'])
+        week_ago = datetime.utcnow() - timedelta(days=7)
+        with including_archived(include_archived):
+            total_orders, pending_orders, completed_orders, total_revenue, recent_orders = fetch(db.select(
+                db.func.count(),
+                db.func.count(db.case((Order.status == 'pending', 1))),
+                db.func.count(db.case((completed, 1))),
+                db.func.sum(db.case((completed, Order.total))),
+                db.func.count(db.case((Order.created_at >= week_ago, 1)))
+            ).select_from(Order))[0]
+        total_revenue = total_revenue or 0
         
         # Average order value
         avg_order_value = float(total_revenue) / max(completed_orders, 1)
         
-        # Recent orders (last 7 days)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_orders = Order.query.filter(Order.created_at >= week_ago).count()
-        
         return jsonify({
             'inventory': {
                 'total_products': total_products,
@@ -1090,6 +1409,7 @@ def get_monthly_trends():
     try:
         # Get last 6 months of data
         months_data = []
+        include_archived = request.args.get('archived', 'false').lower() == 'true'
         today = datetime.utcnow()
         
         for i in range(5, -1, -1):  # Last 6 months
@@ -1101,19 +1421,16 @@ def get_monthly_trends():
             if month_start.month == 12:
                 month_end = datetime(month_start.year + 1, 1, 1) - timedelta(days=1)
             
-            # Count orders and revenue for this month
-            orders_count = Order.query.filter(
-                Order.created_at >= month_start,
-                Order.created_at <= month_end
-            ).count()
-            
-            revenue = db.session.query(
-                db.func.sum(Order.total)
-            ).filter(
-                Order.created_at >= month_start,
-                Order.created_at <= month_end,
-                Order.status.in_(['delivered', 'completed'])
-            ).scalar() or 0
+            # Count orders and revenue for this month (?archived=true includes cold storage)
+            with including_archived(include_archived):
+                orders_count, revenue = fetch(db.select(
+                    db.func.count(),
+                    db.func.sum(db.case((Order.status.in_(['delivered', 'completed']), Order.total)))
+                ).select_from(Order).where(
+                    Order.created_at >= month_start,
+                    Order.created_at <= month_end
+                ))[0]
+            revenue = revenue or 0
             
             months_data.append({
                 'month': month_start.strftime('%b %Y'),
@@ -1126,9 +1443,85 @@ def get_monthly_trends():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analytics/reorder-points', methods=['GET'])
+@jwt_required()
+def get_reorder_points():
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        below_only = request.args.get('below_reorder_point', 'false').lower() == 'true'
+        
+        query = db.session.query(DemandForecast, Inventory).join(
+            Inventory, DemandForecast.inventory_id == Inventory.id
+        ).filter(Inventory.is_active == True)
+        
+        if below_only:
+            query = query.filter(Inventory.quantity <= DemandForecast.reorder_point)
+        
+        total = query.count()
+        rows = query.order_by(DemandForecast.daily_demand.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        
+        reorder_points = []
+        for forecast, item in rows:
+            data = forecast.to_dict()
+            data.update({
+                'name': item.name,
+                'sku': item.sku,
+                'quantity': item.quantity,
+                'min_stock_level': item.min_stock_level,
+                'below_reorder_point': item.quantity <= forecast.reorder_point
+            })
+            reorder_points.append(data)
+        
+        return jsonify({
+            'reorder_points': reorder_points,
+            'computed_at': reorder_points[0]['computed_at'] if reorder_points else None,
+            'pagination': {
+                'page': page,
+                'pages': (total + per_page - 1) // per_page,
+                'per_page': per_page,
+                'total': total,
+                'has_next': page * per_page < total,
+                'has_prev': page > 1
+            }
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/reorder-points/recompute', methods=['POST'])
+@jwt_required()
+def recompute_reorder_points():
+    try:
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        
+        try:
+            history_days = int(data.get('history_days', 365))
+            lead_time_days = int(data.get('lead_time_days', 7))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid history_days or lead_time_days'}), 400
+        
+        if history_days <= 0 or lead_time_days <= 0:
+            return jsonify({'error': 'history_days and lead_time_days must be positive'}), 400
+        
+        summary = compute_demand_forecasts(history_days=history_days, lead_time_days=lead_time_days)
+        
+        log_action('RECOMPUTE_FORECASTS', 'demand_forecasts', None, None, summary)
+        
+        return jsonify({'summary': summary})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Vendor Routes
 @app.route('/api/vendors', methods=['GET'])
 @jwt_required()
+@cached_resource('vendors', ('vendors',), roles=('admin', 'staff'))
 def get_vendors():
     try:
         # Check if user is admin or staff
@@ -1272,44 +1665,21 @@ def get_purchase_orders():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status', '')
+        include_archived = request.args.get('archived', 'false').lower() == 'true'
         
-        query = PurchaseOrder.query
+        serializer, columnar = compile_from_request(purchase_order_serializer)
+        query = serializer.select()
         
         if status:
-            query = query.filter_by(status=status)
-        
-        try:
-            purchase_orders = query.order_by(PurchaseOrder.created_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
-            
-            return jsonify({
-                'purchase_orders': [po.to_dict() for po in purchase_orders.items],
-                'pagination': {
-                    'page': page,
-                    'pages': purchase_orders.pages,
-                    'per_page': per_page,
-                    'total': purchase_orders.total,
-                    'has_next': purchase_orders.has_next,
-                    'has_prev': purchase_orders.has_prev
-                }
-            })
-        except Exception as paginate_error:
-            # Fallback: manual pagination
-            total = query.count()
-            items = query.order_by(PurchaseOrder.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
-            
-            return jsonify({
-                'purchase_orders': [po.to_dict() for po in items],
-                'pagination': {
-                    'page': page,
-                    'pages': (total + per_page - 1) // per_page,
-                    'per_page': per_page,
-                    'total': total,
-                    'has_next': page * per_page < total,
-                    'has_prev': page > 1
-                }
-            })
+            query = query.where(PurchaseOrder.status == status)
+        
+        # ?archived=true also lists the received purchase orders moved to cold storage
+        with including_archived(include_archived):
+            records, pagination = serializer.fetch_page(query.order_by(PurchaseOrder.created_at.desc()), page, per_page)
+            return page_response('purchase_orders', serializer, records, columnar, pagination=pagination,
+                                 filters={'status': status, 'archived': include_archived})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1324,6 +1694,14 @@ def get_purchase_order(po_id):
         if user.role not in ['admin', 'staff']:
             return jsonify({'error': 'Access denied - must be admin or staff'}), 403
         
+        # Received purchase orders move to cold storage; ?archived=true also looks there
+        if request.args.get('archived', 'false').lower() == 'true' and PurchaseOrder.query.get(po_id) is None:
+            serializer = purchase_order_serializer.compile()
+            with including_archived():
+                records = fetch(serializer.select().where(PurchaseOrder.id == po_id), serializer.record)
+                if records:
+                    return list_response('purchase_order', serializer.encode_rows(records)[0])
+        
         purchase_order = PurchaseOrder.query.get_or_404(po_id)
         return jsonify({'purchase_order': purchase_order.to_dict()})
     except Exception as e:
@@ -1346,6 +1724,14 @@ def create_purchase_order():
         if 'vendor_id' not in data:
             return jsonify({'error': 'Vendor is required'}), 400
         
+        try:
+            vendor_id = int(data['vendor_id'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid vendor ID'}), 400
+        
+        if not vendors_cache.get(vendor_id):
+            return jsonify({'error': 'Invalid vendor ID'}), 400
+        
         if 'items' not in data or len(data['items']) == 0:
             return jsonify({'error': 'Purchase order must contain at least one item'}), 400
         
@@ -1370,7 +1756,7 @@ def create_purchase_order():
         
         # Create purchase order
         purchase_order = PurchaseOrder(
-            vendor_id=int(data['vendor_id']),
+            vendor_id=vendor_id,
             reference_number=data.get('reference_number', f'PO-{datetime.utcnow().strftime("%Y%m%d%H%M%S")}'),
             status=data.get('status', 'draft'),
             total=total,
@@ -1388,13 +1774,16 @@ def create_purchase_order():
             quantity = int(item_data['quantity'])
             unit_price = Decimal(str(item_data['unit_price']))
             total_price = quantity * unit_price
+            inventory = Inventory.query.get(inventory_id)
             
             po_item = PurchaseOrderItem(
                 purchase_order_id=purchase_order.id,
                 inventory_id=inventory_id,
                 quantity=quantity,
                 unit_price=unit_price,
-                total_price=total_price
+                total_price=total_price,
+                unit_of_measure=item_data.get('unit_of_measure') or (inventory.unit_of_measure if inventory else 'pcs'),
+                price_per_uom=Decimal(str(item_data.get('price_per_uom', unit_price)))
             )
             db.session.add(po_item)
         
@@ -1542,7 +1931,24 @@ def receive_purchase_order(po_id):
         if not received_items:
             return jsonify({'error': 'At least one item must be received'}), 400
         
-        # Update inventory quantities
+        # Claim the purchase order with a conditional update so two concurrent receives
+        # cannot both apply it
+        received_at = datetime.utcnow()
+        claimed = PurchaseOrder.query.filter(
+            PurchaseOrder.id == po_id,
+            PurchaseOrder.status == 'approved'
+        ).update({
+            PurchaseOrder.status: 'received',
+            PurchaseOrder.received_date: received_at,
+            PurchaseOrder.updated_at: received_at
+        }, synchronize_session='fetch')
+        if not claimed:
+            db.session.rollback()
+            return jsonify({'error': 'Only approved purchase orders can be received'}), 400
+        
+        # Update inventory quantities; the audit entries go to their own database, so they
+        # are only written once the receipt has committed
+        inventory_updates = []
         for item_data in received_items:
             po_item_id = item_data.get('id')
             received_qty = int(item_data.get('received_quantity', 0))
@@ -1557,25 +1963,25 @@ def receive_purchase_order(po_id):
             # Update PO item's received quantity
             po_item.received_quantity = received_qty
             
-            # Update inventory quantity
+            # Update inventory quantity (incremented in SQL so concurrent orders are not overwritten)
             inventory_item = Inventory.query.get(po_item.inventory_id)
             if inventory_item:
-                old_qty = inventory_item.quantity
-                inventory_item.quantity += received_qty
-                inventory_item.updated_at = datetime.utcnow()
-                
-                # Log inventory update
-                log_action('INVENTORY_UPDATE', 'inventory', inventory_item.id, 
-                          {'quantity': old_qty}, 
-                          {'quantity': inventory_item.quantity, 'purchase_order_id': po_id})
-        
-        # Update PO status and received date
-        purchase_order.status = 'received'
-        purchase_order.received_date = datetime.utcnow()
-        purchase_order.updated_at = datetime.utcnow()
+                Inventory.query.filter(Inventory.id == inventory_item.id).update({
+                    Inventory.quantity: Inventory.quantity + received_qty,
+                    Inventory.updated_at: datetime.utcnow()
+                }, synchronize_session='fetch')
+                old_qty = inventory_item.quantity - received_qty
+                record_movement(inventory_item.id, received_qty, 'po_receipt', po_id, current_user_id)
+                inventory_updates.append((inventory_item.id, old_qty, inventory_item.quantity))
         
         db.session.commit()
         
+        # Log inventory updates
+        for inventory_id, old_qty, new_qty in inventory_updates:
+            log_action('INVENTORY_UPDATE', 'inventory', inventory_id, 
+                      {'quantity': old_qty}, 
+                      {'quantity': new_qty, 'purchase_order_id': po_id})
+        
         log_action('RECEIVE', 'purchase_orders', purchase_order.id, 
                   {'status': 'approved'}, 
                   {'status': 'received', 'received_date': purchase_order.received_date.isoformat()})
@@ -1585,6 +1991,33 @@ def receive_purchase_order(po_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/purchase-orders/auto-reorder', methods=['POST'])
+@jwt_required()
+def auto_reorder():
+    try:
+        # Check if user is admin or staff
+        current_user_id = int(get_jwt_identity())
+        user = User.query.get(current_user_id)
+        
+        if user.role not in ['admin', 'staff']:
+            return jsonify({'error': 'Access denied - must be admin or staff'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        dry_run = bool(data.get('dry_run', request.args.get('dry_run', 'false').lower() == 'true'))
+        
+        plan = run_auto_reorder(dry_run=dry_run, created_by=current_user_id)
+        
+        if plan['purchase_order_ids']:
+            log_action('AUTO_REORDER', 'purchase_orders', None, None, {
+                'purchase_order_ids': plan['purchase_order_ids'],
+                'summary': plan['summary']
+            })
+        
+        return jsonify({'plan': plan}), 200 if dry_run else 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/purchase-orders/<int:po_id>', methods=['DELETE'])
 @jwt_required()
 def delete_purchase_order(po_id):
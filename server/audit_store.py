@@ -0,0 +1,293 @@
+"""
+Audit log storage - its own database file, rotation into monthly archives
+
+The audit trail lives in a separate SQLite file next to the main database (inventory.db ->
+inventory-audit.db), bound to the AuditLog model as SQLALCHEMY_BINDS['audit']. Audit writes
+take that file's write lock instead of the one orders and stock updates wait on, and backups
+and the page cache of the main database no longer carry years of audit rows. Entries are
+written through the audit engine in their own short transaction, outside the request's
+session.
+
+Rotation (AUDIT_ROTATE_INTERVAL) moves entries older than AUDIT_ROTATE_DAYS into one archive
+file per month, <db>-audit-archive/audit-YYYY-MM.db, AUDIT_ROTATE_CHUNK rows per
+transaction; copy and delete of a chunk commit together. Archives whose month ended more
+than AUDIT_RETENTION_DAYS ago are deleted (0 keeps every archive).
+
+The live file and the archives are shards of one log ordered by time: everything archived
+is older than the rotation cutoff and every archive holds a single month, so a page of the
+newest-first listing is read by walking the shards newest first and skipping whole shards
+by their row counts. Counts of archives are cached until the file changes.
+
+Databases created before the split keep their entries in main.audit_logs until migration
+1.4.0 (python migrate.py migrate) moves them; until then that table is read as the oldest
+shard, so upgrading does not hide the history. Until then new entries are numbered above
+the legacy ids (reserve_legacy_ids), so an id names one entry across all shards.
+"""
+
+from models import db, AuditLog
+from read_models import fetch
+from sqlalchemy import insert, select, func, text
+from datetime import datetime, timedelta
+import os
+import sqlite3
+import threading
+import time
+
+AUDIT_BIND = 'audit'
+ARCHIVE_PREFIX = 'audit-'
+
+# Seconds a rotation chunk waits for the audit writers, and the pause between chunks
+BUSY_TIMEOUT = 10
+CHUNK_PAUSE = 0.005
+MAX_CACHED_COUNTS = 512
+
+def audit_database_path(database_path):
+    """inventory.db -> inventory-audit.db"""
+    base, ext = os.path.splitext(database_path)
+    return f'{base}-audit{ext or ".db"}'
+
+def archive_directory(database_path):
+    """inventory.db -> inventory-audit-archive/"""
+    return f'{os.path.splitext(database_path)[0]}-audit-archive'
+
+def database_binds(database_path):
+    """SQLALCHEMY_BINDS that put AuditLog in its own file next to `database_path`"""
+    return {AUDIT_BIND: f'sqlite:///{audit_database_path(database_path)}'}
+
+def _next_month(month):
+    year, number = map(int, month.split('-'))
+    return f'{year + number // 12:04d}-{number % 12 + 1:02d}'
+
+class AuditStore:
+    def __init__(self):
+        self.rotate_days = 90
+        self.retention_days = 0
+        self.chunk_rows = 5000
+        self.path = None
+        self.archive_dir = None
+        self.last_rotation = None
+        self._legacy_gone = False
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def init_app(self, app):
+        self.rotate_days = int(os.getenv('AUDIT_ROTATE_DAYS', self.rotate_days))
+        self.retention_days = int(os.getenv('AUDIT_RETENTION_DAYS', self.retention_days))
+        self.chunk_rows = int(os.getenv('AUDIT_ROTATE_CHUNK', self.chunk_rows))
+        database_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '', 1)
+        self.path = audit_database_path(database_path)
+        self.archive_dir = archive_directory(database_path)
+
+    # Writes
+    def write(self, action, table_name=None, record_id=None, old_values=None, new_values=None,
+              user_id=None, ip_address=None):
+        """Insert one entry in its own transaction on the audit database"""
+        with db.engines[AUDIT_BIND].begin() as connection:
+            connection.execute(insert(AuditLog), {
+                'user_id': user_id,
+                'action': action,
+                'table_name': table_name,
+                'record_id': record_id,
+                'old_values': old_values,
+                'new_values': new_values,
+                'ip_address': ip_address,
+                'created_at': datetime.utcnow()
+            })
+
+    # Shards
+    def archive_path(self, month):
+        return os.path.join(self.archive_dir, f'{ARCHIVE_PREFIX}{month}.db')
+
+    def archives(self):
+        """[(month, path)] of the archive files, newest first"""
+        if not self.archive_dir or not os.path.isdir(self.archive_dir):
+            return []
+        names = sorted((name for name in os.listdir(self.archive_dir)
+                        if name.startswith(ARCHIVE_PREFIX) and name.endswith('.db')), reverse=True)
+        return [(name[len(ARCHIVE_PREFIX):-3], os.path.join(self.archive_dir, name)) for name in names]
+
+    def _legacy_connection(self):
+        """Raw connection to the main database while it still holds the pre-1.4.0 audit_logs, else None"""
+        if self._legacy_gone:
+            return None
+        connection = db.session.connection().connection.dbapi_connection
+        if connection.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' "
+                              "AND name = 'audit_logs'").fetchone() is None:
+            # Dropped by the last step of migration 1.4.0 and never created again
+            self._legacy_gone = True
+            return None
+        return connection
+
+    def reserve_legacy_ids(self):
+        """Move the audit database's AUTOINCREMENT counter past the ids still in main.audit_logs"""
+        legacy = self._legacy_connection()
+        if legacy is None:
+            return
+        legacy_max = legacy.execute('SELECT MAX(id) FROM main.audit_logs').fetchone()[0] or 0
+        with db.engines[AUDIT_BIND].begin() as connection:
+            connection.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'audit_logs' AND seq < :seq"),
+                               {'seq': legacy_max})
+            connection.execute(text("""
+                INSERT INTO sqlite_sequence (name, seq) SELECT 'audit_logs', :seq
+                WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'audit_logs')
+            """), {'seq': legacy_max})
+
+    def _archive_count(self, statement, path, connection):
+        """Row count of `statement` on an archive, cached while the file is unchanged"""
+        stat = os.stat(path)
+        compiled = statement.compile()
+        key = (path, stat.st_mtime_ns, stat.st_size, str(compiled), tuple(sorted(compiled.params.items())))
+        count = self._counts.get(key)
+        if count is None:
+            count = fetch(statement, connection=connection)[0][0]
+            if len(self._counts) >= MAX_CACHED_COUNTS:
+                self._counts.clear()
+            self._counts[key] = count
+        return count
+
+    def fetch_page(self, serializer, statement, page, per_page, include_archived=True):
+        """One page of a newest-first audit SELECT across the live database and the archives;
+        returns (records, pagination) like CompiledSerializer.fetch_page"""
+        count_statement = select(func.count()).select_from(statement.order_by(None).subquery())
+        offset = (page - 1) * per_page
+        records = fetch(statement.offset(offset).limit(per_page), serializer.record)
+        total = fetch(count_statement)[0][0]
+        for month, path in (self.archives() if include_archived else []):
+            try:
+                connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+            except sqlite3.OperationalError:
+                continue  # removed by retention since it was listed
+            try:
+                count = self._archive_count(count_statement, path, connection)
+                if len(records) < per_page and offset < total + count:
+                    page_statement = statement.offset(max(offset - total, 0)).limit(per_page - len(records))
+                    records += fetch(page_statement, serializer.record, connection)
+            except (sqlite3.OperationalError, FileNotFoundError):
+                count = 0  # removed, or created by a rotation that has not committed its table yet
+            finally:
+                connection.close()
+            total += count
+
+        # Entries not yet moved out of the main database by migration 1.4.0 are the oldest; they
+        # were live before the upgrade, so archived=false lists them too
+        legacy = self._legacy_connection()
+        if legacy is not None:
+            count = fetch(count_statement, connection=legacy)[0][0]
+            if len(records) < per_page and offset < total + count:
+                page_statement = statement.offset(max(offset - total, 0)).limit(per_page - len(records))
+                records += fetch(page_statement, serializer.record, legacy)
+            total += count
+
+        pages = (total + per_page - 1) // per_page if per_page else 0
+        return records, {
+            'page': page,
+            'pages': pages,
+            'per_page': per_page,
+            'total': total,
+            'has_next': page < pages,
+            'has_prev': page > 1
+        }
+
+    # Rotation
+    def _create_archive(self, path, schema):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        archive = sqlite3.connect(path)
+        try:
+            for sql in schema:
+                archive.execute(sql.replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1)
+                                   .replace('CREATE INDEX', 'CREATE INDEX IF NOT EXISTS', 1))
+            archive.commit()
+        finally:
+            archive.close()
+
+    def rotate(self, now=None):
+        """Move entries older than rotate_days into their monthly archives, then delete archives
+        past retention; returns {'moved': {month: rows}, 'deleted': [month], 'seconds'}"""
+        with self._lock:
+            now = now or datetime.utcnow()
+            # DateTime columns are stored as 'YYYY-MM-DD HH:MM:SS.ffffff' text, so bounds compare as strings
+            cutoff = (now - timedelta(days=self.rotate_days)).strftime('%Y-%m-%d %H:%M:%S.%f')
+            started = time.perf_counter()
+            moved = {}
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=BUSY_TIMEOUT)
+            try:
+                schema = [row[0] for row in conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE tbl_name = 'audit_logs' AND sql IS NOT NULL "
+                    "ORDER BY type DESC")]
+                months = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT substr(created_at, 1, 7) FROM audit_logs WHERE created_at < ?", (cutoff,))]
+                if months:
+                    conn.execute('CREATE TEMP TABLE IF NOT EXISTS rotating (id INTEGER PRIMARY KEY)')
+                for month in sorted(months):
+                    path = self.archive_path(month)
+                    self._create_archive(path, schema)
+                    conn.execute('ATTACH DATABASE ? AS archive', (path,))
+                    try:
+                        moved[month] = self._move_month(conn, month, min(_next_month(month), cutoff))
+                    finally:
+                        conn.execute('DETACH DATABASE archive')
+            finally:
+                conn.close()
+
+            deleted = []
+            if self.retention_days:
+                # A month expires once its last day is older than the retention period
+                expired_before = (now - timedelta(days=self.retention_days)).strftime('%Y-%m')
+                for month, path in self.archives():
+                    if month < expired_before:
+                        os.remove(path)
+                        deleted.append(month)
+
+            self.last_rotation = {
+                'at': now.isoformat(),
+                'moved': moved,
+                'deleted': sorted(deleted),
+                'seconds': round(time.perf_counter() - started, 3)
+            }
+            return self.last_rotation
+
+    def _move_month(self, conn, month, upper):
+        """Move one month's rows below `upper` into the attached archive, a chunk per transaction"""
+        rows_moved = 0
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM temp.rotating')
+                rows = conn.execute("""
+                    INSERT INTO temp.rotating SELECT id FROM main.audit_logs
+                    WHERE created_at >= ? AND created_at < ? ORDER BY created_at LIMIT ?
+                """, (month, upper, self.chunk_rows)).rowcount
+                conn.execute('INSERT INTO archive.audit_logs SELECT * FROM main.audit_logs '
+                             'WHERE id IN (SELECT id FROM temp.rotating)')
+                conn.execute('DELETE FROM main.audit_logs WHERE id IN (SELECT id FROM temp.rotating)')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            rows_moved += rows
+            if rows < self.chunk_rows:
+                return rows_moved
+            # Let the app's audit writers in between chunks
+            time.sleep(CHUNK_PAUSE)
+
+    def status(self):
+        live = fetch(select(func.count()).select_from(AuditLog))[0][0]
+        legacy = self._legacy_connection()
+        return {
+            'path': self.path,
+            'live_rows': live,
+            'legacy_rows': fetch(select(func.count()).select_from(AuditLog), connection=legacy)[0][0] if legacy else 0,
+            'live_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            'archives': [{'month': month, 'path': path, 'bytes': os.path.getsize(path)}
+                         for month, path in self.archives()],
+            'rotate_days': self.rotate_days,
+            'retention_days': self.retention_days,
+            'chunk_rows': self.chunk_rows,
+            'last_rotation': self.last_rotation
+        }
+
+audit_store = AuditStore()
+
+def scheduled_audit_rotation():
+    """Scheduler entry point - move old audit entries into the monthly archives"""
+    return audit_store.rotate()
@@ -0,0 +1,389 @@
+"""
+Endpoint benchmark suite: latency and throughput of the API routes at several dataset sizes
+
+For each size a throwaway database is seeded with bulk inserts and the app is imported
+against it (INVENTORY_DB) in a child process, then every scenario is called through the
+Flask test client: all parameterless GET routes found in the URL map (ids filled in as 1),
+plus write paths such as order creation and purchase order receiving. The response and
+fragment caches are switched off for these, so every call does the full query and
+serialization work; the scenarios named "(cached)" time the same lists with both caches on.
+With --server the scenarios run over HTTP against a live instance and its current data
+instead (without the "(cached)" ones; start the server with RESPONSE_CACHE_SIZE=0 and
+FRAGMENT_CACHE_MB=0 to compare with a seeded run).
+
+Results are written as JSON. With --baseline, each scenario's latency is compared to the
+baseline run and the exit status is 1 when any scenario is slower by more than the
+threshold (--threshold, or per scenario with --scenario-threshold NAME=FRACTION).
+
+Usage:
+  python benchmarks/bench_endpoints.py [--sizes 1000,10000] [--repeat 30] [--output results.json]
+  python benchmarks/bench_endpoints.py --baseline baseline.json [--threshold 0.25] [--metric p50_ms]
+  python benchmarks/bench_endpoints.py --server http://127.0.0.1:5001 [--username admin --password admin123]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from urllib import request as urlrequest
+from urllib.error import HTTPError
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+DEFAULT_RESULTS_DIR = os.path.join(SERVER_DIR, 'benchmarks', 'results')
+
+# Routes that are not meaningful to time repeatedly
+SKIPPED_ROUTES = {'/api/admin/profiler/stacks', '/metrics'}
+
+class Scenario:
+    """One timed call; prepare(client) runs untimed before each call and returns (path, body)"""
+
+    def __init__(self, name, method, path, body=None, prepare=None, cached=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.prepare = prepare
+        self.cached = cached
+
+    def call_args(self, client, iteration):
+        if self.prepare is not None:
+            return self.prepare(client, iteration)
+        return self.path, self.body
+
+class AppCaches:
+    """The app's response and fragment caches, off or on at their configured sizes"""
+
+    def __init__(self):
+        from versioning import response_cache
+        from fragments import fragment_cache
+        self.caches = [(response_cache, 'max_entries', response_cache.max_entries),
+                       (fragment_cache, 'max_bytes', fragment_cache.max_bytes)]
+
+    def set(self, enabled):
+        for cache, attribute, size in self.caches:
+            setattr(cache, attribute, size if enabled else 0)
+            cache.clear()
+
+# Clients: the same request(method, path, body) -> (status, json) over the test client or HTTP
+class TestClient:
+    def __init__(self, app, username, password):
+        self.client = app.test_client()
+        self.headers = {}
+        status, body = self.request('POST', '/api/auth/login', {'username': username, 'password': password})
+        if status != 200:
+            raise RuntimeError(f'Login failed: {body}')
+        self.headers = {'Authorization': f'Bearer {body["access_token"]}'}
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body, headers=self.headers)
+        return response.status_code, response.get_json(silent=True)
+
+class HttpClient:
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Content-Type': 'application/json'}
+        status, body = self.request('POST', '/api/auth/login', {'username': username, 'password': password})
+        if status != 200:
+            raise RuntimeError(f'Login failed: {body}')
+        self.headers['Authorization'] = f'Bearer {body["access_token"]}'
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urlrequest.Request(self.base_url + path, data=data, method=method, headers=self.headers)
+        try:
+            with urlrequest.urlopen(req) as response:
+                status, payload = response.status, response.read()
+        except HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+# Scenarios
+def _first_id(client, path, key):
+    status, body = client.request('GET', path)
+    items = body.get(key, []) if isinstance(body, dict) else body or []
+    return items[0]['id'] if items else 1
+
+def write_scenarios(client):
+    """Write paths; each prepares its own fresh target so every call does the full work"""
+    _, inventory = client.request('GET', '/api/inventory?per_page=200')
+    stocked = [item['id'] for item in inventory.get('inventory', []) if item['quantity'] >= 50] or [1]
+    vendor_id = _first_id(client, '/api/vendors', 'vendors')
+
+    def order(client, i):
+        return '/api/orders', {
+            'customer_name': f'Bench Customer {i}',
+            'items': [{'inventory_id': stocked[i % len(stocked)], 'quantity': 1}]
+        }
+
+    def receive(client, i):
+        inventory_id = stocked[i % len(stocked)]
+        status, created = client.request('POST', '/api/purchase-orders', {
+            'vendor_id': vendor_id,
+            'reference_number': f'BENCH-PO-{time.time_ns()}',
+            'items': [{'inventory_id': inventory_id, 'quantity': 5, 'unit_price': 1.5}]
+        })
+        if status != 201:
+            raise RuntimeError(f'Could not create purchase order: {created}')
+        purchase_order = created['purchase_order']
+        client.request('PATCH', f'/api/purchase-orders/{purchase_order["id"]}/status', {'status': 'approved'})
+        return f'/api/purchase-orders/{purchase_order["id"]}/receive', {
+            'items': [{'id': line['id'], 'received_quantity': 5} for line in purchase_order['items']]
+        }
+
+    def create_item(client, i):
+        return '/api/inventory', {
+            'name': f'Bench Item {time.time_ns()}',
+            'sku': f'BENCH-{time.time_ns()}',
+            'quantity': 10,
+            'price_per_uom': 2.5,
+            'unit_of_measure': 'pcs',
+            'category_id': 1
+        }
+
+    def update_item(client, i):
+        return f'/api/inventory/{stocked[i % len(stocked)]}', {'min_stock_level': 10 + i % 5}
+
+    return [
+        Scenario('POST /api/orders', 'POST', None, prepare=order),
+        Scenario('POST /api/purchase-orders/<int:po_id>/receive', 'POST', None, prepare=receive),
+        Scenario('POST /api/inventory', 'POST', None, prepare=create_item),
+        Scenario('PUT /api/inventory/<int:inventory_id>', 'PUT', None, prepare=update_item)
+    ]
+
+def read_scenarios(url_map):
+    """Every GET route in the URL map, integer arguments filled in as 1, plus list variants"""
+    scenarios = [
+        Scenario('GET /api/inventory?search', 'GET', '/api/inventory?search=Item%2000'),
+        Scenario('GET /api/inventory?page=50', 'GET', '/api/inventory?page=50&per_page=20'),
+        Scenario('GET /api/inventory?per_page=500', 'GET', '/api/inventory?per_page=500'),
+        Scenario('GET /api/admin/logs?page=20', 'GET', '/api/admin/logs?page=20'),
+        # Repeated identical requests, answered from the response and fragment caches
+        Scenario('GET /api/inventory (cached)', 'GET', '/api/inventory', cached=True),
+        Scenario('GET /api/categories (cached)', 'GET', '/api/categories', cached=True),
+        Scenario('GET /api/vendors (cached)', 'GET', '/api/vendors', cached=True)
+    ]
+    for rule in sorted(url_map.iter_rules(), key=lambda rule: rule.rule):
+        if 'GET' not in rule.methods or rule.rule in SKIPPED_ROUTES or rule.endpoint == 'static':
+            continue
+        if any(converter.__class__.__name__ != 'IntegerConverter' for converter in rule._converters.values()):
+            continue
+        path = rule.rule
+        for name in rule.arguments:
+            path = path.replace(f'<int:{name}>', '1')
+        scenarios.append(Scenario(f'GET {rule.rule}', 'GET', path))
+    return scenarios
+
+def run_scenario(client, scenario, repeat, warmup=2):
+    latencies = []
+    errors = {}
+    for i in range(warmup + repeat):
+        path, body = scenario.call_args(client, i)
+        started = time.perf_counter()
+        status, _ = client.request(scenario.method, path, body)
+        elapsed = time.perf_counter() - started
+        if i < warmup:
+            continue
+        latencies.append(elapsed)
+        if status >= 400:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        'calls': len(latencies),
+        'mean_ms': round(total / len(latencies) * 1000, 3),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p95_ms': round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+        'requests_per_second': round(len(latencies) / total, 1) if total else None,
+        'errors': errors
+    }
+
+def run_all(client, url_map, repeat, only=None, caches=None):
+    """Run the scenarios; with `caches` (AppCaches) the caches are off except for the
+    "(cached)" scenarios, without it (a live server) those are skipped"""
+    if caches is not None:
+        caches.set(False)
+    scenarios = read_scenarios(url_map) + write_scenarios(client)
+    results = {}
+    for scenario in scenarios:
+        if only and not any(pattern in scenario.name for pattern in only):
+            continue
+        if scenario.cached:
+            if caches is None:
+                continue
+            caches.set(True)
+            try:
+                results[scenario.name] = run_scenario(client, scenario, repeat)
+            finally:
+                caches.set(False)
+        else:
+            results[scenario.name] = run_scenario(client, scenario, repeat)
+    return results
+
+# Datasets
+def seed_dataset(path, items):
+    """Bulk-load a database with `items` SKUs, half as many orders and a matching audit trail"""
+    from bench_serializers import build_app, seed
+    from bench_read_models import seed_procurement
+    from models import db, User
+
+    app = build_app(path)
+    with app.app_context():
+        seed(items, max(items // 2, 1))
+        seed_procurement(max(items // 10, 1))
+        admin = User(username='admin', email='admin@example.com', role='admin')
+        admin.set_password('admin123')
+        db.session.add(admin)
+        db.session.commit()
+        db.engine.dispose()
+
+def worker(args):
+    """Child process: seed one size, import the app against it and run the scenarios"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        started = time.perf_counter()
+        seed_dataset(path, args.size)
+        seed_seconds = time.perf_counter() - started
+
+        os.environ['INVENTORY_DB'] = path
+        os.environ['SCHEDULER_ENABLED'] = 'false'
+        os.environ.setdefault('SQL_PROFILER_HEADERS', 'false')
+        from app import app, bus
+
+        client = TestClient(app, args.username, args.password)
+        results = run_all(client, app.url_map, args.repeat, args.only, AppCaches())
+        bus.stop()
+    json.dump({'seed_seconds': round(seed_seconds, 2), 'scenarios': results}, sys.stdout)
+
+def run_sizes(args):
+    runs = {}
+    for size in args.sizes:
+        print(f"Running {size} items...", file=sys.stderr)
+        command = [sys.executable, os.path.abspath(__file__), '--worker', '--size', str(size),
+                   '--repeat', str(args.repeat), '--username', args.username, '--password', args.password]
+        for pattern in args.only or []:
+            command += ['--only', pattern]
+        completed = subprocess.run(command, capture_output=True, text=True, cwd=SERVER_DIR)
+        if completed.returncode != 0:
+            raise RuntimeError(f'Benchmark worker for size {size} failed:\n{completed.stderr}')
+        # The app prints startup messages; the result is the last line
+        runs[str(size)] = json.loads(completed.stdout.strip().splitlines()[-1])
+    return runs
+
+def run_server(args):
+    client = HttpClient(args.server, args.username, args.password)
+    # Routes are discovered from the local code (the server is assumed to run the same
+    # version); the app is imported against a scratch database so nothing local is touched
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['INVENTORY_DB'] = os.path.join(tmp, 'routes.db')
+        os.environ['SCHEDULER_ENABLED'] = 'false'
+        from app import app, bus
+        bus.stop()
+        return {'server': {'scenarios': run_all(client, app.url_map, args.repeat, args.only)}}
+
+# Reporting
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=SERVER_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(current, baseline, metric, threshold, overrides):
+    """Return [(size, scenario, baseline value, current value, change)] for regressions"""
+    regressions = []
+    for size, run in current['runs'].items():
+        base_run = baseline['runs'].get(size)
+        if not base_run:
+            continue
+        for name, result in run['scenarios'].items():
+            base = base_run['scenarios'].get(name)
+            if not base or not base.get(metric) or result.get(metric) is None:
+                continue
+            change = result[metric] / base[metric] - 1
+            if change > overrides.get(name, threshold):
+                regressions.append((size, name, base[metric], result[metric], change))
+    return regressions
+
+def print_report(runs, metric):
+    for size, run in runs.items():
+        print(f"\n== {size} ==" + (f" (seeded in {run['seed_seconds']}s)" if 'seed_seconds' in run else ''))
+        print(f"{'scenario':<58}{'p50 ms':>9}{'p95 ms':>9}{'req/s':>9}  errors")
+        for name, result in sorted(run['scenarios'].items(), key=lambda item: -item[1][metric]):
+            errors = ', '.join(f'{status}x{count}' for status, count in result['errors'].items())
+            print(f"{name[:57]:<58}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                  f"{result['requests_per_second'] or 0:>9.1f}  {errors}")
+
+def parse_overrides(values):
+    overrides = {}
+    for value in values or []:
+        name, _, fraction = value.rpartition('=')
+        overrides[name] = float(fraction)
+    return overrides
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')], default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--only', action='append', help='Run only scenarios whose name contains this text')
+    parser.add_argument('--server', help='Benchmark a running server instead of seeded test databases')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/endpoints_<timestamp>.json)')
+    parser.add_argument('--baseline', help='Earlier results file to compare against')
+    parser.add_argument('--metric', default='p50_ms', choices=['p50_ms', 'p95_ms', 'mean_ms'])
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown as a fraction')
+    parser.add_argument('--scenario-threshold', action='append', metavar='NAME=FRACTION')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    runs = run_server(args) if args.server else run_sizes(args)
+    results = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'target': args.server or 'test-client'
+        },
+        'runs': runs
+    }
+    print_report(runs, args.metric)
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR,
+                                         f'endpoints_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.metric, args.threshold,
+                              parse_overrides(args.scenario_threshold))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline} ({args.metric}):")
+            for size, name, before, after, change in regressions:
+                print(f"  [{size}] {name}: {before:.2f} -> {after:.2f} ms (+{change * 100:.0f}%)")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline} ({args.metric}, threshold {args.threshold:.0%})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Microbenchmark: ORM instances versus lightweight read-model records for list pages
+
+For each listing it loads one page as full ORM objects and as read-model records from the
+same Core SELECT, reporting CPU time per row and peak memory per request (tracemalloc).
+
+Usage: python benchmarks/bench_read_models.py [--rows 20000] [--page-size 1000] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_serializers import build_app, seed
+from models import db, User, Vendor, Inventory, Order, PurchaseOrder, AuditLog
+from serializers import inventory_serializer, order_serializer, purchase_order_serializer, audit_log_serializer
+from read_models import fetch
+
+def seed_procurement(rows):
+    now = datetime.utcnow()
+    db.session.add(User(username='bench', email='bench@example.com', password_hash='x', role='admin'))
+    db.session.add(Vendor(name='Bench Vendor'))
+    db.session.flush()
+    db.session.bulk_insert_mappings(PurchaseOrder, [{
+        'vendor_id': 1,
+        'reference_number': f'BENCH-{i:06d}',
+        'status': 'draft',
+        'total': Decimal('100.00'),
+        'created_by': 1,
+        'created_at': now,
+        'updated_at': now
+    } for i in range(rows)])
+    db.session.bulk_insert_mappings(AuditLog, [{
+        'user_id': 1,
+        'action': 'UPDATE',
+        'table_name': 'inventory',
+        'record_id': i,
+        'old_values': '{"quantity": 1}',
+        'new_values': '{"quantity": 2}',
+        'ip_address': '127.0.0.1',
+        'created_at': now
+    } for i in range(rows)])
+    db.session.commit()
+
+def measure(func, repeat):
+    """Return (ms per call, peak KiB for one call)"""
+    func()
+    db.session.expunge_all()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+        db.session.expunge_all()
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    db.session.expunge_all()
+    return elapsed, peak / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    size = args.page_size
+
+    listings = [
+        ('inventory', Inventory, inventory_serializer, Inventory.name),
+        ('orders', Order, order_serializer, Order.created_at.desc()),
+        ('purchase_orders', PurchaseOrder, purchase_order_serializer, PurchaseOrder.created_at.desc()),
+        ('logs', AuditLog, audit_log_serializer, AuditLog.created_at.desc())
+    ]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            seed(args.rows, args.rows)
+            seed_procurement(args.rows)
+
+            for name, model, serializer, order_by in listings:
+                # Row-level fields only, so both paths read the same columns
+                compiled = serializer.compile([field for field in serializer.field_names
+                                               if not serializer.by_name[field].nested])
+                statement = compiled.select().order_by(order_by).limit(size)
+
+                orm_ms, orm_kb = measure(lambda: model.query.order_by(order_by).limit(size).all(), args.repeat)
+                record_ms, record_kb = measure(lambda: fetch(statement, compiled.record), args.repeat)
+                results.append((name, orm_ms, orm_kb, record_ms, record_kb))
+
+    print(f"{args.rows} rows per table, page size {size}, {args.repeat} runs\n")
+    print(f"{'listing':<18}{'ORM us/row':>12}{'record us/row':>15}{'ORM KiB':>10}{'record KiB':>12}")
+    for name, orm_ms, orm_kb, record_ms, record_kb in results:
+        print(f"{name:<18}{orm_ms * 1000 / size:>12.2f}{record_ms * 1000 / size:>15.2f}"
+              f"{orm_kb:>10.0f}{record_kb:>12.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Microbenchmark: ORM + to_dict() + jsonify versus precompiled serializers over row tuples
+
+Builds a throwaway SQLite database with synthetic inventory and orders, then times one
+page of each list endpoint through both paths.
+
+Usage: python benchmarks/bench_serializers.py [--items 5000] [--orders 2000] [--page-size 500] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from models import db, Category, Inventory, Order, OrderItem
+from audit_store import database_binds
+from serializers import inventory_serializer, order_serializer, list_response, FastJSONProvider, orjson
+from fragments import fragment_cache
+
+def build_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_BINDS'] = database_binds(path)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+def seed(items, orders):
+    now = datetime.utcnow()
+    db.create_all()
+    db.session.bulk_insert_mappings(Category, [{'name': f'Category {i}', 'created_at': now} for i in range(1, 21)])
+    db.session.bulk_insert_mappings(Inventory, [{
+        'name': f'Item {i:06d}',
+        'category_id': i % 20 + 1,
+        'quantity': i % 150,
+        'price': Decimal('19.99'),
+        'price_per_uom': Decimal('19.99'),
+        'unit_of_measure': 'pcs',
+        'base_unit': 'pcs',
+        'sku': f'SKU-{i:06d}',
+        'description': 'Synthetic benchmark item',
+        'min_stock_level': 10,
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now
+    } for i in range(1, items + 1)])
+    db.session.bulk_insert_mappings(Order, [{
+        'customer_name': f'Customer {i}',
+        'customer_email': f'customer{i}@example.com',
+        'status': 'completed',
+        'total': Decimal('59.97'),
+        'created_at': now - timedelta(minutes=i),
+        'updated_at': now
+    } for i in range(1, orders + 1)])
+    db.session.bulk_insert_mappings(OrderItem, [{
+        'order_id': i // 3 + 1,
+        'inventory_id': i % items + 1,
+        'quantity': 3,
+        'unit_price': Decimal('19.99'),
+        'total_price': Decimal('59.97'),
+        'unit_of_measure': 'pcs',
+        'price_per_uom': Decimal('19.99')
+    } for i in range(orders * 3)])
+    db.session.commit()
+
+def timed(func, repeat):
+    func()  # Warm up caches and compiled statements
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            seed(args.items, args.orders)
+            size = args.page_size
+
+            def inventory_orm():
+                items = Inventory.query.filter_by(is_active=True).order_by(Inventory.name).limit(size).all()
+                return jsonify({'inventory': [item.to_dict() for item in items]}).get_data()
+
+            def cold(func):
+                def run():
+                    fragment_cache.clear()
+                    return func()
+                return run
+
+            def inventory_fast():
+                serializer = inventory_serializer.compile()
+                rows = db.session.execute(
+                    serializer.select().where(Inventory.is_active == True).order_by(Inventory.name).limit(size)
+                ).all()
+                return list_response('inventory', serializer.encode_list(rows)).get_data()
+
+            def orders_orm():
+                orders = Order.query.order_by(Order.created_at.desc()).limit(size).all()
+                return jsonify({'orders': [order.to_dict() for order in orders]}).get_data()
+
+            def orders_fast():
+                serializer = order_serializer.compile()
+                rows = db.session.execute(serializer.select().order_by(Order.created_at.desc()).limit(size)).all()
+                return list_response('orders', serializer.encode_list(rows)).get_data()
+
+            results = [
+                ('inventory', 'to_dict + jsonify', timed(inventory_orm, args.repeat)),
+                ('inventory', 'serializer', timed(cold(inventory_fast), args.repeat)),
+                ('inventory', 'serializer + fragment cache', timed(inventory_fast, args.repeat)),
+                ('orders', 'to_dict + jsonify', timed(orders_orm, args.repeat)),
+                ('orders', 'serializer', timed(cold(orders_fast), args.repeat)),
+                ('orders', 'serializer + fragment cache', timed(orders_fast, args.repeat))
+            ]
+
+            # Payload encoder alone: standard provider versus the swappable fast provider
+            payload = {'inventory': [item.to_dict() for item in Inventory.query.limit(size).all()]}
+            standard = app.json
+            fast = FastJSONProvider(app)
+            results.append(('encoder', 'json (default provider)', timed(lambda: standard.dumps(payload), args.repeat)))
+            results.append(('encoder', 'orjson' if orjson else 'json (orjson not installed)',
+                            timed(lambda: fast.dumps(payload), args.repeat)))
+
+    print(f"{args.items} items, {args.orders} orders, page size {size}, {args.repeat} runs\n")
+    print(f"{'endpoint':<12}{'path':<32}{'ms/page':>10}")
+    for endpoint, path, ms in results:
+        print(f"{endpoint:<12}{path:<32}{ms:>10.2f}")
+    for endpoint in ('inventory', 'orders'):
+        orm_ms, fast_ms, cached_ms = [ms for name, _, ms in results if name == endpoint]
+        print(f"{endpoint}: {orm_ms / fast_ms:.1f}x faster, {orm_ms / cached_ms:.1f}x with warm fragments")
+
+if __name__ == '__main__':
+    main()
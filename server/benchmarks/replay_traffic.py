@@ -0,0 +1,265 @@
+"""
+Replay captured traffic against a running instance and compare latency distributions
+
+Reads the records written by traffic_capture (logs/traffic.jsonl and its rotated .gz
+archives, oldest first) and re-issues them over HTTP with their original spacing, divided
+by --speed (--speed 0 sends as fast as --concurrency allows). Placeholders from sanitizing
+are filled back in: "<str:N>" becomes a unique string of length N, and logins use the
+credentials given for the recorded role. Each request is sent as the recorded role. Ids are
+replayed as recorded, so the target should hold a copy of the captured database; writes
+that depend on rows created during the capture may be answered differently, which the
+report counts per route.
+
+Per route, the recorded latency (p50/p95/p99) is reported next to the replayed one. The
+results are written as JSON in the bench_endpoints layout, so --baseline compares against
+an earlier replay (for example of the previous build) and exits with status 1 on
+regressions beyond --threshold.
+
+Usage:
+  python benchmarks/replay_traffic.py [logs/traffic*.jsonl*] --server http://127.0.0.1:5001 [--speed 5]
+  python benchmarks/replay_traffic.py --read-only --credentials staff=staff1:staff123 --baseline previous.json
+"""
+
+import argparse
+import glob
+import gzip
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlencode
+
+from bench_endpoints import HttpClient, DEFAULT_RESULTS_DIR, SERVER_DIR, compare, git_commit, parse_overrides
+
+DEFAULT_CAPTURE = os.path.join(SERVER_DIR, 'logs', 'traffic.jsonl')
+
+_PLACEHOLDER = re.compile(r'<str:(\d+)>$')
+_counter = itertools.count(1)
+
+def capture_files(patterns):
+    """Capture files oldest first: traffic.N.jsonl.gz ... traffic.1.jsonl.gz, then traffic.jsonl"""
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(pattern))
+
+    def age(path):
+        match = re.search(r'\.(\d+)\.jsonl\.gz$', path)
+        return -int(match.group(1)) if match else 0
+
+    return sorted(paths, key=lambda path: (age(path), path))
+
+def read_records(paths, read_only=False, limit=None):
+    records = []
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash or an unflushed write
+                if read_only and record['m'] not in ('GET', 'HEAD'):
+                    continue
+                records.append(record)
+    records.sort(key=lambda record: record['t'])
+    return records[:limit] if limit else records
+
+def fill(value):
+    """Undo sanitizing: placeholders become unique strings of the recorded length"""
+    if isinstance(value, dict):
+        return {k: fill(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(v) for v in value]
+    if value == '<secret>':
+        return 'replay-secret'
+    if isinstance(value, str):
+        match = _PLACEHOLDER.match(value)
+        if match:
+            length = int(match.group(1))
+            text = f'r{next(_counter):x}'
+            return (text + 'x' * length)[:max(length, len(text))]
+    return value
+
+class Replayer:
+    def __init__(self, server, credentials, default_role):
+        self.server = server
+        self.credentials = credentials
+        self.default_role = default_role
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def client(self, role):
+        role = role if role in self.credentials else self.default_role
+        with self.lock:
+            if role not in self.clients:
+                username, password = self.credentials[role]
+                self.clients[role] = HttpClient(self.server, username, password)
+            return self.clients[role]
+
+    def send(self, record):
+        client = self.client(record.get('role'))
+        path = record['p']
+        if record.get('q'):
+            path += '?' + urlencode(fill(record['q']), doseq=True)
+        if record['r'] == '/api/auth/login':
+            username, password = self.credentials[self.default_role]
+            body = {'username': username, 'password': password}
+        else:
+            body = fill(record.get('b'))
+        started = time.perf_counter()
+        try:
+            status, _ = client.request(record['m'], path, body)
+        except Exception:
+            status = 0
+        return status, time.perf_counter() - started
+
+def replay(records, replayer, speed, concurrency):
+    """Send every record at its scheduled offset; returns [(record, status, seconds, lag)]"""
+    results = [None] * len(records)
+    if not records:
+        return results
+    first = records[0]['t']
+    started = time.perf_counter()
+
+    def task(i, scheduled):
+        lag = time.perf_counter() - scheduled
+        status, seconds = replayer.send(records[i])
+        results[i] = (records[i], status, seconds, lag)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, record in enumerate(records):
+            scheduled = started + ((record['t'] - first) / speed if speed else 0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(task, i, scheduled)
+            if i and i % 1000 == 0:
+                print(f"  {i}/{len(records)} sent", file=sys.stderr)
+    return results
+
+def distribution(latencies_ms):
+    latencies_ms = sorted(latencies_ms)
+    pick = lambda fraction: round(latencies_ms[min(int(len(latencies_ms) * fraction), len(latencies_ms) - 1)], 3)
+    return {
+        'calls': len(latencies_ms),
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 3),
+        'p50_ms': pick(0.5),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': round(latencies_ms[-1], 3)
+    }
+
+def summarize(results):
+    """Recorded and replayed distributions per 'METHOD rule', in the bench_endpoints layout"""
+    recorded, replayed, errors, mismatched = {}, {}, {}, {}
+    for record, status, seconds, _ in results:
+        name = f"{record['m']} {record['r'] or 'unmatched'}"
+        recorded.setdefault(name, []).append(record['d'])
+        replayed.setdefault(name, []).append(seconds * 1000)
+        if status >= 400 or status == 0:
+            errors.setdefault(name, {}).setdefault(str(status), 0)
+            errors[name][str(status)] += 1
+        if status != record['s']:
+            mismatched[name] = mismatched.get(name, 0) + 1
+    return {
+        'recorded': {'scenarios': {name: {**distribution(values), 'errors': {}} for name, values in recorded.items()}},
+        'replay': {'scenarios': {name: {
+            **distribution(values),
+            'errors': errors.get(name, {}),
+            'status_mismatches': mismatched.get(name, 0)
+        } for name, values in replayed.items()}}
+    }
+
+def print_report(runs, lags):
+    recorded = runs['recorded']['scenarios']
+    replayed = runs['replay']['scenarios']
+    print(f"\n{'route':<52}{'calls':>7}{'rec p50':>9}{'p50':>9}{'rec p95':>9}{'p95':>9}{'rec p99':>9}{'p99':>9}  status")
+    for name in sorted(replayed, key=lambda name: -replayed[name]['calls']):
+        before, after = recorded[name], replayed[name]
+        mismatches = f"{after['status_mismatches']} differ" if after['status_mismatches'] else ''
+        print(f"{name[:51]:<52}{after['calls']:>7}{before['p50_ms']:>9.2f}{after['p50_ms']:>9.2f}"
+              f"{before['p95_ms']:>9.2f}{after['p95_ms']:>9.2f}{before['p99_ms']:>9.2f}{after['p99_ms']:>9.2f}  {mismatches}")
+    if lags:
+        lags = sorted(lags)
+        print(f"\nSchedule lag p50 {lags[len(lags) // 2] * 1000:.1f} ms, max {lags[-1] * 1000:.1f} ms "
+              f"(raise --concurrency if this grows)")
+
+def parse_credentials(values):
+    credentials = {'admin': ('admin', 'admin123')}
+    for value in values or []:
+        role, _, login = value.partition('=')
+        username, _, password = login.partition(':')
+        credentials[role] = (username, password)
+    return credentials
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('captures', nargs='*', help='Capture files or globs (default: logs/traffic*.jsonl*)')
+    parser.add_argument('--server', default='http://127.0.0.1:5001')
+    parser.add_argument('--speed', type=float, default=1.0, help='Time compression; 0 sends without pauses')
+    parser.add_argument('--concurrency', type=int, default=16, help='Maximum requests in flight')
+    parser.add_argument('--read-only', action='store_true', help='Replay only GET and HEAD requests')
+    parser.add_argument('--limit', type=int, help='Replay only the first N records')
+    parser.add_argument('--credentials', action='append', metavar='ROLE=USER:PASSWORD',
+                        help='Login per recorded role (default admin=admin:admin123; other roles use --default-role)')
+    parser.add_argument('--default-role', default='admin')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/replay_<timestamp>.json)')
+    parser.add_argument('--baseline', help='Earlier replay results to compare against')
+    parser.add_argument('--metric', default='p95_ms', choices=['p50_ms', 'p95_ms', 'p99_ms', 'mean_ms'])
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown as a fraction')
+    parser.add_argument('--scenario-threshold', action='append', metavar='NAME=FRACTION')
+    args = parser.parse_args()
+
+    credentials = parse_credentials(args.credentials)
+    if args.default_role not in credentials:
+        parser.error(f'No --credentials for the default role {args.default_role}')
+    base, ext = os.path.splitext(DEFAULT_CAPTURE)
+    paths = capture_files(args.captures or [DEFAULT_CAPTURE, f'{base}.*{ext}.gz'])
+    records = read_records(paths, args.read_only, args.limit)
+    if not records:
+        parser.error('No captured requests found')
+    span = records[-1]['t'] - records[0]['t']
+    print(f"Replaying {len(records)} requests from {len(paths)} file(s), recorded over {span:.0f}s, "
+          f"at {'full' if not args.speed else f'{args.speed:g}x'} speed", file=sys.stderr)
+
+    results = replay(records, Replayer(args.server, credentials, args.default_role), args.speed, args.concurrency)
+    runs = summarize(results)
+    print_report(runs, [lag for _, _, _, lag in results] if args.speed else None)
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f'replay_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    summary = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': git_commit(),
+            'target': args.server,
+            'captures': paths,
+            'requests': len(records),
+            'speed': args.speed,
+            'read_only': args.read_only
+        },
+        'runs': runs
+    }
+    with open(output, 'w') as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = [item for item in compare(summary, baseline, args.metric, args.threshold,
+                                                parse_overrides(args.scenario_threshold)) if item[0] == 'replay']
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline} ({args.metric}):")
+            for _, name, before, after, change in regressions:
+                print(f"  {name}: {before:.2f} -> {after:.2f} ms (+{change * 100:.0f}%)")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline} ({args.metric}, threshold {args.threshold:.0%})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,461 @@
+"""
+Concurrency stress test: stock correctness and write throughput under contention
+
+Hammers POST /api/orders and POST /api/purchase-orders/<id>/receive on a handful of hot
+SKUs from 1, 2, 4, ... concurrent workers (threads sharing one app, or processes each
+importing their own, like a multi-worker deployment). Before each level the hot SKUs are
+reset to a known stock through an adjustment movement and approved purchase orders are
+created for them; some receives deliberately target the same purchase order twice.
+
+After each level the database is checked:
+  - no hot SKU has negative stock
+  - final stock = starting stock - ordered quantities + received quantities (no lost updates)
+  - the orders and receipts acknowledged to clients are exactly the ones persisted
+  - the stock ledger sums to the current quantity
+  - no purchase order line was received twice
+
+Reported per level: throughput, latency percentiles, lock wait (time spent in write
+statements and COMMIT, where SQLite blocks on the writer lock; the concurrency 1 figure is
+the uncontended cost) and the error breakdown. Exits with status 1 when an invariant fails.
+
+Usage:
+  python benchmarks/stress_stock.py [--levels 1,2,4,8,16] [--ops 400] [--mode threads|processes]
+  python benchmarks/stress_stock.py --server http://127.0.0.1:5001 --db /path/to/copy-of-inventory.db
+
+With --server the harness writes stock resets and purchase orders straight into --db, which
+must be the server's database file: point the server at a scratch copy (INVENTORY_DB).
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from bench_endpoints import TestClient, HttpClient, seed_dataset, DEFAULT_RESULTS_DIR, git_commit
+
+class LockTimer:
+    """Per-thread seconds spent in write statements and COMMIT"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def install(self, app):
+        from sqlalchemy import event
+        from sqlalchemy.orm import Session
+        from models import db
+
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_statement)
+            event.listen(db.engine, 'after_cursor_execute', self._after_statement)
+            event.listen(db.engine, 'commit', self._before_commit)
+        event.listen(Session, 'after_commit', self._after_commit)
+
+    def seconds(self):
+        return getattr(self._local, 'seconds', 0.0)
+
+    def _add(self, started):
+        if started is not None:
+            self._local.seconds = self.seconds() + time.perf_counter() - started
+
+    def _before_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(('SELECT', 'WITH', 'PRAGMA')):
+            self._local.statement_started = time.perf_counter()
+
+    def _after_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self._add(getattr(self._local, 'statement_started', None))
+        self._local.statement_started = None
+
+    def _before_commit(self, conn):
+        self._local.commit_started = time.perf_counter()
+
+    def _after_commit(self, session):
+        self._add(getattr(self._local, 'commit_started', None))
+        self._local.commit_started = None
+
+def classify(status, body):
+    """Outcome category; stock and duplicate-receive rejections are expected under load"""
+    error = (body or {}).get('error', '') if isinstance(body, dict) else ''
+    if status in (200, 201):
+        return 'ok'
+    if status == 400 and 'Insufficient stock' in error:
+        return 'insufficient_stock'
+    if status == 400 and 'Only approved' in error:
+        return 'already_received'
+    if 'locked' in error or 'busy' in error:
+        return 'database_locked'
+    if 'QueuePool' in error:
+        return 'pool_timeout'
+    return 'server_error' if status >= 500 else f'http_{status}'
+
+def run_ops(client, ops, start_at, lock_timer=None):
+    """Run one worker's operations, starting at the shared wall-clock time"""
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    outcomes = []
+    for op in ops:
+        if op['kind'] == 'order':
+            path, body = '/api/orders', {
+                'customer_name': op['customer'],
+                'items': [{'inventory_id': sku, 'quantity': quantity} for sku, quantity in op['lines']]
+            }
+        else:
+            path, body = f'/api/purchase-orders/{op["po_id"]}/receive', {
+                'items': [{'id': line_id, 'received_quantity': quantity} for line_id, _, quantity in op['lines']]
+            }
+        waited = lock_timer.seconds() if lock_timer else 0.0
+        started = time.perf_counter()
+        try:
+            status, response = client.request('POST', path, body)
+            category = classify(status, response)
+        except Exception as e:
+            response, category = {'error': str(e)}, 'transport_error'
+        outcome = {
+            'kind': op['kind'],
+            'category': category,
+            'seconds': time.perf_counter() - started,
+            'lock_wait': lock_timer.seconds() - waited if lock_timer else None
+        }
+        if category == 'ok' and op['kind'] == 'order':
+            outcome['lines'] = op['lines']
+        elif category == 'ok':
+            outcome['po_id'] = op['po_id']
+        elif category not in ('insufficient_stock', 'already_received'):
+            outcome['error'] = str((response or {}).get('error', ''))[:200] if isinstance(response, dict) else ''
+        outcomes.append(outcome)
+    return {'finished_at': time.time(), 'outcomes': outcomes}
+
+# Workers
+def process_worker(path, username, password, tasks, results):
+    """Child process: import the app against the shared database and run batches on request"""
+    os.environ['INVENTORY_DB'] = path
+    os.environ['SCHEDULER_ENABLED'] = 'false'
+    os.environ.setdefault('SQL_PROFILER_HEADERS', 'false')
+    sys.stdout = open(os.devnull, 'w')  # startup banners
+    from app import app, bus
+
+    client = TestClient(app, username, password)
+    timer = LockTimer()
+    timer.install(app)
+    results.put('ready')
+    for ops, start_at in iter(tasks.get, None):
+        results.put(run_ops(client, ops, start_at, timer))
+    bus.stop()
+
+class ThreadRunner:
+    def __init__(self, clients, lock_timer=None):
+        self.clients = clients
+        self.lock_timer = lock_timer
+
+    def run(self, batches, start_at):
+        reports = [None] * len(batches)
+
+        def target(i):
+            reports[i] = run_ops(self.clients[i], batches[i], start_at, self.lock_timer)
+
+        threads = [threading.Thread(target=target, args=(i,)) for i in range(len(batches))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return reports
+
+    def close(self):
+        pass
+
+class ProcessRunner:
+    def __init__(self, path, count, username, password):
+        context = multiprocessing.get_context('spawn')
+        self.results = context.Queue()
+        self.tasks = []
+        self.processes = []
+        # Started one at a time so app startup work does not contend with itself
+        for _ in range(count):
+            tasks = context.Queue()
+            process = context.Process(target=process_worker, args=(path, username, password, tasks, self.results),
+                                      daemon=True)
+            process.start()
+            if self.results.get(timeout=300) != 'ready':
+                raise RuntimeError('Worker process failed to start')
+            self.tasks.append(tasks)
+            self.processes.append(process)
+
+    def run(self, batches, start_at):
+        for tasks, ops in zip(self.tasks, batches):
+            tasks.put((ops, start_at))
+        return [self.results.get() for _ in batches]
+
+    def close(self):
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=30)
+
+# Database setup and checks (plain sqlite3, outside the app)
+def connect(path):
+    return sqlite3.connect(path, timeout=60, isolation_level=None)
+
+def pick_hot_skus(path, count):
+    with connect(path) as conn:
+        rows = conn.execute('SELECT id FROM inventory WHERE is_active = 1 ORDER BY id LIMIT ?', (count,)).fetchall()
+    if len(rows) < count:
+        raise RuntimeError(f'Need {count} active inventory items, found {len(rows)}')
+    return [row[0] for row in rows]
+
+def prepare_level(path, level, hot, stock, purchase_orders, rng):
+    """Reset hot stock through adjustment movements and create approved purchase orders"""
+    from versioning import bump_connection
+
+    now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    conn = connect(path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        user_id = conn.execute("SELECT id FROM users WHERE role = 'admin' ORDER BY id LIMIT 1").fetchone()[0]
+        vendor_id = conn.execute('SELECT id FROM vendors ORDER BY id LIMIT 1').fetchone()[0]
+        for sku in hot:
+            current = conn.execute('SELECT quantity FROM inventory WHERE id = ?', (sku,)).fetchone()[0]
+            if current != stock:
+                conn.execute('UPDATE inventory SET quantity = ?, updated_at = ? WHERE id = ?', (stock, now, sku))
+                conn.execute("INSERT INTO stock_movements (inventory_id, quantity_change, reason, user_id, created_at) "
+                             "VALUES (?, ?, 'adjustment', ?, ?)", (sku, stock - current, user_id, now))
+
+        po_lines = {}
+        for i in range(purchase_orders):
+            lines = [(sku, rng.randint(5, 20)) for sku in rng.sample(hot, min(len(hot), rng.randint(1, 2)))]
+            po_id = conn.execute(
+                "INSERT INTO purchase_orders (vendor_id, reference_number, status, total, notes, created_by, "
+                "created_at, updated_at) VALUES (?, ?, 'approved', ?, 'stress test', ?, ?, ?)",
+                (vendor_id, f'STRESS-{level}-{i}-{time.time_ns()}', float(sum(q for _, q in lines)), user_id, now, now)
+            ).lastrowid
+            po_lines[po_id] = [(conn.execute(
+                "INSERT INTO purchase_order_items (purchase_order_id, inventory_id, quantity, unit_price, total_price, "
+                "received_quantity, unit_of_measure, price_per_uom) VALUES (?, ?, ?, 1.0, ?, 0, 'pcs', 1.0)",
+                (po_id, sku, quantity, float(quantity))
+            ).lastrowid, sku, quantity) for sku, quantity in lines]
+
+        bump_connection(conn, ('inventory', 'stock_movements', 'purchase_orders', 'purchase_order_items'), now)
+        max_order = conn.execute('SELECT COALESCE(MAX(id), 0) FROM orders').fetchone()[0]
+        max_movement = conn.execute('SELECT COALESCE(MAX(id), 0) FROM stock_movements').fetchone()[0]
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+    return {'max_order': max_order, 'max_movement': max_movement, 'po_lines': po_lines}
+
+def plan_operations(level, ops, hot, po_lines, receive_share, rng):
+    """Receives of every new purchase order plus repeats of random ones, then orders"""
+    receives = round(ops * receive_share)
+    po_ids = list(po_lines)
+    targets = po_ids + [rng.choice(po_ids) for _ in range(receives - len(po_ids))] if po_ids else []
+    plan = [{'kind': 'receive', 'po_id': po_id, 'lines': po_lines[po_id]} for po_id in targets]
+    for i in range(ops - len(plan)):
+        lines = [(sku, rng.randint(1, 3)) for sku in rng.sample(hot, min(len(hot), rng.randint(1, 2)))]
+        plan.append({'kind': 'order', 'customer': f'Stress {level}-{i}', 'lines': lines})
+    rng.shuffle(plan)
+    return plan
+
+def check_invariants(path, hot, stock, snapshot, outcomes):
+    violations = []
+    marks = ','.join('?' * len(hot))
+    po_ids = list(snapshot['po_lines'])
+    po_marks = ','.join('?' * len(po_ids)) or 'NULL'
+    with connect(path) as conn:
+        final = dict(conn.execute(f'SELECT id, quantity FROM inventory WHERE id IN ({marks})', hot).fetchall())
+        sold = dict(conn.execute(
+            f'SELECT inventory_id, SUM(quantity) FROM order_items WHERE order_id > ? AND inventory_id IN ({marks}) '
+            'GROUP BY inventory_id', [snapshot['max_order']] + hot).fetchall())
+        received = dict(conn.execute(
+            f'SELECT inventory_id, SUM(received_quantity) FROM purchase_order_items '
+            f'WHERE purchase_order_id IN ({po_marks}) GROUP BY inventory_id', po_ids).fetchall())
+        ledger = dict(conn.execute(
+            f'SELECT inventory_id, SUM(quantity_change) FROM stock_movements WHERE inventory_id IN ({marks}) '
+            'GROUP BY inventory_id', hot).fetchall())
+        received_pos = {row[0] for row in conn.execute(
+            f"SELECT id FROM purchase_orders WHERE id IN ({po_marks}) AND status = 'received'", po_ids)}
+        receipt_counts = conn.execute(
+            "SELECT reference_id, inventory_id, COUNT(*) FROM stock_movements "
+            "WHERE reason = 'po_receipt' AND id > ? GROUP BY reference_id, inventory_id",
+            (snapshot['max_movement'],)).fetchall()
+
+    acked_sold = {}
+    acked_pos = []
+    for outcome in outcomes:
+        for sku, quantity in outcome.get('lines', []):
+            acked_sold[sku] = acked_sold.get(sku, 0) + quantity
+        if 'po_id' in outcome:
+            acked_pos.append(outcome['po_id'])
+
+    for sku in hot:
+        quantity = final[sku]
+        expected = stock - sold.get(sku, 0) + received.get(sku, 0)
+        if quantity < 0:
+            violations.append(f'SKU {sku}: negative stock {quantity}')
+        if quantity != expected:
+            violations.append(f'SKU {sku}: stock {quantity}, orders and receipts imply {expected} (lost update)')
+        if sold.get(sku, 0) != acked_sold.get(sku, 0):
+            violations.append(f'SKU {sku}: {sold.get(sku, 0)} units ordered in the database, '
+                              f'{acked_sold.get(sku, 0)} acknowledged to clients')
+        if ledger.get(sku, 0) != quantity:
+            violations.append(f'SKU {sku}: ledger sums to {ledger.get(sku, 0)}, stock is {quantity}')
+    if len(acked_pos) != len(set(acked_pos)):
+        violations.append(f'{len(acked_pos) - len(set(acked_pos))} purchase order(s) acknowledged as received twice')
+    if set(acked_pos) != received_pos:
+        violations.append(f'{len(received_pos)} purchase orders received in the database, '
+                          f'{len(set(acked_pos))} acknowledged to clients')
+    lines_per_po = {(po_id, sku): 0 for po_id, lines in snapshot['po_lines'].items() for _, sku, _ in lines}
+    for po_id, lines in snapshot['po_lines'].items():
+        for _, sku, _ in lines:
+            lines_per_po[(po_id, sku)] += 1
+    doubled = [(po_id, sku) for po_id, sku, count in receipt_counts
+               if (po_id, sku) in lines_per_po and count > lines_per_po[(po_id, sku)]]
+    if doubled:
+        violations.append(f'{len(doubled)} purchase order line(s) received more than once')
+    return violations
+
+# Reporting
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def summarize(level, reports, start_at, violations):
+    outcomes = [outcome for report in reports for outcome in report['outcomes']]
+    elapsed = max(report['finished_at'] for report in reports) - start_at
+    errors = {}
+    for outcome in outcomes:
+        errors[outcome['category']] = errors.get(outcome['category'], 0) + 1
+    latencies = [outcome['seconds'] * 1000 for outcome in outcomes]
+    waits = [outcome['lock_wait'] * 1000 for outcome in outcomes if outcome['lock_wait'] is not None]
+    samples = [outcome['error'] for outcome in outcomes if outcome.get('error')]
+    ok = errors.get('ok', 0)
+    return {
+        'concurrency': level,
+        'operations': len(outcomes),
+        'seconds': round(elapsed, 3),
+        'throughput_per_second': round(len(outcomes) / elapsed, 1),
+        'successful_writes_per_second': round(ok / elapsed, 1),
+        'orders_ok': sum(1 for o in outcomes if o['kind'] == 'order' and o['category'] == 'ok'),
+        'receives_ok': sum(1 for o in outcomes if o['kind'] == 'receive' and o['category'] == 'ok'),
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'lock_wait_mean_ms': round(sum(waits) / len(waits), 2) if waits else None,
+        'lock_wait_p95_ms': round(percentile(waits, 0.95), 2) if waits else None,
+        'lock_wait_total_s': round(sum(waits) / 1000, 2) if waits else None,
+        'outcomes': errors,
+        'error_samples': sorted(set(samples))[:5],
+        'violations': violations
+    }
+
+def print_report(levels):
+    print(f"\n{'workers':>7}{'ops/s':>9}{'ok/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'wait ms':>9}{'wait p95':>10}  outcomes")
+    for result in levels:
+        outcomes = ', '.join(f'{name} {count}' for name, count in sorted(result['outcomes'].items()))
+        wait, wait_p95 = (f'{value:.2f}' if value is not None else '-'
+                          for value in (result['lock_wait_mean_ms'], result['lock_wait_p95_ms']))
+        print(f"{result['concurrency']:>7}{result['throughput_per_second']:>9.1f}"
+              f"{result['successful_writes_per_second']:>8.1f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+              f"{result['p99_ms']:>9.2f}{wait:>9}{wait_p95:>10}  {outcomes}")
+        for sample in result['error_samples']:
+            print(f"{'':>9}error: {sample}")
+        for violation in result['violations']:
+            print(f"{'':>9}VIOLATION: {violation}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--levels', type=lambda value: [int(level) for level in value.split(',')], default=[1, 2, 4, 8, 16])
+    parser.add_argument('--ops', type=int, default=400, help='Operations per concurrency level')
+    parser.add_argument('--mode', choices=['threads', 'processes'], default='threads')
+    parser.add_argument('--hot-skus', type=int, default=5)
+    parser.add_argument('--stock', type=int, default=50, help='Stock of each hot SKU at the start of a level')
+    parser.add_argument('--receive-share', type=float, default=0.2, help='Fraction of operations that receive a PO')
+    parser.add_argument('--duplicate-share', type=float, default=0.1, help='Fraction of receives that repeat a PO')
+    parser.add_argument('--items', type=int, default=1000, help='Size of the seeded database')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--server', help='Run against a live server over HTTP (requires --db)')
+    parser.add_argument('--db', help="The server's database file, for setup and checks")
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/stress_<timestamp>.json)')
+    args = parser.parse_args()
+    if args.server and not args.db:
+        parser.error('--server needs --db')
+
+    tmp = tempfile.TemporaryDirectory()
+    if args.server:
+        path = os.path.abspath(args.db)
+    else:
+        path = os.path.join(tmp.name, 'stress.db')
+        print(f"Seeding {args.items} items...", file=sys.stderr)
+        seed_dataset(path, args.items)
+    hot = pick_hot_skus(path, args.hot_skus)
+    workers = max(args.levels)
+
+    bus = None
+    if args.server:
+        runner = ThreadRunner([HttpClient(args.server, args.username, args.password) for _ in range(workers)])
+    elif args.mode == 'processes':
+        print(f"Starting {workers} worker processes...", file=sys.stderr)
+        runner = ProcessRunner(path, workers, args.username, args.password)
+    else:
+        os.environ['INVENTORY_DB'] = path
+        os.environ['SCHEDULER_ENABLED'] = 'false'
+        os.environ.setdefault('SQL_PROFILER_HEADERS', 'false')
+        from app import app, bus
+        timer = LockTimer()
+        timer.install(app)
+        runner = ThreadRunner([TestClient(app, args.username, args.password) for _ in range(workers)], timer)
+
+    rng = random.Random(args.seed)
+    results = []
+    try:
+        for level in args.levels:
+            print(f"Concurrency {level}...", file=sys.stderr)
+            receives = round(args.ops * args.receive_share)
+            snapshot = prepare_level(path, level, hot, args.stock, receives - round(receives * args.duplicate_share), rng)
+            plan = plan_operations(level, args.ops, hot, snapshot['po_lines'], args.receive_share, rng)
+            batches = [plan[i::level] for i in range(level)]
+            start_at = time.time() + 0.5
+            reports = runner.run(batches, start_at)
+            outcomes = [outcome for report in reports for outcome in report['outcomes']]
+            violations = check_invariants(path, hot, args.stock, snapshot, outcomes)
+            results.append(summarize(level, reports, start_at, violations))
+    finally:
+        runner.close()
+        if bus is not None:
+            bus.stop()
+        tmp.cleanup()
+
+    print_report(results)
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f'stress_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'timestamp': datetime.utcnow().isoformat(),
+                'commit': git_commit(),
+                'target': args.server or args.mode,
+                'ops_per_level': args.ops,
+                'hot_skus': hot,
+                'stock': args.stock,
+                'receive_share': args.receive_share,
+                'duplicate_share': args.duplicate_share
+            },
+            'levels': results
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if any(result['violations'] for result in results):
+        print("\nInvariant violations found")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Process-local caches of small reference tables, dropped through the invalidation bus
+"""
+
+from models import db, User, Category, Vendor
+from invalidation import CachedValue, ReadThroughCache
+from collections import namedtuple
+
+Principal = namedtuple('Principal', ['id', 'username', 'role', 'is_active'])
+CategoryRef = namedtuple('CategoryRef', ['id', 'name', 'description'])
+VendorRef = namedtuple('VendorRef', ['id', 'name', 'is_active'])
+
+def _load_principals():
+    return {row.id: Principal(*row) for row in db.session.query(
+        User.id, User.username, User.role, User.is_active
+    ).all()}
+
+def _load_categories(ids):
+    return {row.id: CategoryRef(*row) for row in db.session.query(
+        Category.id, Category.name, Category.description
+    ).filter(Category.id.in_(ids)).all()}
+
+def _load_vendors(ids):
+    return {row.id: VendorRef(*row) for row in db.session.query(
+        Vendor.id, Vendor.name, Vendor.is_active
+    ).filter(Vendor.id.in_(ids)).all()}
+
+principals = CachedValue('principals', ('users',), _load_principals)
+categories = ReadThroughCache('categories', 'categories', _load_categories)
+vendors = ReadThroughCache('vendors', 'vendors', _load_vendors)
+
+# Per-id caches by table, for callers that warm a batch of ids at once
+reference_caches = {'categories': categories, 'vendors': vendors}
+
+def get_principal(user_id):
+    """Return the cached id/username/role/is_active of a user, or None"""
+    return principals.get().get(user_id)
+
+def category_name(category_id):
+    category = categories.get(category_id)
+    return category.name if category else None
+
+def vendor_name(vendor_id):
+    vendor = vendors.get(vendor_id)
+    return vendor.name if vendor else None
@@ -0,0 +1,254 @@
+"""
+Cold storage for closed orders and purchase orders
+
+Orders that were delivered, completed or cancelled and purchase orders that were received
+move, with their line items, into an archive file next to the main database (inventory.db ->
+inventory-archive.db) once they are older than ARCHIVE_AFTER_DAYS. The hot tables, and every
+count, analytics query and backup over them, then only carry the open and recent records.
+
+The archive file is attached to every connection of the main engine as schema `archive`, with
+tables of the same layout and the same ids as the hot ones. Reads stay on the hot tables
+unless the caller opts in with `including_archived()`: inside it, read_models.fetch reads each
+archived table as the UNION ALL of its hot and archive rows, so lists, details, nested items
+and analytics written against the models cover both without change.
+
+Archival (ARCHIVE_INTERVAL) moves ARCHIVE_CHUNK parents per transaction; copy, delete and the
+resource version bump of a chunk commit together. The hot tables are AUTOINCREMENT (migration
+1.5.0), so an id that moved to the archive, or whose row was deleted, is never handed out
+again; archival refuses to run on a database that still reuses ids.
+"""
+
+from models import db, Order, OrderItem, PurchaseOrder, PurchaseOrderItem
+from versioning import bump_connection
+from sqlalchemy import event, select, union_all, Table, Column, MetaData
+from sqlalchemy.sql.util import find_tables, ClauseAdapter
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+import os
+import re
+import sqlite3
+import threading
+import time
+
+ARCHIVE_SCHEMA = 'archive'
+
+# Seconds a chunk waits for the app's writers, and the pause between chunks
+BUSY_TIMEOUT = 10
+CHUNK_PAUSE = 0.005
+
+ArchivedTable = namedtuple('ArchivedTable', 'model items foreign_key closed')
+
+# `closed` selects the parents to archive; the created_at bound lets the status/created_at
+# indexes find them, the last-change bound keeps anything touched within the period hot
+ARCHIVED = (
+    ArchivedTable(Order, OrderItem, 'order_id',
+                  "status IN ('delivered', 'completed', 'cancelled', 'canceled') "
+                  "AND created_at < :cutoff AND COALESCE(updated_at, created_at) < :cutoff"),
+    ArchivedTable(PurchaseOrder, PurchaseOrderItem, 'purchase_order_id',
+                  "status = 'received' "
+                  "AND created_at < :cutoff AND COALESCE(received_date, updated_at, created_at) < :cutoff"),
+)
+
+_including_archived = ContextVar('including_archived', default=False)
+
+def archive_database_path(database_path):
+    """inventory.db -> inventory-archive.db"""
+    base, ext = os.path.splitext(database_path)
+    return f'{base}-archive{ext or ".db"}'
+
+@contextmanager
+def including_archived(enabled=True):
+    """Read the archived tables together with their cold-storage rows inside this block"""
+    token = _including_archived.set(enabled)
+    try:
+        yield
+    finally:
+        _including_archived.reset(token)
+
+def _archive_table(table):
+    """Core copy of `table` in the archive schema: the same columns, no constraints"""
+    return Table(table.name, MetaData(), *[Column(column.name, column.type, primary_key=column.primary_key)
+                                          for column in table.columns], schema=ARCHIVE_SCHEMA)
+
+class ColdStorage:
+    def __init__(self):
+        self.after_days = 365
+        self.chunk_rows = 1000
+        self.database_path = None
+        self.path = None
+        self.ready = False
+        self.last_run = None
+        self._lock = threading.Lock()
+        self._unions = {}
+        for spec in ARCHIVED:
+            for table in (spec.model.__table__, spec.items.__table__):
+                self._unions[table.name] = union_all(
+                    select(table), select(_archive_table(table))
+                ).subquery(f'{table.name}_all')
+
+    def init_app(self, app):
+        self.after_days = int(os.getenv('ARCHIVE_AFTER_DAYS', self.after_days))
+        self.chunk_rows = int(os.getenv('ARCHIVE_CHUNK', self.chunk_rows))
+        self.database_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '', 1)
+        self.path = archive_database_path(self.database_path)
+        with app.app_context():
+            event.listen(db.engine, 'connect', self._attach)
+            # Connections opened before the listener existed do not have the archive attached
+            db.engine.dispose()
+
+    def _attach(self, dbapi_connection, connection_record):
+        dbapi_connection.execute(f'ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}', (self.path,))
+
+    # Reads
+    def available(self):
+        """Whether the archive tables exist; the first archival run creates them"""
+        if not self.ready and self.path:
+            names = [table for table in self._unions]
+            found = db.session.connection().exec_driver_sql(
+                f"SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.sqlite_master WHERE type = 'table' "
+                f"AND name IN ({', '.join('?' * len(names))})", tuple(names)
+            ).scalar()
+            self.ready = found == len(names)
+        return self.ready
+
+    def unified(self, statement):
+        """`statement` with each archived table read as hot UNION ALL archive rows, when the
+        caller is inside including_archived(); otherwise unchanged"""
+        if not _including_archived.get():
+            return statement
+        tables = {table.name for table in find_tables(statement)
+                  if table.schema is None and table.name in self._unions}
+        if not tables or not self.available():
+            return statement
+        for name in sorted(tables):
+            statement = ClauseAdapter(self._unions[name]).traverse(statement)
+        return statement
+
+    def schemas(self):
+        """Schemas holding order history, for raw SQL readers (forecasting)"""
+        return ['main', ARCHIVE_SCHEMA] if self.available() else ['main']
+
+    # Archival
+    def _ensure_schema(self, conn):
+        """Create the archive tables from the hot tables' DDL and add columns they gained since"""
+        for spec in ARCHIVED:
+            for table in (spec.model.__tablename__, spec.items.__tablename__):
+                for (sql,) in conn.execute("SELECT sql FROM main.sqlite_master WHERE tbl_name = ? "
+                                           "AND sql IS NOT NULL ORDER BY type DESC", (table,)).fetchall():
+                    conn.execute(re.sub(r'^CREATE (UNIQUE )?(TABLE|INDEX) ',
+                                        rf'CREATE \1\2 IF NOT EXISTS {ARCHIVE_SCHEMA}.', sql))
+                archived = {row[1] for row in conn.execute(f'PRAGMA {ARCHIVE_SCHEMA}.table_info({table})')}
+                for _, name, column_type, *_ in conn.execute(f'PRAGMA main.table_info({table})').fetchall():
+                    if name not in archived:
+                        conn.execute(f'ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN "{name}" {column_type}')
+
+    def _check_ids(self, conn):
+        """Without AUTOINCREMENT SQLite gives new rows MAX(id) + 1, which can be an archived id"""
+        for spec in ARCHIVED:
+            for table in (spec.model.__tablename__, spec.items.__tablename__):
+                sql = conn.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                                   (table,)).fetchone()[0]
+                if 'AUTOINCREMENT' not in sql.upper():
+                    raise RuntimeError(f'{table} reuses ids; run "python migrate.py migrate" (1.5.0) before archiving')
+
+    def run(self, now=None):
+        """Move closed orders and received purchase orders older than after_days into the
+        archive; returns {table: {'moved', 'items'}, 'cutoff', 'seconds'}"""
+        with self._lock:
+            now = now or datetime.utcnow()
+            # DateTime columns are stored as 'YYYY-MM-DD HH:MM:SS.ffffff' text, so bounds compare as strings
+            cutoff = (now - timedelta(days=self.after_days)).strftime('%Y-%m-%d %H:%M:%S.%f')
+            started = time.perf_counter()
+            result = {}
+            conn = sqlite3.connect(self.database_path, isolation_level=None, timeout=BUSY_TIMEOUT)
+            try:
+                conn.execute(f'ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}', (self.path,))
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    self._check_ids(conn)
+                    self._ensure_schema(conn)
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                conn.execute('CREATE TEMP TABLE candidates (id INTEGER PRIMARY KEY)')
+                conn.execute('CREATE TEMP TABLE moving (id INTEGER PRIMARY KEY)')
+                for spec in ARCHIVED:
+                    result[spec.model.__tablename__] = self._move(conn, spec, cutoff)
+            finally:
+                conn.close()
+
+            self.last_run = dict(result, at=now.isoformat(), cutoff=cutoff,
+                                 seconds=round(time.perf_counter() - started, 3))
+            return self.last_run
+
+    def _move(self, conn, spec, cutoff):
+        """Move the closed parents of one kind and their items, a chunk of parents per transaction"""
+        table, items = spec.model.__tablename__, spec.items.__tablename__
+        columns = ', '.join(f'"{row[1]}"' for row in conn.execute(f'PRAGMA main.table_info({table})'))
+        item_columns = ', '.join(f'"{row[1]}"' for row in conn.execute(f'PRAGMA main.table_info({items})'))
+
+        conn.execute('DELETE FROM temp.candidates')
+        conn.execute(f'INSERT INTO temp.candidates SELECT id FROM main.{table} WHERE {spec.closed}', {'cutoff': cutoff})
+        moved = moved_items = 0
+        last = 0
+        while True:
+            upper = conn.execute('SELECT MAX(id) FROM (SELECT id FROM temp.candidates WHERE id > ? ORDER BY id LIMIT ?)',
+                                 (last, self.chunk_rows)).fetchone()[0]
+            if upper is None:
+                break
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM temp.moving')
+                # Checked again under the write lock: the parent may have changed since it was listed
+                rows = conn.execute(f"""
+                    INSERT INTO temp.moving SELECT id FROM main.{table}
+                    WHERE id > :last AND id <= :upper AND id IN (SELECT id FROM temp.candidates)
+                      AND {spec.closed}
+                """, {'last': last, 'upper': upper, 'cutoff': cutoff}).rowcount
+                if rows:
+                    conn.execute(f'INSERT INTO {ARCHIVE_SCHEMA}.{table} ({columns}) SELECT {columns} FROM main.{table} '
+                                 'WHERE id IN (SELECT id FROM temp.moving)')
+                    item_rows = conn.execute(
+                        f'INSERT INTO {ARCHIVE_SCHEMA}.{items} ({item_columns}) SELECT {item_columns} FROM main.{items} '
+                        f'WHERE {spec.foreign_key} IN (SELECT id FROM temp.moving)').rowcount
+                    conn.execute(f'DELETE FROM main.{items} WHERE {spec.foreign_key} IN (SELECT id FROM temp.moving)')
+                    conn.execute(f'DELETE FROM main.{table} WHERE id IN (SELECT id FROM temp.moving)')
+                    bump_connection(conn, (table, items))
+                    moved += rows
+                    moved_items += item_rows
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            last = upper
+            # Let the app's writers in between chunks
+            time.sleep(CHUNK_PAUSE)
+        return {'moved': moved, 'items': moved_items}
+
+    def status(self):
+        connection = db.session.connection()
+        tables = {}
+        for spec in ARCHIVED:
+            for table in (spec.model.__tablename__, spec.items.__tablename__):
+                tables[table] = {
+                    'hot_rows': connection.exec_driver_sql(f'SELECT COUNT(*) FROM main.{table}').scalar(),
+                    'archived_rows': connection.exec_driver_sql(
+                        f'SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.{table}').scalar() if self.available() else 0
+                }
+        return {
+            'path': self.path,
+            'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            'tables': tables,
+            'after_days': self.after_days,
+            'chunk_rows': self.chunk_rows,
+            'last_run': self.last_run
+        }
+
+cold_storage = ColdStorage()
+
+def scheduled_archival():
+    """Scheduler entry point - move closed orders and received purchase orders to cold storage"""
+    return cold_storage.run()
@@ -612,26 +612,49 @@ def get_system_stats():
         'recent_orders': [order.to_dict() for order in recent_orders]
     }
 
-def get_database_size():
-    """Get database file size in bytes"""
-    try:
-        import os
-        basedir = os.path.abspath(os.path.dirname(__file__))
-        db_path = os.path.join(basedir, 'inventory.db')
-        if os.path.exists(db_path):
-            size_bytes = os.path.getsize(db_path)
-            # Convert to human readable format
-            if size_bytes < 1024:
-                return f"{size_bytes} B"
-            elif size_bytes < 1024 * 1024:
-                return f"{size_bytes / 1024:.1f} KB"
-            elif size_bytes < 1024 * 1024 * 1024:
-                return f"{size_bytes / (1024 * 1024):.1f} MB"
-            else:
-                return f"{size_bytes / (1024 * 1024 * 1024):.1f} GB"
-        return "0 B"
-    except Exception:
-        return "Unknown"
+def get_stock_by_unit(target_unit=None):
+    """Total active stock per category in each item's base unit, optionally converted to target_unit"""
+    from uom import registry
+    import numpy as np
+    
+    rows = db.session.query(
+        Inventory.quantity, Inventory.unit_of_measure, Inventory.base_unit,
+        Inventory.conversion_factor, Category.name
+    ).outerjoin(Category).filter(Inventory.is_active == True).all()
+    
+    if not rows:
+        return []
+    
+    quantities = np.array([r[0] or 0 for r in rows], dtype=np.float64)
+    units = [r[1] for r in rows]
+    base_units = np.array([r[2] for r in rows], dtype=object)
+    factors = [float(r[3]) if r[3] else 1.0 for r in rows]
+    categories = np.array([r[4] or 'Uncategorized' for r in rows], dtype=object)
+    
+    # Whole columns converted at once
+    base_quantities = registry.to_base_units(quantities, units, base_units, factors)
+    report_units = base_units
+    if target_unit:
+        base_quantities = registry.convert_column(base_quantities, base_units, target_unit, strict=False)
+        report_units = np.array([target_unit] * len(rows), dtype=object)
+    
+    convertible = ~np.isnan(base_quantities)
+    keys = np.array([f'{c}\x00{u}' for c, u in zip(categories, report_units)], dtype=object)
+    distinct, inverse = np.unique(keys[convertible].astype(str), return_inverse=True)
+    totals = np.bincount(inverse, weights=base_quantities[convertible], minlength=len(distinct))
+    counts = np.bincount(inverse, minlength=len(distinct))
+    
+    report = []
+    for key, total, count in zip(distinct, totals, counts):
+        category, unit = key.split('\x00')
+        report.append({'category': category, 'unit': unit, 'quantity': round(float(total), 4), 'item_count': int(count)})
+    
+    skipped = categories[~convertible]
+    for category in sorted(set(skipped)):
+        report.append({'category': category, 'unit': None, 'quantity': None,
+                       'item_count': int((skipped == category).sum()), 'unconvertible': True})
+    
+    return report
 
 def get_system_uptime():
     """Get system uptime (mock implementation)"""
@@ -653,13 +676,9 @@ def get_system_uptime():
         return "Unknown"
 
 def get_api_performance_stats():
-    """Get API performance statistics (mock implementation)"""
-    return {
-        'avg_response_time': '125ms',
-        'total_requests_today': 1247,
-        'error_rate': '0.2%',
-        'active_sessions': 12
-    }
+    """Get API performance statistics measured by the request metrics middleware"""
+    from metrics import request_metrics
+    return request_metrics.snapshot()
 
 def get_storage_usage():
     """Get storage usage statistics"""
@@ -0,0 +1,177 @@
+"""
+Demand forecasting - derives reorder points and safety stock from order history
+"""
+
+from models import db, Inventory
+from cold_storage import cold_storage
+from versioning import mark_changed
+from datetime import datetime, timedelta
+import math
+import time
+import numpy as np
+
+DEFAULT_HISTORY_DAYS = 365
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_SERVICE_LEVEL_Z = 1.65  # ~95% cycle service level
+
+# Number of rows (by id range) read per query
+CHUNK_SIZE = 500000
+
+# Day offset and month of every countable order in the history window; {schema} is main or
+# the cold-storage archive, which keeps the orders' ids
+ORDERS_SQL = """
+    SELECT id,
+           CAST(julianday(created_at) - julianday(?) AS INTEGER),
+           CAST(strftime('%m', created_at) AS INTEGER) - 1
+    FROM {schema}.orders
+    WHERE id >= ? AND id < ? AND created_at >= ? AND created_at < ?
+      AND status NOT IN ('cancelled', 'canceled')
+"""
+
+ORDER_ITEMS_SQL = """
+    SELECT order_id, inventory_id, quantity
+    FROM {schema}.order_items
+    WHERE id >= ? AND id < ?
+"""
+
+INSERT_SQL = """
+    INSERT INTO demand_forecasts (inventory_id, daily_demand, demand_std, seasonality_index, lead_time_days,
+                                  safety_stock, reorder_point, history_days, computed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _read_chunks(cursor, table, sql, params, chunk_size):
+    """Yield NumPy arrays of integer rows from table, one id range at a time"""
+    lo, hi = cursor.execute(f'SELECT MIN(id), MAX(id) FROM {table}').fetchone()
+    if lo is None:
+        return
+    for chunk_lo in range(lo, hi + 1, chunk_size):
+        rows = cursor.execute(sql, params(chunk_lo, chunk_lo + chunk_size)).fetchall()
+        if rows:
+            yield np.array(rows, dtype=np.int64)
+
+def _days_per_month(start, history_days):
+    """Count how many days of each calendar month fall inside the history window"""
+    first_day = np.datetime64(start.date(), 'D')
+    days = first_day + np.arange(history_days)
+    months = days.astype('datetime64[M]').astype(np.int64) % 12
+    return np.bincount(months, minlength=12).astype(np.float64)
+
+def compute_demand_forecasts(history_days=DEFAULT_HISTORY_DAYS, lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+                             service_level_z=DEFAULT_SERVICE_LEVEL_Z, chunk_size=CHUNK_SIZE, now=None):
+    """Recompute demand statistics for the whole catalog and store suggested reorder points"""
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    start = now - timedelta(days=history_days)
+    # Weekly buckets cover the most recent whole weeks; a partial bucket would read as a drop in
+    # demand and inflate its variability, so the oldest history_days % 7 days are left out of them
+    n_weeks = max(history_days // 7, 1)
+    week_offset = max(history_days - n_weeks * 7, 0)
+
+    ids = np.array([r[0] for r in db.session.query(Inventory.id).filter(
+        Inventory.is_active == True
+    ).order_by(Inventory.id).all()], dtype=np.int64)
+    n_items = len(ids)
+    if n_items == 0:
+        return {'skus': 0, 'order_lines': 0, 'duration_ms': 0}
+
+    # Dense lookup from inventory id to row in the demand matrices
+    index = np.full(int(ids.max()) + 1, -1, dtype=np.int64)
+    index[ids] = np.arange(n_items)
+
+    start_param = start.strftime('%Y-%m-%d %H:%M:%S.%f')
+    end_param = now.strftime('%Y-%m-%d %H:%M:%S.%f')
+    cursor = db.session.connection().connection.cursor()
+
+    # Resolve every order to its week and month once, keyed by order id
+    order_day = np.full(1, -1, dtype=np.int64)
+    order_month = np.zeros(1, dtype=np.int64)
+    schemas = cold_storage.schemas()
+    order_chunks = (chunk for schema in schemas for chunk in _read_chunks(
+        cursor, f'{schema}.orders', ORDERS_SQL.format(schema=schema),
+        lambda lo, hi: (start_param, lo, hi, start_param, end_param), chunk_size))
+    for chunk in order_chunks:
+        max_id = int(chunk[:, 0].max())
+        if max_id >= len(order_day):
+            order_day = np.concatenate([order_day, np.full(max_id + 1 - len(order_day), -1, dtype=np.int64)])
+            order_month = np.concatenate([order_month, np.zeros(max_id + 1 - len(order_month), dtype=np.int64)])
+        order_day[chunk[:, 0]] = chunk[:, 1]
+        order_month[chunk[:, 0]] = chunk[:, 2]
+
+    totals = np.zeros(n_items, dtype=np.float64)
+    weekly = np.zeros(n_items * n_weeks, dtype=np.float64)
+    monthly = np.zeros(n_items * 12, dtype=np.float64)
+
+    order_lines = 0
+    item_chunks = (chunk for schema in schemas for chunk in _read_chunks(
+        cursor, f'{schema}.order_items', ORDER_ITEMS_SQL.format(schema=schema), lambda lo, hi: (lo, hi), chunk_size))
+    for chunk in item_chunks:
+        order_ids, inventory_ids, quantities = chunk[:, 0], chunk[:, 1], chunk[:, 2]
+
+        # Drop lines for orders outside the window and items outside the catalog
+        order_ids = np.where(order_ids < len(order_day), order_ids, 0)
+        days = order_day[order_ids]
+        inventory_ids = np.where(inventory_ids < len(index), inventory_ids, 0)
+        rows_idx = index[inventory_ids]
+        valid = (days >= 0) & (days < history_days) & (rows_idx >= 0)
+
+        rows_idx, week_days = rows_idx[valid], days[valid] - week_offset
+        months, quantities = order_month[order_ids[valid]], quantities[valid]
+        totals += np.bincount(rows_idx, weights=quantities, minlength=n_items)
+        in_weeks = week_days >= 0
+        weekly += np.bincount(rows_idx[in_weeks] * n_weeks + week_days[in_weeks] // 7,
+                              weights=quantities[in_weeks], minlength=n_items * n_weeks)
+        monthly += np.bincount(rows_idx * 12 + months, weights=quantities, minlength=n_items * 12)
+        order_lines += int(valid.sum())
+    cursor.close()
+
+    weekly = weekly.reshape(n_items, n_weeks)
+    monthly = monthly.reshape(n_items, 12)
+
+    # Demand rate and variability
+    daily_demand = totals / history_days
+    weekly_std = weekly.std(axis=1, ddof=1) if n_weeks > 1 else np.zeros(n_items)
+    daily_std = weekly_std / math.sqrt(7)
+
+    # Seasonality for the month the next replenishment falls in, relative to the average rate
+    days_in_month = _days_per_month(start, history_days)
+    target_month = (now + timedelta(days=lead_time_days)).month - 1
+    seasonality = np.ones(n_items, dtype=np.float64)
+    if days_in_month[target_month] > 0:
+        month_rate = monthly[:, target_month] / days_in_month[target_month]
+        has_demand = daily_demand > 0
+        seasonality[has_demand] = month_rate[has_demand] / daily_demand[has_demand]
+
+    # Reorder point = expected lead time demand + safety stock
+    safety_stock = np.ceil(service_level_z * daily_std * math.sqrt(lead_time_days)).astype(np.int64)
+    lead_time_demand = daily_demand * seasonality * lead_time_days
+    reorder_point = np.ceil(lead_time_demand).astype(np.int64) + safety_stock
+
+    # Replace the previous forecasts in one transaction
+    computed_at = datetime.utcnow()
+    computed_param = computed_at.strftime('%Y-%m-%d %H:%M:%S.%f')
+    cursor = db.session.connection().connection.cursor()
+    cursor.execute('DELETE FROM demand_forecasts')
+    cursor.executemany(INSERT_SQL, zip(
+        ids.tolist(), daily_demand.tolist(), daily_std.tolist(), seasonality.tolist(),
+        [lead_time_days] * n_items, safety_stock.tolist(), reorder_point.tolist(),
+        [history_days] * n_items, [computed_param] * n_items
+    ))
+    cursor.close()
+    mark_changed('demand_forecasts')
+    db.session.commit()
+
+    return {
+        'skus': n_items,
+        'order_lines': order_lines,
+        'history_days': history_days,
+        'lead_time_days': lead_time_days,
+        'computed_at': computed_at.isoformat(),
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+def scheduled_demand_forecast():
+    """Scheduler entry point - recompute all demand forecasts"""
+    summary = compute_demand_forecasts()
+    print(f"✅ Demand forecasts recomputed for {summary['skus']} SKUs in {summary['duration_ms']}ms")
+    return summary
@@ -0,0 +1,131 @@
+"""
+Bounded LRU cache of serialized row fragments
+
+A fragment is the JSON object of one row for one field set, keyed by
+(table, fields, id, version column value), so an edited row simply misses. Fragments also
+embed values from other rows (category and vendor names, order lines); those are recorded
+as dependencies and dropped when the rows they came from change.
+"""
+
+from invalidation import bus
+from collections import OrderedDict
+import os
+import threading
+
+# Rough per-entry bookkeeping cost on top of the fragment text
+ENTRY_OVERHEAD_BYTES = 200
+
+class FragmentCache:
+    """LRU of row fragments bounded by approximate memory, with dependency invalidation"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (fragment, dependency rows, dependency tables)
+        self._by_row = {}              # (table, id) -> keys that embed that row
+        self._by_table = {}            # table -> keys that embed rows of that table
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.generation = 0  # Bumped on every invalidation
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidated = 0
+        self.discarded = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, fragment, rows, tables, generation):
+        """Store a fragment unless an invalidation ran since its source rows were read"""
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                self.discarded += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (fragment, rows, tables)
+            self.bytes += len(fragment) + ENTRY_OVERHEAD_BYTES
+            for row in rows:
+                self._by_row.setdefault(row, set()).add(key)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self.bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        fragment, rows, tables = self._entries.pop(key)
+        self.bytes -= len(fragment) + ENTRY_OVERHEAD_BYTES
+        for row in rows:
+            keys = self._by_row.get(row)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_row[row]
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def _drop(self, keys):
+        for key in list(keys):
+            if key in self._entries:
+                self._remove(key)
+                self.invalidated += 1
+
+    def on_change(self, changed, rows):
+        """Bus subscriber: drop fragments that embed changed rows
+
+        Local commits name the changed rows. For other workers' commits only the tables are
+        known, so every fragment embedding that table is dropped; a fragment's own row is
+        still covered by its version key.
+        """
+        with self._lock:
+            self.generation += 1
+            for table in changed:
+                ids = rows.get(table) if rows is not None else None
+                if ids is None:
+                    self._drop(self._by_table.get(table, ()))
+                    if rows is not None:
+                        # Local write with unknown rows, e.g. Query.delete(): own fragments too
+                        self._drop([key for key in self._entries if key[0] == table])
+                else:
+                    for row_id in ids:
+                        self._drop(self._by_row.get((table, row_id), ()))
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._by_row.clear()
+            self._by_table.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0,
+                'evictions': self.evictions,
+                'invalidated': self.invalidated,
+                'discarded': self.discarded
+            }
+
+fragment_cache = FragmentCache(int(float(os.getenv('FRAGMENT_CACHE_MB', 32)) * 1024 * 1024))
+bus.subscribe(None, fragment_cache.on_change)
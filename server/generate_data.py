@@ -0,0 +1,537 @@
+"""
+Synthetic dataset generator for load testing and capacity planning
+
+Builds a fresh SQLite database with the application schema and fills it with bulk inserts:
+Zipf-distributed product popularity, seasonal and weekly order volume with growth, skewed
+category and vendor fan-out, purchase orders with receipts, a stock ledger consistent with
+current quantities, price history and audit log traffic (in the audit database next to
+--db, see audit_store.py). Output is deterministic for the same --seed and --end-date.
+
+Usage:
+  python generate_data.py --preset large --force               # ~1M SKUs, ~10M order lines
+  python generate_data.py --skus 50000 --order-lines 500000 --db /tmp/load.db --seed 7
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from models import db
+from audit_store import audit_database_path, database_binds
+from cold_storage import archive_database_path
+from versioning import bump_connection
+
+PRESETS = {
+    'small': {'skus': 10000, 'order_lines': 100000},
+    'medium': {'skus': 100000, 'order_lines': 1000000},
+    'large': {'skus': 1000000, 'order_lines': 10000000}
+}
+
+CHUNK_ROWS = 200000
+
+# Same logins as the demo data, so a generated database works with the README credentials
+DEFAULT_USERS = [
+    ('admin', 'admin@inventory.com', 'admin', 'admin123'),
+    ('manager1', 'manager1@inventory.com', 'user', 'manager123'),
+    ('staff1', 'staff1@inventory.com', 'staff', 'staff123')
+]
+
+CATEGORY_NAMES = ['Electronics', 'Office Supplies', 'Furniture', 'Hardware', 'Tools', 'Cleaning',
+                  'Packaging', 'Safety', 'Electrical', 'Plumbing', 'Kitchen', 'Medical', 'Automotive',
+                  'Garden', 'Lighting', 'Textiles', 'Chemicals', 'Food Service', 'Paper', 'Storage']
+ADJECTIVES = ['Standard', 'Premium', 'Compact', 'Heavy Duty', 'Eco', 'Pro', 'Basic', 'Deluxe',
+              'Industrial', 'Portable', 'Ultra', 'Classic']
+NOUNS = ['Widget', 'Cable', 'Bracket', 'Adapter', 'Panel', 'Filter', 'Valve', 'Sensor', 'Clamp',
+         'Container', 'Cartridge', 'Module', 'Fastener', 'Roller', 'Tape', 'Glove', 'Switch', 'Hose']
+VENDOR_WORDS = ['Acme', 'Global', 'Summit', 'Pioneer', 'Atlas', 'Northwind', 'Apex', 'Harbor',
+                'Keystone', 'Liberty', 'Meridian', 'Sterling']
+VENDOR_SUFFIXES = ['Supply Co.', 'Industries', 'Trading', 'Distributors', 'Wholesale', 'Logistics']
+
+# Unit of measure mix: (unit, share)
+UNITS = [('pcs', 0.72), ('kg', 0.07), ('l', 0.05), ('m', 0.05), ('lbs', 0.04), ('dozen', 0.04), ('pair', 0.03)]
+
+ORDER_STATUSES = np.array(['pending', 'processing', 'shipped', 'delivered', 'cancelled'])
+
+def zipf_weights(n, exponent):
+    """Normalized weights 1/rank^exponent for ranks 1..n"""
+    weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** exponent
+    return weights / weights.sum()
+
+def format_timestamps(values):
+    """datetime64[us] array -> list of 'YYYY-MM-DD HH:MM:SS.ffffff' strings, as SQLAlchemy stores them"""
+    return [value.replace('T', ' ') for value in np.datetime_as_string(values, unit='us').tolist()]
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = np.random.default_rng(args.seed)
+        self.end = np.datetime64(args.end_date, 'D') + np.timedelta64(1, 'D')
+        self.start = self.end - np.timedelta64(args.days, 'D')
+        self.counts = {}
+
+    # Helpers
+    def insert(self, table, columns, rows, total=None):
+        """Insert an iterable of row tuples in chunks; returns the row count"""
+        sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+        count = 0
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= CHUNK_ROWS:
+                self.connection.executemany(sql, chunk)
+                count += len(chunk)
+                chunk = []
+                if total:
+                    print(f"  {table}: {count:,}/{total:,}", end='\r', file=sys.stderr)
+        if chunk:
+            self.connection.executemany(sql, chunk)
+            count += len(chunk)
+        self.counts[table] = self.counts.get(table, 0) + count
+        return count
+
+    def random_times(self, days, hour_mean=13.5, hour_std=3.0):
+        """Timestamps on the given day offsets, clustered around business hours"""
+        seconds = np.clip(self.rng.normal(hour_mean * 3600, hour_std * 3600, len(days)), 0, 86399.999)
+        return (self.start + days.astype('timedelta64[D]')
+                + (seconds * 1e6).astype('timedelta64[us]'))
+
+    # Tables
+    def users(self):
+        now = format_timestamps(np.array([self.start], dtype='datetime64[us]'))[0]
+        shared_hash = generate_password_hash('password123')
+        rows = [(username, email, generate_password_hash(password), role, 1, now)
+                for username, email, role, password in DEFAULT_USERS]
+        roles = self.rng.choice(['staff', 'user', 'admin'], size=self.args.users, p=[0.6, 0.35, 0.05])
+        rows += [(f'user{i:04d}', f'user{i:04d}@example.com', shared_hash, str(role), 1, now)
+                 for i, role in enumerate(roles, start=1)]
+        self.insert('users', ['username', 'email', 'password_hash', 'role', 'is_active', 'created_at'], rows)
+        self.user_ids = np.arange(1, len(rows) + 1)
+        self.buyer_ids = np.array([i + 1 for i, row in enumerate(rows) if row[3] in ('admin', 'staff')])
+
+    def categories(self):
+        n = self.args.categories
+        now = format_timestamps(np.array([self.start], dtype='datetime64[us]'))[0]
+        names = [CATEGORY_NAMES[i % len(CATEGORY_NAMES)] + (f' {i // len(CATEGORY_NAMES) + 1}' if i >= len(CATEGORY_NAMES) else '')
+                 for i in range(n)]
+        self.insert('categories', ['name', 'description', 'created_at', 'updated_at'],
+                    ((name, f'Synthetic category {name}', now, now) for name in names))
+
+    def vendors(self):
+        n = self.args.vendors
+        now = format_timestamps(np.array([self.start], dtype='datetime64[us]'))[0]
+        active = self.rng.random(n) < 0.95
+        self.insert('vendors', ['name', 'contact_person', 'email', 'phone', 'address', 'is_active', 'created_at', 'updated_at'], (
+            (f'{VENDOR_WORDS[i % len(VENDOR_WORDS)]} {VENDOR_SUFFIXES[(i // len(VENDOR_WORDS)) % len(VENDOR_SUFFIXES)]} {i + 1}',
+             f'Contact {i + 1}', f'sales@vendor{i + 1}.example.com', f'555-{i % 10000:04d}',
+             f'{i + 1} Commerce Way', int(active[i]), now, now)
+            for i in range(n)
+        ))
+
+    def inventory(self):
+        n = self.args.skus
+        rng = self.rng
+        # Popularity: a random permutation of Zipf ranks, so hot items are spread over ids
+        self.popularity = zipf_weights(n, self.args.zipf)[rng.permutation(n)]
+        self.item_category = rng.choice(self.args.categories, size=n, p=zipf_weights(self.args.categories, 0.8)) + 1
+        self.item_price = np.round(np.clip(rng.lognormal(np.log(20), 1.0, n), 0.5, 5000), 2)
+        units, shares = zip(*UNITS)
+        self.item_unit = np.array(units)[rng.choice(len(units), size=n, p=shares)]
+        self.item_active = rng.random(n) < 0.97
+        # Items exist before the window opens, spread over the preceding year
+        self.item_created = self.start - (rng.random(n) * 365 * 86400 * 1e6).astype('timedelta64[us]')
+        expected_daily = self.popularity * self.args.order_lines / self.args.days
+        self.item_min_stock = np.maximum(np.ceil(expected_daily * 14), 2).astype(np.int64)
+        # Final quantity on hand: around a month of demand, some items at or below their minimum
+        self.item_quantity = rng.poisson(np.maximum(expected_daily * 30, 5)).astype(np.int64)
+        self.item_quantity[rng.random(n) < 0.04] = 0
+
+        created = format_timestamps(self.item_created)
+        updated = format_timestamps(np.full(n, self.end - np.timedelta64(1, 'D'), dtype='datetime64[us]'))
+        adjectives = rng.integers(0, len(ADJECTIVES), n)
+        nouns = rng.integers(0, len(NOUNS), n)
+        self.insert('inventory', [
+            'name', 'category_id', 'quantity', 'price', 'unit_of_measure', 'price_per_uom', 'conversion_factor',
+            'base_unit', 'description', 'sku', 'min_stock_level', 'is_active', 'created_at', 'updated_at'
+        ], (
+            (f'{ADJECTIVES[adjectives[i]]} {NOUNS[nouns[i]]} {i + 1:07d}', int(self.item_category[i]),
+             int(self.item_quantity[i]), float(self.item_price[i]), self.item_unit[i], float(self.item_price[i]), 1,
+             self.item_unit[i], 'Synthetic item', f'SKU-{i + 1:07d}', int(self.item_min_stock[i]),
+             int(self.item_active[i]), created[i], updated[i])
+            for i in range(n)
+        ), total=n)
+
+        self.insert('price_history', ['inventory_id', 'price_per_uom', 'effective_at'],
+                    ((i + 1, float(self.item_price[i]), created[i]) for i in range(n)))
+
+    def inventory_vendors(self):
+        """1-3 vendors per item, vendors drawn with a skew so a few supply most of the catalog"""
+        n = self.args.skus
+        rng = self.rng
+        per_item = rng.choice([1, 2, 3], size=n, p=[0.6, 0.3, 0.1])
+        items = np.repeat(np.arange(n), per_item)
+        vendors = rng.choice(self.args.vendors, size=len(items), p=zipf_weights(self.args.vendors, 0.9))
+        pairs = np.unique(np.stack([items, vendors], axis=1), axis=0)
+        items, vendors = pairs[:, 0], pairs[:, 1]
+        # The first vendor listed for an item is its preferred one
+        preferred = np.ones(len(items), dtype=bool)
+        preferred[1:] = items[1:] != items[:-1]
+        cost = np.round(self.item_price[items] * rng.uniform(0.55, 0.85, len(items)), 2)
+        now = format_timestamps(np.array([self.start], dtype='datetime64[us]'))[0]
+        self.insert('inventory_vendors', ['inventory_id', 'vendor_id', 'unit_price', 'is_preferred', 'created_at', 'updated_at'], (
+            (int(items[i]) + 1, int(vendors[i]) + 1, float(cost[i]), int(preferred[i]), now, now)
+            for i in range(len(items))
+        ), total=len(items))
+
+        # Grouped by vendor for purchase order lines
+        order = np.argsort(vendors, kind='stable')
+        self.supply_items = items[order]
+        self.supply_vendors = vendors[order]
+        self.supply_cost = cost[order]
+        self.vendor_start = np.searchsorted(self.supply_vendors, np.arange(self.args.vendors))
+        self.vendor_count = np.searchsorted(self.supply_vendors, np.arange(self.args.vendors), side='right') - self.vendor_start
+
+    def day_weights(self):
+        """Relative order volume per day: growth trend, yearly seasonality peaking in
+        December and quieter weekends"""
+        days = np.arange(self.args.days)
+        dates = self.start + days.astype('timedelta64[D]')
+        day_of_year = (dates - dates.astype('datetime64[Y]')).astype(np.int64)
+        weekday = (dates.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday; 0 = Monday
+        trend = 1 + self.args.growth * days / max(self.args.days - 1, 1)
+        season = 1 + self.args.seasonality * np.cos(2 * np.pi * (day_of_year - 350) / 365.25)
+        week = np.where(weekday >= 5, 0.55, 1.0)
+        weights = trend * season * week
+        return weights / weights.sum()
+
+    def orders(self):
+        rng = self.rng
+        n_orders = max(int(round(self.args.order_lines / self.args.lines_per_order)), 1)
+        day_counts = rng.multinomial(n_orders, self.day_weights())
+        days = np.repeat(np.arange(self.args.days), day_counts)
+        created = np.sort(self.random_times(days))
+        lines_per_order = 1 + rng.poisson(max(self.args.lines_per_order - 1, 0), n_orders)
+
+        # Lines: items by popularity, quantities mostly small
+        order_index = np.repeat(np.arange(n_orders), lines_per_order)
+        n_lines = len(order_index)
+        line_items = rng.choice(self.args.skus, size=n_lines, p=self.popularity)
+        line_quantity = rng.geometric(0.45, n_lines).astype(np.int64)
+        line_price = self.item_price[line_items]
+        line_total = np.round(line_quantity * line_price, 2)
+        order_total = np.round(np.bincount(order_index, weights=line_total, minlength=n_orders), 2)
+
+        # Status by age: recent orders are still open, older ones delivered or cancelled
+        age_days = (self.end - created).astype('timedelta64[s]').astype(np.int64) / 86400
+        status = np.where(rng.random(n_orders) < 0.05, 4, 3)
+        status = np.where(age_days < 7, rng.choice([1, 2, 3], n_orders, p=[0.3, 0.4, 0.3]), status)
+        status = np.where(age_days < 2, rng.choice([0, 1], n_orders, p=[0.6, 0.4]), status)
+        updated = np.minimum(created + (rng.exponential(36, n_orders) * 3600e6).astype('timedelta64[us]'),
+                             self.end - np.timedelta64(1, 'us'))
+
+        # Customers: repeat buyers are common
+        customers = rng.choice(max(n_orders // 4, 1), size=n_orders, p=zipf_weights(max(n_orders // 4, 1), 0.7)) + 1
+
+        created_text = format_timestamps(created)
+        updated_text = format_timestamps(updated)
+        print(f"  orders: {n_orders:,} orders, {n_lines:,} lines", file=sys.stderr)
+        self.insert('orders', ['customer_name', 'customer_email', 'customer_phone', 'status', 'total', 'created_at', 'updated_at'], (
+            (f'Customer {customers[i]}', f'customer{customers[i]}@example.com', None, ORDER_STATUSES[status[i]],
+             float(order_total[i]), created_text[i], updated_text[i])
+            for i in range(n_orders)
+        ), total=n_orders)
+        self.insert('order_items', ['order_id', 'inventory_id', 'quantity', 'unit_price', 'total_price', 'unit_of_measure', 'price_per_uom'], (
+            (int(order_index[i]) + 1, int(line_items[i]) + 1, int(line_quantity[i]), float(line_price[i]),
+             float(line_total[i]), self.item_unit[line_items[i]], float(line_price[i]))
+            for i in range(n_lines)
+        ), total=n_lines)
+
+        self.order_created = created
+        self.order_status = status
+        self.order_total = order_total
+        self.order_customers = customers
+        self.line_order = order_index
+        self.line_items = line_items
+        self.line_quantity = line_quantity
+
+    def purchase_orders(self):
+        rng = self.rng
+        n = self.args.purchase_orders
+        if n <= 0:
+            self.receipt_items = self.receipt_quantity = self.receipt_po = np.zeros(0, dtype=np.int64)
+            self.receipt_time = np.zeros(0, dtype='datetime64[us]')
+            return
+        # Vendors with more catalog get more purchase orders
+        supplying = np.flatnonzero(self.vendor_count)
+        weights = self.vendor_count[supplying] / self.vendor_count[supplying].sum()
+        po_vendor = rng.choice(supplying, size=n, p=weights)
+        days = np.sort(rng.integers(0, self.args.days, n))
+        created = self.random_times(days, hour_mean=10, hour_std=2)
+        lead = (rng.uniform(3, 14, n) * 86400e6).astype('timedelta64[us]')
+        received_at = created + lead
+
+        lines = np.minimum(1 + rng.poisson(2, n), self.vendor_count[po_vendor])
+        po_index = np.repeat(np.arange(n), lines)
+        offsets = (rng.random(len(po_index)) * self.vendor_count[po_vendor[po_index]]).astype(np.int64)
+        supply_rows = self.vendor_start[po_vendor[po_index]] + offsets
+        line_items = self.supply_items[supply_rows]
+        line_cost = self.supply_cost[supply_rows]
+        line_quantity = np.maximum(np.ceil(self.item_min_stock[line_items] * rng.uniform(1, 3, len(po_index))), 1).astype(np.int64)
+        line_total = np.round(line_quantity * line_cost, 2)
+        po_total = np.round(np.bincount(po_index, weights=line_total, minlength=n), 2)
+
+        # Received if the delivery date has passed, apart from a few canceled ones
+        status = np.where(received_at < self.end, 'received', 'approved').astype(object)
+        open_orders = received_at >= self.end
+        status[open_orders] = rng.choice(['draft', 'submitted', 'approved'], int(open_orders.sum()), p=[0.2, 0.3, 0.5])
+        canceled = (rng.random(n) < 0.04) & ~open_orders
+        status[canceled] = 'canceled'
+        received = status == 'received'
+        creators = rng.choice(self.buyer_ids, size=n)
+
+        created_text = format_timestamps(created)
+        received_text = format_timestamps(received_at)
+        expected_text = format_timestamps(created + np.timedelta64(10, 'D'))
+        self.insert('purchase_orders', ['vendor_id', 'reference_number', 'status', 'total', 'notes', 'created_by',
+                                        'created_at', 'updated_at', 'expected_delivery_date', 'received_date'], (
+            (int(po_vendor[i]) + 1, f'PO-{i + 1:08d}', status[i], float(po_total[i]), '', int(creators[i]),
+             created_text[i], received_text[i] if received[i] else created_text[i], expected_text[i],
+             received_text[i] if received[i] else None)
+            for i in range(n)
+        ), total=n)
+        line_received = received[po_index]
+        self.insert('purchase_order_items', ['purchase_order_id', 'inventory_id', 'quantity', 'unit_price', 'total_price',
+                                             'received_quantity', 'unit_of_measure', 'price_per_uom'], (
+            (int(po_index[i]) + 1, int(line_items[i]) + 1, int(line_quantity[i]), float(line_cost[i]), float(line_total[i]),
+             int(line_quantity[i]) if line_received[i] else 0, self.item_unit[line_items[i]], float(line_cost[i]))
+            for i in range(len(po_index))
+        ), total=len(po_index))
+
+        self.receipt_po = po_index[line_received]
+        self.receipt_items = line_items[line_received]
+        self.receipt_quantity = line_quantity[line_received]
+        self.receipt_time = received_at[self.receipt_po]
+        self.po_status = status
+        self.po_created = created
+        self.po_received_at = received_at
+        self.po_creators = creators
+
+    def stock_movements(self):
+        """Opening balances plus one movement per order line and receipt, in time order, so
+        replaying the ledger ends at each item's current quantity"""
+        n = self.args.skus
+        sold = np.bincount(self.line_items, weights=self.line_quantity, minlength=n).astype(np.int64)
+        bought = np.bincount(self.receipt_items, weights=self.receipt_quantity, minlength=n).astype(np.int64)
+        opening = self.item_quantity + sold - bought
+        # Items received more than they sold would need a negative opening balance; raise
+        # their current quantity instead. Running balances can still dip below zero between
+        # receipts, as in imported history.
+        short = np.flatnonzero(opening < 0)
+        if len(short):
+            self.item_quantity[short] -= opening[short]
+            opening[short] = 0
+            self.connection.executemany('UPDATE inventory SET quantity = ? WHERE id = ?',
+                                        [(int(self.item_quantity[i]), int(i) + 1) for i in short])
+        times = np.concatenate([self.item_created, self.order_created[self.line_order], self.receipt_time])
+        items = np.concatenate([np.arange(n), self.line_items, self.receipt_items])
+        changes = np.concatenate([opening, -self.line_quantity, self.receipt_quantity])
+        reasons = np.concatenate([np.zeros(n, dtype=np.int8), np.ones(len(self.line_items), dtype=np.int8),
+                                  np.full(len(self.receipt_items), 2, dtype=np.int8)])
+        references = np.concatenate([np.zeros(n, dtype=np.int64), self.line_order + 1, self.receipt_po + 1])
+        keep = changes != 0
+        order = np.argsort(times[keep], kind='stable')
+        times, items, changes, reasons, references = (
+            array[keep][order] for array in (times, items, changes, reasons, references)
+        )
+        users = self.rng.choice(self.buyer_ids, size=len(items))
+        reason_names = ['opening', 'order', 'po_receipt']
+        total = len(items)
+
+        def rows():
+            for start in range(0, total, CHUNK_ROWS):
+                stamps = format_timestamps(times[start:start + CHUNK_ROWS])
+                for offset, stamp in enumerate(stamps):
+                    i = start + offset
+                    reason = reasons[i]
+                    yield (int(items[i]) + 1, int(changes[i]), reason_names[reason],
+                           int(references[i]) if reason else None, int(users[i]) if reason else None, stamp)
+
+        self.insert('stock_movements', ['inventory_id', 'quantity_change', 'reason', 'reference_id', 'user_id', 'created_at'],
+                    rows(), total=total)
+
+    def audit_logs(self):
+        """Order creation and status changes, receipts and logins, in time order"""
+        rng = self.rng
+        n_orders = len(self.order_created)
+        update_share = min(max(self.args.audit_per_order - 1, 0), 1)
+        updated = rng.random(n_orders) < update_share
+        logins_per_day = max(int(len(self.user_ids) * 0.6), 1)
+        login_days = np.repeat(np.arange(self.args.days), logins_per_day)
+
+        kinds = [
+            (np.zeros(n_orders, dtype=np.int8), self.order_created, np.arange(n_orders)),
+            (np.ones(int(updated.sum()), dtype=np.int8),
+             self.order_created[updated] + np.timedelta64(3, 'h'), np.flatnonzero(updated)),
+            (np.full(len(login_days), 2, dtype=np.int8), self.random_times(login_days, 9, 1.5),
+             rng.choice(self.user_ids, size=len(login_days)) - 1)
+        ]
+        if self.args.purchase_orders > 0:
+            received = np.flatnonzero(self.po_status == 'received')
+            kinds.append((np.full(len(received), 3, dtype=np.int8), self.po_received_at[received], received))
+        kind = np.concatenate([k[0] for k in kinds])
+        times = np.concatenate([k[1] for k in kinds])
+        subject = np.concatenate([k[2] for k in kinds])
+        order = np.argsort(times, kind='stable')
+        kind, times, subject = kind[order], times[order], subject[order]
+        actors = rng.choice(self.buyer_ids, size=len(kind))
+        ips = [f'10.0.{i // 256}.{i % 256}' for i in range(512)]
+        ip_index = rng.integers(0, len(ips), len(kind))
+        total = len(kind)
+
+        def rows():
+            for start in range(0, total, CHUNK_ROWS):
+                stamps = format_timestamps(times[start:start + CHUNK_ROWS])
+                for offset, stamp in enumerate(stamps):
+                    i = start + offset
+                    k = kind[i]
+                    s = int(subject[i])
+                    if k == 0:
+                        yield (int(actors[i]), 'CREATE', 'orders', s + 1, None, json.dumps({
+                            'id': s + 1, 'customer_name': f'Customer {self.order_customers[s]}',
+                            'status': 'pending', 'total': float(self.order_total[s])
+                        }), ips[ip_index[i]], stamp)
+                    elif k == 1:
+                        yield (int(actors[i]), 'UPDATE', 'orders', s + 1, '{"status": "pending"}',
+                               json.dumps({'status': str(ORDER_STATUSES[self.order_status[s]])}), ips[ip_index[i]], stamp)
+                    elif k == 2:
+                        yield (s + 1, 'LOGIN', 'users', s + 1, None, None, ips[ip_index[i]], stamp)
+                    else:
+                        yield (int(self.po_creators[s]), 'RECEIVE', 'purchase_orders', s + 1, '{"status": "approved"}',
+                               '{"status": "received"}', ips[ip_index[i]], stamp)
+
+        self.insert('audit_logs', ['user_id', 'action', 'table_name', 'record_id', 'old_values', 'new_values',
+                                   'ip_address', 'created_at'], rows(), total=total)
+
+    def stamp_versions(self):
+        """Version every generated table so running workers drop what they cached"""
+        bump_connection(self.connection, self.counts)
+
+    # Driver
+    def create_schema(self, path):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+        app.config['SQLALCHEMY_BINDS'] = database_binds(path)
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            db.engine.dispose()
+
+    def run(self, path):
+        self.create_schema(path)
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        # audit_logs is only in the audit database, so unqualified inserts land there
+        self.connection.execute('ATTACH DATABASE ? AS audit', (audit_database_path(path),))
+        self.connection.execute('PRAGMA synchronous = OFF')
+        self.connection.execute('PRAGMA audit.synchronous = OFF')
+        self.connection.execute('PRAGMA journal_mode = MEMORY')
+        self.connection.execute('PRAGMA cache_size = -262144')
+        self.connection.execute('PRAGMA temp_store = MEMORY')
+        steps = [
+            ('users', self.users), ('categories', self.categories), ('vendors', self.vendors),
+            ('inventory', self.inventory), ('inventory vendors', self.inventory_vendors),
+            ('orders', self.orders), ('purchase orders', self.purchase_orders)
+        ]
+        if self.args.ledger:
+            steps.append(('stock ledger', self.stock_movements))
+        steps += [('audit logs', self.audit_logs), ('versions', self.stamp_versions)]
+
+        for name, step in steps:
+            started = time.perf_counter()
+            self.connection.execute('BEGIN')
+            step()
+            self.connection.execute('COMMIT')
+            print(f"{name:<18} {time.perf_counter() - started:>7.1f}s", file=sys.stderr)
+
+        started = time.perf_counter()
+        self.connection.execute('ANALYZE')
+        self.connection.execute('PRAGMA journal_mode = DELETE')
+        self.connection.close()
+        print(f"{'analyze':<18} {time.perf_counter() - started:>7.1f}s", file=sys.stderr)
+        return self.counts
+
+def parse_args(argv=None):
+    """Parse options and fill size defaults from the preset; returns (parser, args)"""
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=os.getenv('INVENTORY_DB', os.path.join(basedir, 'inventory.db')))
+    parser.add_argument('--force', action='store_true', help='Replace the database file if it exists')
+    parser.add_argument('--preset', choices=sorted(PRESETS), help='Dataset size; explicit counts override it')
+    parser.add_argument('--seed', type=int, default=42)
+    # Activity runs to the end of --end-date, so it has to be a day that is already over (UTC)
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    parser.add_argument('--end-date', type=date.fromisoformat, default=yesterday,
+                        help='Last day of generated activity (default yesterday, UTC)')
+    parser.add_argument('--days', type=int, default=730, help='Days of order history')
+    parser.add_argument('--skus', type=int)
+    parser.add_argument('--order-lines', type=int)
+    parser.add_argument('--lines-per-order', type=float, default=3.0)
+    parser.add_argument('--categories', type=int)
+    parser.add_argument('--vendors', type=int)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--purchase-orders', type=int)
+    parser.add_argument('--zipf', type=float, default=1.1, help='Exponent of product popularity')
+    parser.add_argument('--seasonality', type=float, default=0.35, help='Amplitude of the yearly cycle')
+    parser.add_argument('--growth', type=float, default=0.5, help='Volume growth over the whole window')
+    parser.add_argument('--audit-per-order', type=float, default=1.5, help='Audit rows per order (1-2)')
+    parser.add_argument('--no-ledger', dest='ledger', action='store_false',
+                        help='Skip stock movements (the app then writes opening balances on start)')
+    args = parser.parse_args(argv)
+    if args.end_date > yesterday:
+        parser.error(f'--end-date must be {yesterday} or earlier; later rows would be dated in the future')
+
+    preset = PRESETS[args.preset or 'small']
+    args.skus = args.skus or preset['skus']
+    args.order_lines = args.order_lines or preset['order_lines']
+    args.categories = args.categories or max(20, args.skus // 5000)
+    args.vendors = args.vendors or max(20, args.skus // 500)
+    if args.purchase_orders is None:
+        args.purchase_orders = max(args.skus // 20, 10)
+    return parser, args
+
+def generate(path, *options):
+    """Generate a fresh database at `path` from command-line style options; returns row counts"""
+    _, args = parse_args(['--db', path, *options])
+    return Generator(args).run(os.path.abspath(path))
+
+def main():
+    parser, args = parse_args()
+    path = os.path.abspath(args.db)
+    if os.path.exists(path):
+        if not args.force:
+            parser.error(f'{path} exists; pass --force to replace it')
+        for base in (path, audit_database_path(path), archive_database_path(path)):
+            for suffix in ('', '-wal', '-shm', '-journal'):
+                if os.path.exists(base + suffix):
+                    os.remove(base + suffix)
+
+    print(f"Generating {args.skus:,} SKUs and ~{args.order_lines:,} order lines into {path} "
+          f"(seed {args.seed}, ending {args.end_date})", file=sys.stderr)
+    started = time.perf_counter()
+    counts = Generator(args).run(path)
+    elapsed = time.perf_counter() - started
+
+    print(f"\nDone in {elapsed:.1f}s, {os.path.getsize(path) / 1024 / 1024:.1f} MB "
+          f"(audit {os.path.getsize(audit_database_path(path)) / 1024 / 1024:.1f} MB)")
+    for table, count in sorted(counts.items()):
+        print(f"  {table:<22}{count:>12,}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,441 @@
+"""
+Importer for databases on the legacy Inventory_Management.sql layout
+
+The legacy schema (users, categories, inventory, orders, order_items, audit_logs with
+SERIAL ids and JSONB audit payloads, no UOM, vendor or purchase order tables) is mapped onto
+the current models:
+
+- inventory and order lines get the UOM defaults (pcs, conversion factor 1, price_per_uom
+  from the unit price); items and users are active
+- audit payloads are rewritten as the JSON text the app writes: JSONB values, double-encoded
+  JSON strings and Python dict reprs are decoded, anything else is kept under "value"
+- timestamps are normalized to the naive UTC format SQLAlchemy reads back; SERIAL rows
+  stored without an id take their rowid
+- the legacy foreign key actions are applied: order lines of missing orders or items are
+  dropped (ON DELETE CASCADE), missing categories and audit users become NULL
+
+Each table is streamed from the source in rowid chunks and converted by its own worker
+process into a staging database next to the target, so the copies run in parallel. The
+staged tables are then merged into the target in dependency order (parents first), one
+transaction per table (audit_logs goes to the audit database next to the target, see
+audit_store.py). Progress is committed with every chunk and every merge, so an
+interrupted import continues where it stopped when run again with the same arguments.
+Opening stock balances are written by the app on its next start.
+
+Usage:
+  python import_legacy.py /path/to/Inventory_Management.sql --db inventory.db [--workers 4]
+"""
+
+import argparse
+import ast
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from flask import Flask
+
+from migrate import MIGRATIONS, create_version_table
+from models import db
+from audit_store import audit_database_path, database_binds
+from cold_storage import archive_database_path
+from versioning import bump_connection
+
+CHUNK_ROWS = 20000
+
+def timestamp(value):
+    """Legacy timestamp (ISO text with or without zone, or epoch seconds) -> naive UTC text"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        parsed = datetime.fromtimestamp(value, timezone.utc)
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip().replace(' ', 'T', 1))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def number(value, default=0):
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+def json_payload(value):
+    """JSONB value -> JSON text as written by log_action"""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', errors='replace')
+    if not isinstance(value, str):
+        return json.dumps(value)
+    text = value.strip()
+    if not text:
+        return None
+    try:
+        decoded = json.loads(text)
+        # Payloads that were JSON-encoded twice arrive as a JSON string holding JSON
+        if isinstance(decoded, str):
+            try:
+                decoded = json.loads(decoded)
+            except ValueError:
+                pass
+    except ValueError:
+        try:
+            decoded = ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            decoded = {'value': text}
+    if not isinstance(decoded, (dict, list)):
+        decoded = {'value': decoded}
+    return json.dumps(decoded, default=str)
+
+# Table mappings: legacy row (dict, including 'rowid') -> current columns
+def _id(row):
+    return row['id'] if row.get('id') is not None else row['rowid']
+
+def users(row):
+    return {
+        'id': _id(row),
+        'username': row['username'],
+        'email': row['email'],
+        'password_hash': row['password_hash'],
+        'role': row.get('role') or 'user',
+        'is_active': 1,
+        'created_at': timestamp(row.get('created_at')),
+        'last_login': timestamp(row.get('last_login'))
+    }
+
+def categories(row):
+    return {
+        'id': _id(row),
+        'name': row['name'],
+        'description': row.get('description'),
+        'created_at': timestamp(row.get('created_at')),
+        'updated_at': timestamp(row.get('updated_at'))
+    }
+
+def inventory(row):
+    price = number(row.get('price'))
+    return {
+        'id': _id(row),
+        'name': row['name'],
+        'category_id': row.get('category_id'),
+        'quantity': int(number(row.get('quantity'))),
+        'price': price,
+        'unit_of_measure': 'pcs',
+        'price_per_uom': price,
+        'conversion_factor': 1,
+        'base_unit': 'pcs',
+        'description': row.get('description'),
+        'sku': row.get('sku') or None,
+        'min_stock_level': int(number(row.get('min_stock_level'), 5)),
+        'is_active': 1,
+        'created_at': timestamp(row.get('created_at')),
+        'updated_at': timestamp(row.get('updated_at'))
+    }
+
+def orders(row):
+    return {
+        'id': _id(row),
+        'customer_name': row['customer_name'],
+        'customer_email': row.get('customer_email'),
+        'customer_phone': row.get('customer_phone'),
+        'status': row.get('status') or 'pending',
+        'total': number(row.get('total')),
+        'created_at': timestamp(row.get('created_at')),
+        'updated_at': timestamp(row.get('updated_at'))
+    }
+
+def order_items(row):
+    unit_price = number(row.get('unit_price'))
+    return {
+        'id': _id(row),
+        'order_id': row.get('order_id'),
+        'inventory_id': row.get('inventory_id'),
+        'quantity': int(number(row.get('quantity'))),
+        'unit_price': unit_price,
+        'total_price': number(row.get('total_price')),
+        'unit_of_measure': 'pcs',
+        'price_per_uom': unit_price
+    }
+
+def audit_logs(row):
+    return {
+        'id': _id(row),
+        'user_id': row.get('user_id'),
+        'action': row['action'],
+        'table_name': row.get('table_name'),
+        'record_id': row.get('record_id'),
+        'old_values': json_payload(row.get('old_values')),
+        'new_values': json_payload(row.get('new_values')),
+        'ip_address': None,
+        'created_at': timestamp(row.get('created_at'))
+    }
+
+class LegacyTable:
+    def __init__(self, name, convert, nullify=None, require=None, schema='main'):
+        self.name = name
+        self.convert = convert
+        # Attached database the target table lives in
+        self.schema = schema
+        # {column: parent table}: set to NULL when the parent row is missing
+        self.nullify = nullify or {}
+        # {column: parent table}: the row is dropped when the parent row is missing
+        self.require = require or {}
+
+    @property
+    def parents(self):
+        return set(self.nullify.values()) | set(self.require.values())
+
+TABLES = [
+    LegacyTable('users', users),
+    LegacyTable('categories', categories),
+    LegacyTable('inventory', inventory, nullify={'category_id': 'categories'}),
+    LegacyTable('orders', orders),
+    LegacyTable('order_items', order_items, require={'order_id': 'orders', 'inventory_id': 'inventory'}),
+    LegacyTable('audit_logs', audit_logs, nullify={'user_id': 'users'}, schema='audit')
+]
+
+def merge_order(tables, merged=()):
+    """Tables with their parents first; parents in `merged` were merged by an earlier run"""
+    ordered, placed = [], set(merged)
+    while len(ordered) < len(tables):
+        ready = [table for table in tables if table.name not in placed and table.parents <= placed]
+        if not ready:
+            raise ValueError('Circular dependency between legacy tables')
+        for table in ready:
+            ordered.append(table)
+            placed.add(table.name)
+    return ordered
+
+# Staging: one worker per table
+def copy_table(source, staging_path, name, create_sql, chunk_rows):
+    """Stream one legacy table into its staging database; returns (name, read, staged)"""
+    table = next(table for table in TABLES if table.name == name)
+    staging = sqlite3.connect(staging_path, isolation_level=None)
+    staging.execute('PRAGMA synchronous = OFF')
+    staging.execute(create_sql.replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1))
+    staging.execute("""
+        CREATE TABLE IF NOT EXISTS import_state (
+            last_rowid INTEGER NOT NULL, rows_read INTEGER NOT NULL, done INTEGER NOT NULL
+        )
+    """)
+    state = staging.execute('SELECT last_rowid, rows_read, done FROM import_state').fetchone()
+    if state is None:
+        staging.execute('INSERT INTO import_state VALUES (0, 0, 0)')
+        state = (0, 0, 0)
+    last_rowid, rows_read, done = state
+    if done:
+        staged = staging.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]
+        staging.close()
+        return name, rows_read, staged
+
+    columns = [row[1] for row in staging.execute(f'PRAGMA table_info({name})')]
+    insert = f"INSERT OR IGNORE INTO {name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    reader = sqlite3.connect(f'file:{source}?mode=ro', uri=True)
+    reader.row_factory = sqlite3.Row
+    total = reader.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]
+    started = time.perf_counter()
+    reported = started
+    try:
+        while True:
+            rows = reader.execute(f'SELECT rowid AS rowid, * FROM {name} WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                                  (last_rowid, chunk_rows)).fetchall()
+            if not rows:
+                break
+            converted = []
+            for row in rows:
+                mapped = table.convert(dict(row))
+                converted.append(tuple(mapped.get(column) for column in columns))
+            last_rowid = rows[-1]['rowid']
+            rows_read += len(rows)
+            # The rows and the position commit together, so a restart never skips or repeats a chunk
+            staging.execute('BEGIN')
+            staging.executemany(insert, converted)
+            staging.execute('UPDATE import_state SET last_rowid = ?, rows_read = ?', (last_rowid, rows_read))
+            staging.execute('COMMIT')
+            now = time.perf_counter()
+            if now - reported >= 5:
+                print(f"  {name}: {rows_read:,}/{total:,} rows ({rows_read / (now - started):,.0f}/s)",
+                      file=sys.stderr, flush=True)
+                reported = now
+        staging.execute('UPDATE import_state SET done = 1')
+        staged = staging.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]
+    finally:
+        reader.close()
+        staging.close()
+    return name, rows_read, staged
+
+class LegacyImporter:
+    def __init__(self, source, path, workers=4, chunk_rows=CHUNK_ROWS):
+        self.source = os.path.abspath(source)
+        self.path = os.path.abspath(path)
+        self.staging_dir = self.path + '.import'
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.connection = None
+
+    def create_schema(self):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{self.path}'
+        app.config['SQLALCHEMY_BINDS'] = database_binds(self.path)
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            db.engine.dispose()
+
+    def legacy_tables(self):
+        reader = sqlite3.connect(f'file:{self.source}?mode=ro', uri=True)
+        try:
+            present = {row[0] for row in reader.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            reader.close()
+        missing = [table.name for table in TABLES if table.name not in present]
+        if missing:
+            raise ValueError(f"{self.source} is not a legacy inventory database (missing {', '.join(missing)})")
+        return TABLES
+
+    def merged(self):
+        return {row[0]: row[1:] for row in self.connection.execute(
+            'SELECT table_name, source_rows, imported_rows FROM legacy_import WHERE merged_at IS NOT NULL')}
+
+    def stage(self, tables):
+        """Copy every table not merged yet into its staging database, in parallel"""
+        os.makedirs(self.staging_dir, exist_ok=True)
+        jobs = {}
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for table in tables:
+                create_sql = self.connection.execute(
+                    f"SELECT sql FROM {table.schema}.sqlite_master WHERE type = 'table' AND name = ?",
+                    (table.name,)).fetchone()[0]
+                future = pool.submit(copy_table, self.source, os.path.join(self.staging_dir, f'{table.name}.db'),
+                                     table.name, create_sql, self.chunk_rows)
+                jobs[future] = table.name
+            results = {}
+            for future in as_completed(jobs):
+                name, read, staged = future.result()
+                results[name] = (read, staged)
+                duplicates = f", {read - staged:,} duplicates skipped" if read != staged else ''
+                print(f"staged {name:<14} {staged:>10,} rows{duplicates}", file=sys.stderr)
+        return results
+
+    def merge(self, table, staged):
+        """Move one staged table into the target, applying the legacy foreign key actions"""
+        columns = [row[1] for row in self.connection.execute(f'PRAGMA {table.schema}.table_info({table.name})')]
+        select = [f'CASE WHEN {column} IN (SELECT id FROM main.{table.nullify[column]}) THEN {column} END'
+                  if column in table.nullify else column for column in columns]
+        where = ' AND '.join(f'{column} IN (SELECT id FROM main.{parent})' for column, parent in table.require.items())
+        self.connection.execute('ATTACH DATABASE ? AS stage', (os.path.join(self.staging_dir, f'{table.name}.db'),))
+        try:
+            self.connection.execute('BEGIN')
+            imported = self.connection.execute(
+                f"INSERT INTO {table.schema}.{table.name} ({', '.join(columns)}) SELECT {', '.join(select)} "
+                f"FROM stage.{table.name}" + (f' WHERE {where}' if where else '')).rowcount
+            self.connection.execute("""
+                UPDATE legacy_import SET source_rows = ?, imported_rows = ?, merged_at = ? WHERE table_name = ?
+            """, (staged[0], imported, datetime.utcnow().isoformat(), table.name))
+            self.connection.execute('COMMIT')
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+        finally:
+            self.connection.execute('DETACH DATABASE stage')
+        dropped = staged[1] - imported
+        print(f"merged {table.name:<14} {imported:>10,} rows" + (f", {dropped:,} orphans dropped" if dropped else ''),
+              file=sys.stderr)
+
+    def finish(self, tables):
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+        self.connection.execute('BEGIN')
+        # The target was created from the current models, so every migration is already in place
+        create_version_table(self.connection)
+        applied = {row[0] for row in self.connection.execute('SELECT version FROM database_version')}
+        self.connection.executemany('INSERT INTO database_version (version, description) VALUES (?, ?)', [
+            (migration.version, f'{migration.description} (schema created by import_legacy.py)')
+            for migration in MIGRATIONS if migration.version not in applied])
+        bump_connection(self.connection, [table.name for table in tables], now)
+        self.connection.execute("UPDATE legacy_import SET merged_at = ? WHERE table_name = '_finished'", (now,))
+        self.connection.execute('COMMIT')
+        self.connection.execute('ANALYZE')
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+    def run(self, force=False):
+        tables = self.legacy_tables()
+        resuming = False
+        if os.path.exists(self.path):
+            check = sqlite3.connect(self.path)
+            try:
+                resuming = check.execute("SELECT 1 FROM sqlite_master WHERE name = 'legacy_import'").fetchone() is not None
+            finally:
+                check.close()
+            if not resuming:
+                if not force:
+                    raise FileExistsError(f'{self.path} exists and is not a partial import; use --force to replace it')
+                os.remove(self.path)
+                for companion in (audit_database_path(self.path), archive_database_path(self.path)):
+                    if os.path.exists(companion):
+                        os.remove(companion)
+                shutil.rmtree(self.staging_dir, ignore_errors=True)
+        if not resuming:
+            self.create_schema()
+
+        self.connection = sqlite3.connect(self.path, isolation_level=None)
+        self.connection.execute('ATTACH DATABASE ? AS audit', (audit_database_path(self.path),))
+        try:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS legacy_import (
+                    table_name TEXT PRIMARY KEY, source_rows INTEGER, imported_rows INTEGER, merged_at TIMESTAMP
+                )
+            """)
+            self.connection.executemany('INSERT OR IGNORE INTO legacy_import (table_name) VALUES (?)',
+                                        [(table.name,) for table in tables] + [('_finished',)])
+            done = self.merged()
+            if '_finished' in done:
+                print(f"ℹ️ {self.source} was already imported into {self.path}")
+                return done
+            if resuming:
+                print(f"↻ Resuming import ({len(done)} of {len(tables)} tables merged)", file=sys.stderr)
+
+            pending = [table for table in tables if table.name not in done]
+            started = time.perf_counter()
+            staged = self.stage(pending)
+            print(f"staging done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+            for table in merge_order(pending, done):
+                self.merge(table, staged[table.name])
+            self.finish(tables)
+            print(f"✅ Imported {self.source} into {self.path} in {time.perf_counter() - started:.1f}s")
+            return self.merged()
+        finally:
+            self.connection.close()
+
+def main():
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='Legacy database (SQLite file with the Inventory_Management.sql schema)')
+    parser.add_argument('--db', default=os.getenv('INVENTORY_DB', os.path.join(basedir, 'inventory.db')),
+                        help='Target database (created from the current models)')
+    parser.add_argument('--force', action='store_true', help='Replace an existing target that is not a partial import')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='Parallel table copies')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Rows read and committed per chunk')
+    args = parser.parse_args()
+
+    try:
+        LegacyImporter(args.source, args.db, args.workers, args.chunk_rows).run(args.force)
+    except (FileExistsError, ValueError) as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted; run the same command again to resume", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Cross-process cache invalidation over the shared SQLite database
+
+Every worker keeps its own sqlite3 connection open and polls PRAGMA data_version, which
+changes whenever another connection commits. Only then is the small resource_versions
+table read, and subscribers are told which tables moved. Local commits are published
+directly. Caches never serve data older than INVALIDATION_MAX_STALENESS_MS: a read checks
+the bus first when the last poll is older than that.
+"""
+
+from collections import deque
+from datetime import datetime
+import os
+import sqlite3
+import threading
+import time
+
+VERSIONS_SQL = 'SELECT resource, version, updated_at FROM resource_versions'
+
+def _parse_timestamp(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+class InvalidationBus:
+    """Detects committed writes from any process and notifies subscribed caches"""
+
+    def __init__(self, poll_interval_ms=500, max_staleness_ms=1000):
+        self.poll_interval = poll_interval_ms / 1000
+        self.max_staleness = max_staleness_ms / 1000
+        self.database_path = None
+        self._connection = None
+        self._data_version = None
+        self._versions = {}
+        self._subscribers = []
+        self.caches = {}
+        self._lock = threading.RLock()
+        self._last_poll = 0.0
+        self._thread = None
+        self._stop = threading.Event()
+        self.polls = 0
+        self.changes_detected = 0
+        self._staleness_ms = deque(maxlen=1000)
+
+    def init_app(self, app):
+        """Attach to the app's SQLite database file"""
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        self.database_path = uri.split('sqlite:///', 1)[1] if uri.startswith('sqlite:///') else None
+        self.poll_interval = int(os.getenv('INVALIDATION_POLL_MS', self.poll_interval * 1000)) / 1000
+        self.max_staleness = int(os.getenv('INVALIDATION_MAX_STALENESS_MS', self.max_staleness * 1000)) / 1000
+
+    def subscribe(self, tables, callback):
+        """Call callback(changed, rows) when any of tables change
+
+        changed is {table: (version, updated_at)}; rows is {table: set of ids} for local
+        commits and None when only the table versions are known. tables=None subscribes
+        to every table.
+        """
+        self._subscribers.append((set(tables) if tables is not None else None, callback))
+
+    def publish(self, versions, detected=False, rows=None):
+        """Dispatch versions newer than the ones already seen"""
+        now = datetime.utcnow()
+        with self._lock:
+            changed = {
+                table: stamp for table, stamp in versions.items()
+                if table not in self._versions or self._versions[table][0] < stamp[0]
+            }
+            self._versions.update(changed)
+            if detected and changed:
+                self.changes_detected += 1
+                written = max((stamp[1] for stamp in changed.values() if stamp[1]), default=None)
+                if written:
+                    self._staleness_ms.append(max((now - written).total_seconds() * 1000, 0))
+
+        if changed:
+            for tables, callback in self._subscribers:
+                if tables is None or tables & changed.keys():
+                    callback(changed, rows)
+        return changed
+
+    def poll(self):
+        """Check data_version and publish changed table versions; cheap when nothing changed"""
+        if not self.database_path:
+            return {}
+        with self._lock:
+            self._last_poll = time.monotonic()
+            self.polls += 1
+            if self._connection is None:
+                self._connection = sqlite3.connect(self.database_path, check_same_thread=False)
+            data_version = self._connection.execute('PRAGMA data_version').fetchone()[0]
+            if data_version == self._data_version:
+                return {}
+            self._data_version = data_version
+            try:
+                rows = self._connection.execute(VERSIONS_SQL).fetchall()
+            except sqlite3.OperationalError:
+                return {}  # Table not created yet
+        return self.publish({row[0]: (row[1], _parse_timestamp(row[2])) for row in rows}, detected=True)
+
+    def ensure_fresh(self):
+        """Poll now if the last poll is older than the staleness bound"""
+        if time.monotonic() - self._last_poll >= self.max_staleness:
+            self.poll()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️ Invalidation poll failed: {str(e)}")
+
+    def start(self):
+        if self._thread is None and self.database_path:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='invalidation-bus', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._staleness_ms)
+        return {
+            'poll_interval_ms': round(self.poll_interval * 1000),
+            'max_staleness_ms': round(self.max_staleness * 1000),
+            'polls': self.polls,
+            'changes_detected': self.changes_detected,
+            'subscribers': len(self._subscribers),
+            'observed_staleness_ms': {
+                'samples': len(samples),
+                'p50': round(samples[len(samples) // 2], 2) if samples else None,
+                'p95': round(samples[int(len(samples) * 0.95)], 2) if samples else None,
+                'max': round(samples[-1], 2) if samples else None
+            },
+            'caches': {name: cache.stats() for name, cache in self.caches.items()}
+        }
+
+class CachedValue:
+    """A lazily loaded value that is dropped whenever one of its tables changes"""
+
+    def __init__(self, name, tables, loader):
+        self.name = name
+        self.tables = tuple(tables)
+        self.loader = loader
+        self._value = None
+        self._loaded = False
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+        bus.subscribe(self.tables, self.invalidate)
+        bus.caches[name] = self
+
+    def invalidate(self, changed=None, rows=None):
+        with self._lock:
+            self._generation += 1
+            self._value = None
+            self._loaded = False
+
+    def get(self):
+        bus.ensure_fresh()
+        with self._lock:
+            if self._loaded:
+                self.hits += 1
+                return self._value
+            generation = self._generation
+        value = self.loader()
+        with self._lock:
+            # Keep the value only if nothing was invalidated while it loaded
+            if generation == self._generation:
+                self._value = value
+                self._loaded = True
+            self.loads += 1
+        return value
+
+    def stats(self):
+        return {'tables': list(self.tables), 'loaded': self._loaded, 'loads': self.loads, 'hits': self.hits}
+
+class ReadThroughCache:
+    """Rows of a small table by id, loaded on first lookup and dropped when they change
+
+    Misses (including ids that do not exist) are loaded through loader(ids) and kept until
+    a commit touches those ids, or the table when the ids are not known.
+    """
+
+    def __init__(self, name, table, loader):
+        self.name = name
+        self.table = table
+        self.loader = loader
+        self._rows = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        bus.subscribe((table,), self.invalidate)
+        bus.caches[name] = self
+
+    def invalidate(self, changed=None, rows=None):
+        ids = rows.get(self.table) if rows is not None else None
+        with self._lock:
+            self._generation += 1
+            if ids is None:
+                self._rows.clear()
+            else:
+                for row_id in ids:
+                    self._rows.pop(row_id, None)
+
+    def get_many(self, ids):
+        """Return {id: row or None} for the given ids"""
+        bus.ensure_fresh()
+        found = {}
+        with self._lock:
+            for row_id in ids:
+                if row_id in self._rows:
+                    found[row_id] = self._rows[row_id]
+            missing = [row_id for row_id in ids if row_id not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+            generation = self._generation
+        if missing:
+            loaded = self.loader(missing)
+            with self._lock:
+                for row_id in missing:
+                    found[row_id] = loaded.get(row_id)
+                    # Skip storing if the table changed while loading
+                    if generation == self._generation:
+                        self._rows[row_id] = found[row_id]
+        return found
+
+    def get(self, row_id):
+        if row_id is None:
+            return None
+        return self.get_many([row_id])[row_id]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'table': self.table,
+                'rows': len(self._rows),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0
+            }
+
+bus = InvalidationBus()
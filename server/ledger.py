@@ -0,0 +1,163 @@
+"""
+Stock movement ledger - append-only quantity history with per-SKU snapshot checkpoints
+"""
+
+from models import db, Inventory, StockMovement
+from versioning import mark_changed
+from sqlalchemy import text
+from datetime import datetime
+
+MOVEMENT_REASONS = ('opening', 'order', 'po_receipt', 'adjustment')
+
+# Ledger balance per item: latest snapshot at or before :as_of plus the movements after it
+BALANCES_SQL = """
+    WITH latest_snapshot AS (
+        SELECT inventory_id, quantity, last_movement_id FROM (
+            SELECT inventory_id, quantity, last_movement_id,
+                   ROW_NUMBER() OVER (PARTITION BY inventory_id ORDER BY taken_at DESC, id DESC) AS rn
+            FROM stock_snapshots
+            WHERE taken_at <= :as_of {snapshot_filter}
+        ) WHERE rn = 1
+    )
+    SELECT i.id,
+           COALESCE(s.quantity, 0) + COALESCE((
+               SELECT SUM(m.quantity_change) FROM stock_movements m
+               WHERE m.inventory_id = i.id
+                 AND m.id > COALESCE(s.last_movement_id, 0)
+                 AND m.created_at <= :as_of
+           ), 0) AS quantity
+    FROM inventory i
+    LEFT JOIN latest_snapshot s ON s.inventory_id = i.id
+    WHERE 1 = 1 {inventory_filter}
+"""
+
+def _timestamp(value):
+    """Format a datetime the way SQLAlchemy stores it in SQLite"""
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def record_movement(inventory_id, quantity_change, reason, reference_id=None, user_id=None, created_at=None):
+    """Append a movement to the ledger (caller commits); created_at defaults to now, an
+    'opening' movement passes the item's created_at"""
+    if reason not in MOVEMENT_REASONS:
+        raise ValueError(f'Invalid stock movement reason: {reason}')
+    if not quantity_change:
+        return None
+
+    movement = StockMovement(
+        inventory_id=inventory_id,
+        quantity_change=int(quantity_change),
+        reason=reason,
+        reference_id=reference_id,
+        user_id=user_id,
+        created_at=created_at or datetime.utcnow()
+    )
+    db.session.add(movement)
+    return movement
+
+def ensure_opening_balances():
+    """Write an opening movement for every item that has no ledger history yet
+
+    The opening movement is dated at the item's created_at, so point-in-time queries
+    between the item's creation and the ledger's introduction return its quantity at
+    introduction rather than zero. Existing movements are never touched: the ledger is
+    append-only.
+    """
+    result = db.session.execute(text("""
+        INSERT INTO stock_movements (inventory_id, quantity_change, reason, created_at)
+        SELECT i.id, i.quantity, 'opening', COALESCE(i.created_at, :now)
+        FROM inventory i
+        WHERE i.quantity != 0
+          AND NOT EXISTS (SELECT 1 FROM stock_movements m WHERE m.inventory_id = i.id)
+    """), {'now': _timestamp(datetime.utcnow())})
+    if result.rowcount:
+        mark_changed('stock_movements')
+    db.session.commit()
+    return result.rowcount
+
+def ledger_start():
+    """Time of the earliest movement; the ledger cannot say what was on hand before it"""
+    return db.session.query(db.func.min(StockMovement.created_at)).scalar()
+
+def quantities_at(as_of, inventory_ids=None):
+    """Return {inventory_id: quantity on hand} at as_of for all or the given items"""
+    params = {'as_of': _timestamp(as_of)}
+    snapshot_filter = inventory_filter = ''
+    if inventory_ids is not None:
+        ids = ','.join(str(int(i)) for i in inventory_ids) or 'NULL'
+        snapshot_filter = f'AND inventory_id IN ({ids})'
+        inventory_filter = f'AND i.id IN ({ids})'
+
+    sql = BALANCES_SQL.format(snapshot_filter=snapshot_filter, inventory_filter=inventory_filter)
+    return {row[0]: int(row[1]) for row in db.session.execute(text(sql), params)}
+
+def quantity_at(inventory_id, as_of):
+    """Return the quantity on hand for one item at as_of"""
+    return quantities_at(as_of, [inventory_id]).get(inventory_id, 0)
+
+def take_snapshots():
+    """Checkpoint the ledger balance of every item that moved since its last snapshot"""
+    now = datetime.utcnow()
+    result = db.session.execute(text("""
+        INSERT INTO stock_snapshots (inventory_id, quantity, last_movement_id, taken_at)
+        SELECT m.inventory_id,
+               COALESCE(s.quantity, 0) + SUM(m.quantity_change),
+               MAX(m.id),
+               :now
+        FROM stock_movements m
+        LEFT JOIN (
+            SELECT inventory_id, quantity, last_movement_id FROM (
+                SELECT inventory_id, quantity, last_movement_id,
+                       ROW_NUMBER() OVER (PARTITION BY inventory_id ORDER BY last_movement_id DESC) AS rn
+                FROM stock_snapshots
+            ) WHERE rn = 1
+        ) s ON s.inventory_id = m.inventory_id
+        WHERE m.id > COALESCE(s.last_movement_id, 0)
+          AND m.created_at <= :now
+        GROUP BY m.inventory_id
+    """), {'now': _timestamp(now)})
+    if result.rowcount:
+        mark_changed('stock_snapshots')
+    db.session.commit()
+    return {'snapshots_created': result.rowcount, 'taken_at': now.isoformat()}
+
+def verify_ledger():
+    """Compare each item's ledger balance against Inventory.quantity"""
+    balances = quantities_at(datetime.utcnow())
+    mismatches = []
+    checked = 0
+    for inventory_id, name, quantity in db.session.query(Inventory.id, Inventory.name, Inventory.quantity).all():
+        checked += 1
+        ledger_quantity = balances.get(inventory_id, 0)
+        if ledger_quantity != quantity:
+            mismatches.append({
+                'inventory_id': inventory_id,
+                'name': name,
+                'quantity': quantity,
+                'ledger_quantity': ledger_quantity,
+                'difference': quantity - ledger_quantity
+            })
+
+    return {
+        'checked': checked,
+        'mismatches': mismatches,
+        'is_consistent': not mismatches,
+        'verified_at': datetime.utcnow().isoformat()
+    }
+
+def scheduled_snapshot():
+    """Scheduler entry point - checkpoint ledger balances"""
+    return take_snapshots()
+
+def scheduled_verify():
+    """Scheduler entry point - verify the ledger and audit any mismatches"""
+    from database import create_audit_log
+
+    report = verify_ledger()
+    if report['mismatches']:
+        create_audit_log('LEDGER_MISMATCH', 'stock_movements', None, None, None, {
+            'checked': report['checked'],
+            'mismatches': report['mismatches'][:100]
+        })
+        db.session.commit()
+        print(f"⚠️ Stock ledger mismatch for {len(report['mismatches'])} items")
+    return report
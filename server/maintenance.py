@@ -0,0 +1,369 @@
+"""
+Database maintenance - planner statistics, free space, WAL checkpoints and storage reporting
+
+Runs from the job scheduler, but only inside the maintenance window (MAINTENANCE_WINDOW,
+UTC, e.g. "01:00-05:00") while the app is quiet (at most MAINTENANCE_MAX_RPS requests per
+second over the last minute). Each run has a time budget (MAINTENANCE_BUDGET_SECONDS) that
+every task checks before starting more work:
+
+- optimize    PRAGMA optimize, with PRAGMA analysis_limit bounding the rows it samples
+- analyze     ANALYZE one table at a time, resuming with the next table in the next run,
+              until every table has fresh statistics (then again after ANALYZE_INTERVAL)
+- vacuum      incremental_vacuum in steps when auto_vacuum is incremental; otherwise a full
+              VACUUM (switching to incremental) once free pages pass MAINTENANCE_VACUUM_FREE_PERCENT,
+              only if its estimated duration fits the remaining budget; a forced run skips the
+              threshold only when it names vacuum
+- checkpoint  PRAGMA wal_checkpoint(TRUNCATE) when the database is in WAL mode
+- storage     per-table and per-index page usage from dbstat, kept in storage_snapshots
+              once per STORAGE_SNAPSHOT_INTERVAL for the growth trend in admin stats
+
+The first four run on every database file the app uses: the main database, then the
+SQLALCHEMY_BINDS (the audit database, whose rotation deletes rows as fast as the app writes
+them), then the cold-storage archive (cold_storage.py), which is attached to the main
+connections but maintained through a connection of its own. The storage snapshot covers all
+of them at once; objects outside the main database are named '<bind or schema>.<name>', e.g.
+audit.audit_logs or archive.orders.
+"""
+
+from models import db, StorageSnapshot
+from metrics import request_metrics
+from cold_storage import cold_storage, ARCHIVE_SCHEMA
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from datetime import datetime, timedelta
+import os
+import threading
+import time
+
+TASKS = ('optimize', 'analyze', 'vacuum', 'checkpoint', 'storage')
+
+# Pages released per incremental_vacuum step, between budget checks
+VACUUM_STEP_PAGES = 2000
+# Assumed VACUUM throughput until one has been measured
+DEFAULT_VACUUM_BYTES_PER_SECOND = 50 * 1024 * 1024
+
+def _parse_window(value):
+    """'01:00-05:00' -> ((1, 0), (5, 0)); an empty value means any time"""
+    if not value:
+        return None
+    start, end = value.split('-')
+    parse = lambda text: tuple(int(part) for part in text.strip().split(':'))
+    return parse(start), parse(end)
+
+def _in_window(window, now):
+    if window is None:
+        return True
+    start, end = window
+    current = (now.hour, now.minute)
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end  # window across midnight
+
+class DatabaseMaintenance:
+    def __init__(self):
+        self.window = None
+        self.max_rps = 1.0
+        self.budget_seconds = 60.0
+        self.analysis_limit = 1000
+        self.vacuum_free_percent = 10.0
+        self.analyze_interval = 86400
+        self.snapshot_interval = 86400
+        self.vacuum_bytes_per_second = DEFAULT_VACUUM_BYTES_PER_SECOND
+        # Round-robin ANALYZE state per database
+        self._analyze_pending = {}
+        self._analyzed_at = {}
+        self._lock = threading.Lock()
+        self._archive_engine = None
+        self.last_run = None
+
+    def init_app(self, app):
+        self.window = _parse_window(os.getenv('MAINTENANCE_WINDOW', '01:00-05:00'))
+        self.max_rps = float(os.getenv('MAINTENANCE_MAX_RPS', self.max_rps))
+        self.budget_seconds = float(os.getenv('MAINTENANCE_BUDGET_SECONDS', self.budget_seconds))
+        self.analysis_limit = int(os.getenv('MAINTENANCE_ANALYSIS_LIMIT', self.analysis_limit))
+        self.vacuum_free_percent = float(os.getenv('MAINTENANCE_VACUUM_FREE_PERCENT', self.vacuum_free_percent))
+        self.analyze_interval = int(os.getenv('ANALYZE_INTERVAL', self.analyze_interval))
+        self.snapshot_interval = int(os.getenv('STORAGE_SNAPSHOT_INTERVAL', self.snapshot_interval))
+
+    # Scheduling
+    def idle_reason(self, now=None):
+        """Why maintenance should wait now, or None"""
+        if not _in_window(self.window, now or datetime.utcnow()):
+            return 'outside maintenance window'
+        rate, in_flight = request_metrics.recent_load()
+        if rate > self.max_rps or in_flight > 0:
+            return f'app busy ({rate:.2f} req/s, {in_flight} in flight)'
+        return None
+
+    def run(self, tasks=None, force=False, budget_seconds=None):
+        """Run the given tasks (default all) within the time budget; returns a result per task"""
+        if not force:
+            reason = self.idle_reason()
+            if reason:
+                return {'skipped': reason}
+        if not self._lock.acquire(blocking=False):
+            return {'skipped': 'maintenance already running'}
+        try:
+            deadline = time.perf_counter() + (budget_seconds or self.budget_seconds)
+            named = set(tasks or ())
+            tasks = tasks or TASKS
+            database_tasks = [task for task in tasks if task != 'storage']
+            results = {}
+            for database, engine in self.databases():
+                if not database_tasks:
+                    break
+                connection = engine.raw_connection()
+                sqlite_connection = connection.driver_connection
+                try:
+                    # Statements below run outside any transaction (VACUUM requires it)
+                    sqlite_connection.isolation_level = None
+                    cursor = sqlite_connection.cursor()
+                    # Forcing a run rewrites a database without free space only if vacuum was asked for
+                    results[database] = {task: self._run_task(task, deadline, cursor, database, deadline,
+                                                              force and (task != 'vacuum' or task in named))
+                                         for task in database_tasks}
+                finally:
+                    sqlite_connection.isolation_level = ''
+                    connection.close()
+            if 'storage' in tasks:
+                results['storage'] = self._run_task('storage', deadline, force)
+            self.last_run = {'at': datetime.utcnow().isoformat(), 'results': results}
+            return results
+        finally:
+            self._lock.release()
+
+    def databases(self):
+        """[(name, engine)] of every database file: main first, then the binds, then the archive"""
+        binds = sorted((key, engine) for key, engine in db.engines.items() if key is not None)
+        databases = [('main', db.engine)] + binds
+        if cold_storage.path and os.path.exists(cold_storage.path):
+            if self._archive_engine is None or self._archive_engine.url.database != cold_storage.path:
+                self._archive_engine = create_engine(f'sqlite:///{cold_storage.path}', poolclass=NullPool)
+            databases.append((ARCHIVE_SCHEMA, self._archive_engine))
+        return databases
+
+    def _run_task(self, task, deadline, *args):
+        if deadline - time.perf_counter() <= 0:
+            return {'skipped': 'time budget used up'}
+        started = time.perf_counter()
+        try:
+            result = getattr(self, f'_{task}')(*args)
+        except Exception as e:
+            result = {'error': str(e)}
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result
+
+    # Tasks
+    def _optimize(self, cursor, database, deadline, force):
+        cursor.execute(f'PRAGMA analysis_limit = {self.analysis_limit}')
+        cursor.execute('PRAGMA optimize')
+        return {'done': True}
+
+    def _analyze(self, cursor, database, deadline, force):
+        now = time.time()
+        pending = self._analyze_pending.setdefault(database, [])
+        if not pending:
+            analyzed_at = self._analyzed_at.get(database)
+            if not force and analyzed_at and now - analyzed_at < self.analyze_interval:
+                return {'skipped': 'statistics are fresh'}
+            pending.extend(row[0] for row in cursor.execute(
+                "SELECT name FROM main.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"))
+        cursor.execute(f'PRAGMA analysis_limit = {self.analysis_limit}')
+        analyzed = []
+        while pending and time.perf_counter() < deadline:
+            table = pending.pop(0)
+            cursor.execute(f'ANALYZE main."{table}"')
+            analyzed.append(table)
+        if not pending:
+            self._analyzed_at[database] = now
+        return {'tables': analyzed, 'remaining': len(pending)}
+
+    def _vacuum(self, cursor, database, deadline, force):
+        page_size = cursor.execute('PRAGMA page_size').fetchone()[0]
+        page_count = cursor.execute('PRAGMA page_count').fetchone()[0]
+        free_pages = cursor.execute('PRAGMA freelist_count').fetchone()[0]
+        auto_vacuum = cursor.execute('PRAGMA auto_vacuum').fetchone()[0]
+        free_percent = free_pages / page_count * 100 if page_count else 0
+        result = {'free_pages': free_pages, 'free_percent': round(free_percent, 2)}
+
+        if auto_vacuum == 2:  # incremental
+            released = 0
+            while free_pages and time.perf_counter() < deadline:
+                cursor.execute(f'PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})').fetchall()
+                remaining = cursor.execute('PRAGMA freelist_count').fetchone()[0]
+                if remaining >= free_pages:
+                    break
+                released += free_pages - remaining
+                free_pages = remaining
+            result.update({'mode': 'incremental', 'released_bytes': released * page_size})
+            return result
+
+        if free_percent < self.vacuum_free_percent and not force:
+            result['skipped'] = f'free space below {self.vacuum_free_percent:g}%'
+            return result
+        estimate = page_count * page_size / self.vacuum_bytes_per_second
+        remaining = deadline - time.perf_counter()
+        if estimate > remaining:
+            result['skipped'] = f'full VACUUM estimated at {estimate:.1f}s, {remaining:.1f}s of budget left'
+            return result
+        # A full VACUUM blocks writers while it runs; afterwards incremental steps are enough
+        started = time.perf_counter()
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+        seconds = time.perf_counter() - started
+        self.vacuum_bytes_per_second = max(page_count * page_size / max(seconds, 1e-3), 1024 * 1024)
+        after = cursor.execute('PRAGMA page_count').fetchone()[0]
+        # Switching to incremental adds pointer-map pages, so the file can grow by a page or two
+        result.update({'mode': 'full', 'released_bytes': max(page_count - after, 0) * page_size})
+        return result
+
+    def _checkpoint(self, cursor, database, deadline, force):
+        mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+        if mode != 'wal':
+            return {'skipped': f'journal_mode is {mode}'}
+        busy, log_frames, checkpointed = cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+        return {'busy': bool(busy), 'wal_frames': log_frames, 'checkpointed_frames': checkpointed}
+
+    def _storage(self, force):
+        latest = db.session.query(db.func.max(StorageSnapshot.taken_at)).scalar()
+        db.session.commit()
+        if not force and latest and datetime.utcnow() - latest < timedelta(seconds=self.snapshot_interval):
+            return {'skipped': 'snapshot is recent'}
+        return {'objects': len(self.take_snapshot()['objects'])}
+
+    # Storage
+    def _file_bytes(self):
+        paths = [engine.url.database for _, engine in self.databases()]
+        return sum(os.path.getsize(path) for path in paths if path and os.path.exists(path))
+
+    def _database_objects(self, cursor, prefix):
+        """dbstat pages and bytes per table and index of one database, plus its free list"""
+        page_size = cursor.execute('PRAGMA page_size').fetchone()[0]
+        free_pages = cursor.execute('PRAGMA freelist_count').fetchone()[0]
+        owners = {name: (kind, table) for kind, name, table in cursor.execute(
+            "SELECT type, name, tbl_name FROM main.sqlite_master WHERE type IN ('table', 'index')")}
+        objects = []
+        for name, pages, size, unused in cursor.execute(
+                "SELECT name, pageno, pgsize, unused FROM dbstat('main') WHERE aggregate = TRUE"):
+            kind, table = owners.get(name, ('table', name))
+            objects.append({'name': prefix + name, 'table': prefix + table, 'kind': kind,
+                            'pages': pages, 'bytes': size, 'unused_bytes': unused})
+        if free_pages:
+            objects.append({'name': prefix + '(free pages)', 'table': None, 'kind': 'free',
+                            'pages': free_pages, 'bytes': free_pages * page_size, 'unused_bytes': free_pages * page_size})
+        return page_size, objects
+
+    def storage_report(self):
+        """Pages and bytes per table and index from dbstat, plus the free lists, of every database"""
+        objects = []
+        databases = []
+        for database, engine in self.databases():
+            connection = engine.raw_connection()
+            try:
+                page_size, database_objects = self._database_objects(
+                    connection.cursor(), '' if database == 'main' else f'{database}.')
+            finally:
+                connection.close()
+            path = engine.url.database
+            databases.append({
+                'name': database,
+                'path': path,
+                'file_bytes': os.path.getsize(path) if path and os.path.exists(path) else None,
+                'page_size': page_size,
+                'total_bytes': sum(item['bytes'] for item in database_objects),
+                'free_bytes': sum(item['bytes'] for item in database_objects if item['kind'] == 'free')
+            })
+            objects += database_objects
+        objects.sort(key=lambda item: -item['bytes'])
+        return {
+            'databases': databases,
+            'file_bytes': sum(database['file_bytes'] or 0 for database in databases),
+            'total_bytes': sum(item['bytes'] for item in objects),
+            'free_bytes': sum(database['free_bytes'] for database in databases),
+            'objects': objects,
+            'measured_at': datetime.utcnow().isoformat()
+        }
+
+    def take_snapshot(self):
+        report = self.storage_report()
+        taken_at = datetime.utcnow()
+        db.session.bulk_insert_mappings(StorageSnapshot, [{
+            'taken_at': taken_at, 'name': item['name'], 'table_name': item['table'], 'kind': item['kind'],
+            'pages': item['pages'], 'bytes': item['bytes'], 'unused_bytes': item['unused_bytes']
+        } for item in report['objects']])
+        db.session.commit()
+        return report
+
+    def growth_trend(self, days=30, top=5):
+        """Total size per snapshot over the last `days`, bytes per day, and the fastest-growing tables"""
+        since = datetime.utcnow() - timedelta(days=days)
+        rows = db.session.query(
+            StorageSnapshot.taken_at, StorageSnapshot.table_name, StorageSnapshot.kind, StorageSnapshot.bytes
+        ).filter(StorageSnapshot.taken_at >= since).order_by(StorageSnapshot.taken_at).all()
+        series = {}
+        tables = {}
+        for taken_at, table, kind, size in rows:
+            point = series.setdefault(taken_at, {'taken_at': taken_at.isoformat(), 'total_bytes': 0, 'free_bytes': 0})
+            point['total_bytes'] += size
+            if kind == 'free':
+                point['free_bytes'] += size
+            else:
+                per_table = tables.setdefault(table, {})
+                per_table[taken_at] = per_table.get(taken_at, 0) + size
+        points = list(series.values())
+        if len(points) < 2:
+            return {'series': points, 'bytes_per_day': None, 'growing_tables': []}
+
+        first, last = min(series), max(series)
+        elapsed_days = max((last - first).total_seconds() / 86400, 1e-9)
+        growth = []
+        for table, sizes in tables.items():
+            start, end = sizes.get(first, 0), sizes.get(last, 0)
+            if end != start:
+                growth.append({'table': table, 'bytes': end, 'bytes_per_day': round((end - start) / elapsed_days)})
+        growth.sort(key=lambda item: -item['bytes_per_day'])
+        return {
+            'series': points,
+            'bytes_per_day': round((series[last]['total_bytes'] - series[first]['total_bytes']) / elapsed_days),
+            'growing_tables': growth[:top]
+        }
+
+    def storage_summary(self):
+        """Latest snapshot totals and the growth trend, for admin stats (no dbstat walk)"""
+        latest = db.session.query(db.func.max(StorageSnapshot.taken_at)).scalar()
+        largest = []
+        total = free = 0
+        if latest:
+            for item in StorageSnapshot.query.filter_by(taken_at=latest).order_by(StorageSnapshot.bytes.desc()).all():
+                total += item.bytes
+                if item.kind == 'free':
+                    free += item.bytes
+                elif len(largest) < 5:
+                    largest.append(item.to_dict())
+        return {
+            'file_bytes': self._file_bytes(),
+            'snapshot_at': latest.isoformat() if latest else None,
+            'total_bytes': total,
+            'free_bytes': free,
+            'largest_objects': largest,
+            'trend': self.growth_trend()
+        }
+
+    def status(self):
+        return {
+            'window_utc': '-'.join(f'{h:02d}:{m:02d}' for h, m in self.window) if self.window else None,
+            'max_requests_per_second': self.max_rps,
+            'budget_seconds': self.budget_seconds,
+            'idle_reason': self.idle_reason(),
+            'analyze_pending': {database: len(pending) for database, pending in self._analyze_pending.items()},
+            'last_analyzed_at': {database: datetime.utcfromtimestamp(analyzed_at).isoformat()
+                                 for database, analyzed_at in self._analyzed_at.items()},
+            'vacuum_bytes_per_second': round(self.vacuum_bytes_per_second),
+            'last_run': self.last_run
+        }
+
+database_maintenance = DatabaseMaintenance()
+
+def scheduled_maintenance():
+    """Scheduler entry point - run the maintenance tasks if the app is in a quiet window"""
+    return database_maintenance.run()
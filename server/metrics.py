@@ -0,0 +1,234 @@
+"""
+Per-route request metrics with bounded memory
+
+Every request is timed by a thin WSGI wrapper and recorded against its URL rule (not the
+raw path, so /api/inventory/7 and /api/inventory/8 share one series). Latencies go into
+fixed log-spaced buckets, four per doubling from 10µs, which keeps each route at a few
+hundred bytes no matter how much traffic it sees and puts percentiles within about 10%.
+"""
+
+from bisect import bisect_left
+from flask.globals import request_ctx
+import threading
+import time
+
+# Bucket upper bounds in seconds: 10µs * 2^(i/4), roughly 10µs to 5.6 minutes
+BUCKETS_PER_DOUBLING = 4
+BUCKET_BOUNDS = tuple(1e-5 * 2 ** (i / BUCKETS_PER_DOUBLING) for i in range(101))
+
+# Requests that matched no route share one series so bad paths cannot grow the table
+UNMATCHED = 'unmatched'
+
+ROUTE_KEY = 'metrics.route'
+
+class LatencyHistogram:
+    """Log-bucketed latency counts; the last bucket catches everything above the top bound"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """Approximate percentile in seconds (geometric middle of the bucket it falls in)"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank and bucket:
+                if index >= len(BUCKET_BOUNDS):
+                    return self.max
+                upper = BUCKET_BOUNDS[index]
+                lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+                return min((lower * upper) ** 0.5 if lower else upper, self.max)
+        return self.max
+
+    def cumulative(self, step=BUCKETS_PER_DOUBLING):
+        """[(upper bound, cumulative count)] at every `step`-th bound, for Prometheus buckets"""
+        result = []
+        running = 0
+        for index, bucket in enumerate(self.counts[:len(BUCKET_BOUNDS)]):
+            running += bucket
+            if index % step == 0:
+                result.append((BUCKET_BOUNDS[index], running))
+        return result
+
+class RouteStats:
+    __slots__ = ('histogram', 'client_errors', 'server_errors')
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.client_errors = 0
+        self.server_errors = 0
+
+class RequestMetrics:
+    """Collects per-route latency, status and concurrency for the whole process"""
+
+    def __init__(self, window_seconds=60):
+        self._routes = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.in_flight = 0
+        # Per-second request counts for the recent throughput figure
+        self.window_seconds = window_seconds
+        self._window = [0] * window_seconds
+        self._window_second = [0] * window_seconds
+
+    def init_app(self, app):
+        """Wrap the WSGI app and tag each request with its URL rule"""
+        app.before_request(self._tag_route)
+        app.wsgi_app = self.middleware(app.wsgi_app)
+
+    @staticmethod
+    def _tag_route():
+        # One context lookup instead of going through the request proxy for each attribute
+        req = request_ctx.request
+        rule = req.url_rule
+        req.environ[ROUTE_KEY] = f"{req.method} {rule.rule}" if rule is not None else UNMATCHED
+
+    def middleware(self, wsgi_app):
+        def instrumented(environ, start_response):
+            status = [500]
+
+            def capture(status_line, headers, exc_info=None):
+                status[0] = int(status_line[:3])
+                return start_response(status_line, headers, exc_info)
+
+            with self._lock:
+                self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                return wsgi_app(environ, capture)
+            finally:
+                self.record(environ.get(ROUTE_KEY, UNMATCHED), status[0], time.perf_counter() - started)
+        return instrumented
+
+    def record(self, route, status, seconds):
+        second = int(time.time())
+        slot = second % self.window_seconds
+        with self._lock:
+            self.in_flight -= 1
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats()
+            stats.histogram.record(seconds)
+            if status >= 500:
+                stats.server_errors += 1
+            elif status >= 400:
+                stats.client_errors += 1
+            if self._window_second[slot] != second:
+                self._window_second[slot] = second
+                self._window[slot] = 0
+            self._window[slot] += 1
+
+    def _recent_rate(self):
+        now = int(time.time())
+        recent = sum(count for count, second in zip(self._window, self._window_second)
+                     if now - second < self.window_seconds)
+        return recent / min(self.window_seconds, max(time.time() - self.started_at, 1))
+
+    def recent_load(self):
+        """(requests per second over the last window, requests in flight)"""
+        with self._lock:
+            return self._recent_rate(), self.in_flight
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self.started_at = time.time()
+            self._window = [0] * self.window_seconds
+            self._window_second = [0] * self.window_seconds
+
+    def snapshot(self):
+        """Per-route and overall figures for the admin stats endpoint (times in ms)"""
+        with self._lock:
+            uptime = max(time.time() - self.started_at, 1e-9)
+            overall = LatencyHistogram()
+            routes = {}
+            client_errors = server_errors = 0
+            for route, stats in self._routes.items():
+                histogram = stats.histogram
+                for index, bucket in enumerate(histogram.counts):
+                    overall.counts[index] += bucket
+                overall.count += histogram.count
+                overall.total += histogram.total
+                overall.max = max(overall.max, histogram.max)
+                client_errors += stats.client_errors
+                server_errors += stats.server_errors
+                routes[route] = _summary(histogram, uptime, stats.client_errors, stats.server_errors)
+            result = _summary(overall, uptime, client_errors, server_errors)
+            result.update({
+                'uptime_seconds': round(uptime),
+                'in_flight': self.in_flight,
+                'requests_per_second_1m': round(self._recent_rate(), 3),
+                'routes': dict(sorted(routes.items(), key=lambda item: -item[1]['total_ms']))
+            })
+            return result
+
+    def prometheus(self):
+        """Render the metrics in the Prometheus text exposition format"""
+        lines = [
+            '# HELP http_request_duration_seconds Request latency by route',
+            '# TYPE http_request_duration_seconds histogram'
+        ]
+        with self._lock:
+            routes = sorted(self._routes.items())
+            for route, stats in routes:
+                label = _label(route)
+                for bound, count in stats.histogram.cumulative():
+                    lines.append(f'http_request_duration_seconds_bucket{{route="{label}",le="{bound:.6g}"}} {count}')
+                histogram = stats.histogram
+                lines.append(f'http_request_duration_seconds_bucket{{route="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'http_request_duration_seconds_sum{{route="{label}"}} {histogram.total:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{route="{label}"}} {histogram.count}')
+
+            lines += ['# HELP http_request_errors_total Responses with 4xx or 5xx status by route',
+                      '# TYPE http_request_errors_total counter']
+            for route, stats in routes:
+                label = _label(route)
+                lines.append(f'http_request_errors_total{{route="{label}",class="4xx"}} {stats.client_errors}')
+                lines.append(f'http_request_errors_total{{route="{label}",class="5xx"}} {stats.server_errors}')
+
+            lines += ['# HELP http_requests_in_flight Requests currently being handled',
+                      '# TYPE http_requests_in_flight gauge',
+                      f'http_requests_in_flight {self.in_flight}',
+                      '# HELP process_start_time_seconds Start time of the metrics window',
+                      '# TYPE process_start_time_seconds gauge',
+                      f'process_start_time_seconds {self.started_at:.3f}']
+        return '\n'.join(lines) + '\n'
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+def _summary(histogram, uptime, client_errors, server_errors):
+    count = histogram.count
+    return {
+        'requests': count,
+        'requests_per_second': round(count / uptime, 3),
+        'avg_ms': _ms(histogram.total / count) if count else None,
+        'p50_ms': _ms(histogram.percentile(0.50)),
+        'p95_ms': _ms(histogram.percentile(0.95)),
+        'p99_ms': _ms(histogram.percentile(0.99)),
+        'max_ms': _ms(histogram.max) if count else None,
+        'total_ms': _ms(histogram.total),
+        'client_errors': client_errors,
+        'server_errors': server_errors,
+        'error_rate': round(server_errors / count * 100, 2) if count else 0
+    }
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+request_metrics = RequestMetrics()
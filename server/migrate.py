@@ -1,149 +1,596 @@
 #!/usr/bin/env python3
 """
 Database migration utility for Flask Inventory Management System
+
+Migrations are registered in MIGRATIONS in version order and are made of steps:
+
+  Schema    DDL run in one short transaction (indexes, added columns); statements are
+            idempotent so an interrupted migration can be run again.
+  Backfill  an UPDATE over the rows still matching `pending`, applied in id-range chunks
+            of --chunk-size rows, each in its own transaction, at no more than
+            --rows-per-second. The position is saved in migration_progress after every
+            chunk, so a stopped backfill resumes where it left off, and the app keeps
+            serving requests between chunks.
+  MoveRows  a table's rows moved into another attached database in the same resumable
+            chunks (copy and delete of a chunk commit together).
+
+The audit database (audit_store.py) is attached to the migration connection as `audit`, and
+the cold-storage archive (cold_storage.py), when it exists, as `archive`.
+
+Versions are compared numerically and every applied version is recorded in
+database_version. --dry-run changes nothing: it runs the pending steps on a sample of each
+table copied into memory and extrapolates the time per step to the real row counts.
 """
 
+import argparse
 import os
-import sys
+import re
 import sqlite3
+import sys
+import time
 from datetime import datetime
 
-def backup_database():
-    """Create a backup of the current database"""
-    if os.path.exists('inventory.db'):
-        backup_name = f'inventory_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db'
-        os.system(f'cp inventory.db {backup_name}')
+from audit_store import audit_database_path
+from cold_storage import archive_database_path
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_DB = os.getenv('INVENTORY_DB', os.path.join(basedir, 'inventory.db'))
+
+# Rows per table copied into memory for --dry-run estimates
+SAMPLE_ROWS = 20000
+# Seconds the migration connection waits for the app's write locks, and vice versa per chunk
+BUSY_TIMEOUT_MS = 10000
+PROGRESS_INTERVAL = 2.0
+
+def parse_version(version):
+    """'1.10.0' -> (1, 10, 0), so versions sort numerically rather than as strings"""
+    return tuple(int(part) for part in version.split('.'))
+
+def format_seconds(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds / 3600:.1f}h"
+
+def column_names(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+
+def table_exists(conn, table, schema='main'):
+    return conn.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?",
+                        (table,)).fetchone() is not None
+
+# Steps
+class Schema:
+    """DDL applied in a single transaction"""
+    kind = 'schema'
+
+    def __init__(self, description, statements, tables=()):
+        self.description = description
+        self.statements = statements
+        self.tables = tables
+
+    def apply(self, conn):
+        for statement in self.statements:
+            if callable(statement):
+                statement(conn)
+            else:
+                conn.execute(statement)
+
+def if_table(table, *statements):
+    """Schema statement running `statements` only when `table` is in the main database"""
+    def statement(conn):
+        if table_exists(conn, table):
+            for sql in statements:
+                conn.execute(sql)
+    return statement
+
+def add_column(table, column, definition):
+    """Schema statement adding a column unless it is already there"""
+    def statement(conn):
+        if column not in column_names(conn, table):
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return statement
+
+_TABLE_PRIMARY_KEY = re.compile(r',\s*PRIMARY\s+KEY\s*\(\s*"?id"?\s*\)', re.IGNORECASE)
+_ID_COLUMN = re.compile(r'([(,]\s*)"?id"?\s+INTEGER(\s+NOT\s+NULL)?(\s+PRIMARY\s+KEY)?', re.IGNORECASE)
+
+def autoincrement_sql(sql, name):
+    """CREATE TABLE `sql` rewritten as table `name` with an `id INTEGER PRIMARY KEY AUTOINCREMENT`"""
+    sql = _TABLE_PRIMARY_KEY.sub('', sql, count=1)
+    sql, found = _ID_COLUMN.subn(lambda match: f'{match.group(1)}id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT',
+                                 sql, count=1)
+    if not found:
+        raise ValueError(f'No integer id column in: {sql[:80]}')
+    return re.sub(r'^CREATE TABLE\s+("[^"]+"|\S+)', f'CREATE TABLE {name}', sql, count=1)
+
+def autoincrement(table):
+    """Schema statement rebuilding `table` with AUTOINCREMENT ids (rows, ids and indexes kept)
+    and starting its sequence above the ids the cold-storage archive already holds"""
+    def statement(conn):
+        if not table_exists(conn, table):
+            return
+        sql = conn.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                           (table,)).fetchone()[0]
+        if 'AUTOINCREMENT' not in sql.upper():
+            indexes = [row[0] for row in conn.execute(
+                "SELECT sql FROM main.sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') "
+                "AND sql IS NOT NULL", (table,))]
+            columns = ', '.join(f'"{row[1]}"' for row in conn.execute(f'PRAGMA main.table_info("{table}")'))
+            conn.execute(autoincrement_sql(sql, f'{table}_autoincrement'))
+            conn.execute(f'INSERT INTO main.{table}_autoincrement ({columns}) SELECT {columns} FROM main.{table}')
+            conn.execute(f'DROP TABLE main.{table}')
+            conn.execute(f'ALTER TABLE main.{table}_autoincrement RENAME TO {table}')
+            for index in indexes:
+                conn.execute(index)
+        attached = {row[1] for row in conn.execute('PRAGMA database_list')}
+        if 'archive' in attached and table_exists(conn, table, 'archive'):
+            archived = conn.execute(f'SELECT MAX(id) FROM archive.{table}').fetchone()[0] or 0
+            conn.execute('UPDATE main.sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?', (archived, table))
+            conn.execute('INSERT INTO main.sqlite_sequence (name, seq) SELECT ?, ? '
+                         'WHERE NOT EXISTS (SELECT 1 FROM main.sqlite_sequence WHERE name = ?)',
+                         (table, archived, table))
+    return statement
+
+class Backfill:
+    """UPDATE table SET assignments WHERE pending, in resumable id-range chunks"""
+    kind = 'backfill'
+
+    def __init__(self, description, table, assignments, pending):
+        self.description = description
+        self.table = table
+        self.assignments = assignments
+        self.pending = pending
+        self.tables = (table,)
+
+    def chunk_sql(self):
+        return f'UPDATE {self.table} SET {self.assignments} WHERE id > ? AND id <= ? AND ({self.pending})'
+
+    def apply_chunk(self, conn, lower, upper):
+        return conn.execute(self.chunk_sql(), (lower, upper)).rowcount
+
+    def apply(self, conn):
+        """Whole backfill at once (used on dry-run samples)"""
+        return conn.execute(f'UPDATE {self.table} SET {self.assignments} WHERE {self.pending}').rowcount
+
+class MoveRows:
+    """Move main.table into target.table in resumable id-range chunks; the target assigns new
+    ids, so rows the app already wrote there do not collide"""
+    kind = 'move'
+
+    def __init__(self, description, table, target, columns):
+        self.description = description
+        self.table = table
+        self.target = target
+        self.columns = columns
+        self.tables = (table,)
+
+    def apply_chunk(self, conn, lower, upper):
+        columns = ', '.join(self.columns)
+        conn.execute(f'INSERT INTO {self.target}.{self.table} ({columns}) SELECT {columns} FROM main.{self.table} '
+                     f'WHERE id > ? AND id <= ? ORDER BY id', (lower, upper))
+        return conn.execute(f'DELETE FROM main.{self.table} WHERE id > ? AND id <= ?', (lower, upper)).rowcount
+
+    def apply(self, conn):
+        """Whole table at once (used on dry-run samples)"""
+        if not table_exists(conn, self.table):
+            return 0
+        return self.apply_chunk(conn, -1, conn.execute(f'SELECT MAX(id) FROM main.{self.table}').fetchone()[0] or 0)
+
+def drop_moved(step):
+    """Schema statement moving rows written to main.table since the MoveRows step, then dropping it"""
+    def statement(conn):
+        if table_exists(conn, step.table):
+            step.apply(conn)
+            conn.execute(f'DROP TABLE main.{step.table}')
+    return statement
+
+AUDIT_COLUMNS = ['user_id', 'action', 'table_name', 'record_id', 'old_values', 'new_values', 'ip_address', 'created_at']
+MOVE_AUDIT_LOGS = MoveRows('audit_logs rows into the audit database', 'audit_logs', 'audit', AUDIT_COLUMNS)
+
+class Migration:
+    def __init__(self, version, description, steps):
+        self.version = version
+        self.description = description
+        self.steps = steps
+
+MIGRATIONS = [
+    Migration('1.1.0', 'Added performance indexes', [
+        Schema('single-column indexes', [
+            "CREATE INDEX IF NOT EXISTS idx_inventory_category ON inventory(category_id)",
+            "CREATE INDEX IF NOT EXISTS idx_inventory_sku ON inventory(sku)",
+            "CREATE INDEX IF NOT EXISTS idx_inventory_active ON inventory(is_active)",
+            "CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)",
+            "CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(created_at)",
+            # audit_logs is only in the main database before 1.4.0
+            if_table('audit_logs',
+                     "CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_logs(user_id)",
+                     "CREATE INDEX IF NOT EXISTS idx_audit_created ON audit_logs(created_at)")
+        ], tables=('inventory', 'orders', 'audit_logs'))
+    ]),
+    Migration('1.2.0', 'Added composite and partial indexes for hot queries', [
+        Schema('hot query indexes (see query_plans.py)', [
+            "CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id)",
+            "CREATE INDEX IF NOT EXISTS idx_order_items_inventory_id ON order_items(inventory_id)",
+            "CREATE INDEX IF NOT EXISTS idx_purchase_order_items_purchase_order_id ON purchase_order_items(purchase_order_id)",
+            "CREATE INDEX IF NOT EXISTS idx_inventory_vendors_inventory_id_vendor_id ON inventory_vendors(inventory_id, vendor_id)",
+            "CREATE INDEX IF NOT EXISTS idx_orders_status_created_at_total ON orders(status, created_at, total)",
+            "CREATE INDEX IF NOT EXISTS idx_inventory_name_where_is_active ON inventory(name) WHERE is_active = 1",
+            "CREATE INDEX IF NOT EXISTS idx_inventory_quantity_where_is_active ON inventory(quantity) WHERE is_active = 1",
+            "CREATE INDEX IF NOT EXISTS idx_purchase_orders_created_at ON purchase_orders(created_at DESC)",
+            # The planner only prefers the new indexes once it has statistics for them
+            "ANALYZE main"
+        ], tables=('order_items', 'purchase_order_items', 'inventory_vendors', 'orders', 'inventory', 'purchase_orders'))
+    ]),
+    Migration('1.3.0', 'Unit of measure columns for databases created before UOM support', [
+        Schema('add UOM columns', [
+            add_column('inventory', 'unit_of_measure', "VARCHAR(20) NOT NULL DEFAULT 'pcs'"),
+            add_column('inventory', 'price_per_uom', 'NUMERIC(10, 4)'),
+            add_column('inventory', 'conversion_factor', 'NUMERIC(10, 4) DEFAULT 1'),
+            add_column('inventory', 'base_unit', "VARCHAR(20) NOT NULL DEFAULT 'pcs'"),
+            add_column('order_items', 'unit_of_measure', "VARCHAR(20) NOT NULL DEFAULT 'pcs'"),
+            add_column('order_items', 'price_per_uom', 'NUMERIC(10, 4)'),
+            add_column('purchase_order_items', 'unit_of_measure', "VARCHAR(20) NOT NULL DEFAULT 'pcs'"),
+            add_column('purchase_order_items', 'price_per_uom', 'NUMERIC(10, 4)')
+        ], tables=('inventory', 'order_items', 'purchase_order_items')),
+        Backfill('inventory.price_per_uom from price', 'inventory',
+                 'price_per_uom = price', 'price_per_uom IS NULL'),
+        Backfill('order_items.price_per_uom from unit_price', 'order_items',
+                 'price_per_uom = unit_price', 'price_per_uom IS NULL'),
+        Backfill('purchase_order_items.price_per_uom from unit_price', 'purchase_order_items',
+                 'price_per_uom = unit_price', 'price_per_uom IS NULL')
+    ]),
+    Migration('1.4.0', 'Audit logs moved to their own database file (ids renumbered)', [
+        Schema('create audit_logs in the audit database', [
+            """
+            CREATE TABLE IF NOT EXISTS audit.audit_logs (
+                id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                action VARCHAR(100) NOT NULL,
+                table_name VARCHAR(50),
+                record_id INTEGER,
+                old_values TEXT,
+                new_values TEXT,
+                ip_address VARCHAR(50),
+                created_at DATETIME
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS audit.idx_audit_created ON audit_logs (created_at)"
+        ]),
+        MOVE_AUDIT_LOGS,
+        Schema('drop audit_logs from the main database', [drop_moved(MOVE_AUDIT_LOGS)], tables=('audit_logs',))
+    ]),
+    Migration('1.5.0', 'Order and purchase order ids never reused (AUTOINCREMENT)', [
+        Schema('rebuild order tables with AUTOINCREMENT ids', [
+            autoincrement('orders'),
+            autoincrement('order_items'),
+            autoincrement('purchase_orders'),
+            autoincrement('purchase_order_items')
+        ], tables=('orders', 'order_items', 'purchase_orders', 'purchase_order_items'))
+    ])
+]
+
+def connect(path):
+    # Autocommit mode; every step opens its own short transaction with BEGIN IMMEDIATE
+    conn = sqlite3.connect(path, isolation_level=None, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    conn.execute('ATTACH DATABASE ? AS audit', (audit_database_path(path),))
+    if os.path.exists(archive_database_path(path)):
+        conn.execute('ATTACH DATABASE ? AS archive', (archive_database_path(path),))
+    return conn
+
+def backup_database(path=DEFAULT_DB):
+    """Create a backup of the current database (consistent even while the app is writing)"""
+    if os.path.exists(path):
+        base, ext = os.path.splitext(path)
+        backup_name = f'{base}_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}{ext}'
+        source = sqlite3.connect(path)
+        target = sqlite3.connect(backup_name)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
         print(f"✅ Database backed up to {backup_name}")
         return backup_name
     return None
 
-def check_database_version():
-    """Check the current database version"""
-    try:
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
-        
-        # Check if version table exists
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='database_version'
+def create_version_table(conn):
+    """Create version tracking and backfill progress tables"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS database_version (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            version TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            description TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS migration_progress (
+            version TEXT NOT NULL,
+            step INTEGER NOT NULL,
+            description TEXT,
+            last_id INTEGER,
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            PRIMARY KEY (version, step)
+        )
+    """)
+    if conn.execute("SELECT COUNT(*) FROM database_version").fetchone()[0] == 0:
+        conn.execute("""
+            INSERT INTO database_version (version, description)
+            VALUES ('1.0.0', 'Initial database schema')
         """)
-        
-        if cursor.fetchone():
-            cursor.execute("SELECT version FROM database_version ORDER BY id DESC LIMIT 1")
-            version = cursor.fetchone()
-            conn.close()
-            return version[0] if version else '1.0.0'
-        else:
+
+def applied_versions(conn):
+    if not table_exists(conn, 'database_version'):
+        return {}
+    rows = conn.execute("SELECT version, applied_at FROM database_version ORDER BY id").fetchall()
+    return dict(rows)
+
+def check_database_version(path=DEFAULT_DB):
+    """The highest applied version"""
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            versions = applied_versions(conn)
+        finally:
             conn.close()
-            return '1.0.0'
+        return max(versions, key=parse_version) if versions else '1.0.0'
     except Exception as e:
         print(f"Error checking database version: {e}")
         return '1.0.0'
 
-def create_version_table():
-    """Create version tracking table"""
+def pending_migrations(conn, target=None):
+    applied = applied_versions(conn)
+    limit = parse_version(target) if target else None
+    return [migration for migration in sorted(MIGRATIONS, key=lambda m: parse_version(m.version))
+            if migration.version not in applied and (limit is None or parse_version(migration.version) <= limit)]
+
+class Migrator:
+    def __init__(self, path, chunk_size=1000, rows_per_second=5000, pause=0.005):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.rows_per_second = rows_per_second
+        # Minimum gap between chunks so the app's writers get the lock
+        self.pause = pause
+        self.conn = connect(path)
+
+    def close(self):
+        self.conn.close()
+
+    def progress(self, version, step):
+        return self.conn.execute(
+            "SELECT last_id, rows_done, completed_at FROM migration_progress WHERE version = ? AND step = ?",
+            (version, step)).fetchone()
+
+    def save_progress(self, version, step, description, last_id=None, rows_done=0, completed=False):
+        now = datetime.utcnow().isoformat()
+        self.conn.execute("""
+            INSERT INTO migration_progress (version, step, description, last_id, rows_done, started_at, updated_at, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(version, step) DO UPDATE SET
+                last_id = excluded.last_id, rows_done = excluded.rows_done,
+                updated_at = excluded.updated_at, completed_at = excluded.completed_at
+        """, (version, step, description, last_id, rows_done, now, now, now if completed else None))
+
+    def migrate(self, migration):
+        print(f"➡️ {migration.version}: {migration.description}")
+        for index, step in enumerate(migration.steps):
+            state = self.progress(migration.version, index)
+            if state and state[2]:
+                print(f"   ✓ {step.kind} {step.description} (already done)")
+                continue
+            started = time.perf_counter()
+            if step.kind == 'schema':
+                self.conn.execute('BEGIN IMMEDIATE')
+                try:
+                    step.apply(self.conn)
+                    self.save_progress(migration.version, index, step.description, completed=True)
+                    self.conn.execute('COMMIT')
+                except Exception:
+                    self.conn.execute('ROLLBACK')
+                    raise
+                print(f"   ✓ {step.kind} {step.description} ({format_seconds(time.perf_counter() - started)})")
+            else:
+                rows = self.backfill(migration.version, index, step, state)
+                print(f"   ✓ {step.kind} {step.description}: {rows:,} rows "
+                      f"({format_seconds(time.perf_counter() - started)})")
+
+        self.conn.execute('BEGIN IMMEDIATE')
+        self.conn.execute("INSERT INTO database_version (version, description) VALUES (?, ?)",
+                          (migration.version, migration.description))
+        self.conn.execute('COMMIT')
+        print(f"✅ Migrated to version {migration.version}")
+
+    def backfill(self, version, index, step, state):
+        if not table_exists(self.conn, step.table):
+            self.save_progress(version, index, step.description, completed=True)
+            return 0
+        first_id, max_id = self.conn.execute(f'SELECT MIN(id), MAX(id) FROM {step.table}').fetchone()
+        if max_id is None:
+            self.save_progress(version, index, step.description, completed=True)
+            return 0
+        # Rows inserted after this point are written by the app with the new columns already set
+        start_id = state[0] if state and state[0] is not None else first_id - 1
+        rows_done = state[1] if state else 0
+        if state:
+            print(f"   ↻ resuming {step.description} after id {start_id:,} ({rows_done:,} rows done)")
+        last_id = start_id
+        started = reported = time.perf_counter()
+        while last_id < max_id:
+            upper = min(last_id + self.chunk_size, max_id)
+            chunk_started = time.perf_counter()
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = step.apply_chunk(self.conn, last_id, upper)
+                rows_done += rows
+                self.save_progress(version, index, step.description, upper, rows_done, completed=upper >= max_id)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            last_id = upper
+
+            # Rate limit on rows written; always yield briefly so the app's writers get the lock
+            budget = rows / self.rows_per_second if self.rows_per_second else 0
+            time.sleep(max(self.pause, budget - (time.perf_counter() - chunk_started)))
+
+            now = time.perf_counter()
+            if now - reported >= PROGRESS_INTERVAL:
+                done = (last_id - start_id) / (max_id - start_id)
+                eta = (now - started) / done * (1 - done)
+                print(f"   … {step.description}: {done:.0%} (id {last_id:,} of {max_id:,}, {rows_done:,} rows), "
+                      f"ETA {format_seconds(eta)}")
+                reported = now
+        if start_id >= max_id:
+            self.save_progress(version, index, step.description, last_id, rows_done, completed=True)
+        return rows_done
+
+    def run(self, target=None, backup=True):
+        """Apply all pending migrations up to `target`"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        create_version_table(self.conn)
+        self.conn.execute('COMMIT')
+        migrations = pending_migrations(self.conn, target)
+        if not migrations:
+            print("ℹ️ Database is up to date")
+            return 0
+        if backup:
+            backup_database(self.path)
+        for migration in migrations:
+            self.migrate(migration)
+        print(f"✅ Applied {len(migrations)} migrations successfully")
+        print(f"Database updated to version: {check_database_version(self.path)}")
+        return len(migrations)
+
+    # Dry run
+    def estimate(self, target=None):
+        """[(migration, step, rows, seconds)] from running the pending steps on in-memory samples"""
+        migrations = pending_migrations(self.conn, target)
+        sample = sqlite3.connect('file::memory:', uri=True, isolation_level=None)
+        sample.execute("ATTACH DATABASE ? AS src", (f'file:{self.path}?mode=ro',))
+        sample.execute("ATTACH DATABASE ':memory:' AS audit")
+        copied = {}
+        estimates = []
+        try:
+            for migration in migrations:
+                for index, step in enumerate(migration.steps):
+                    state = self.progress(migration.version, index) if table_exists(self.conn, 'migration_progress') else None
+                    if state and state[2]:
+                        continue
+                    for table in step.tables:
+                        if table not in copied:
+                            copied[table] = self._copy_sample(sample, table)
+                    estimates.append((migration, step) + self._estimate_step(sample, step, copied))
+        finally:
+            sample.close()
+        return estimates
+
+    def _copy_sample(self, sample, table):
+        """Copy the table definition, its indexes and up to SAMPLE_ROWS rows; returns (sampled, total)"""
+        if not table_exists(sample, table, 'src'):
+            return 0, 0
+        for (sql,) in sample.execute("SELECT sql FROM src.sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL "
+                                     "AND type IN ('table', 'index') ORDER BY type DESC", (table,)):
+            sample.execute(sql)
+        sample.execute(f'INSERT INTO main.{table} SELECT * FROM src.{table} ORDER BY id LIMIT ?', (SAMPLE_ROWS,))
+        sampled = sample.execute(f'SELECT COUNT(*) FROM main.{table}').fetchone()[0]
+        total = sample.execute(f'SELECT COUNT(*) FROM src.{table}').fetchone()[0]
+        return sampled, total
+
+    def _estimate_step(self, sample, step, copied):
+        sampled = sum(copied[table][0] for table in step.tables)
+        total = sum(copied[table][1] for table in step.tables)
+        if step.kind == 'schema':
+            started = time.perf_counter()
+            step.apply(sample)
+            seconds = time.perf_counter() - started
+            return total, seconds * total / sampled if sampled else seconds
+
+        try:
+            pending = total if step.kind == 'move' else \
+                sample.execute(f'SELECT COUNT(*) FROM src.{step.table} WHERE {step.pending}').fetchone()[0]
+        except sqlite3.OperationalError:
+            # The column is added by an earlier step of this migration, so every row is pending
+            pending = total
+        started = time.perf_counter()
+        rows = step.apply(sample)
+        per_row = (time.perf_counter() - started) / rows if rows else 0
+        chunks = pending / self.chunk_size
+        throttled = pending / self.rows_per_second if self.rows_per_second else 0
+        return pending, max(pending * per_row, throttled) + chunks * self.pause
+
+def print_estimates(estimates, migrator):
+    if not estimates:
+        print("ℹ️ Database is up to date")
+        return
+    print(f"Dry run (nothing changed; chunks of {migrator.chunk_size:,} rows at ≤{migrator.rows_per_second:,} rows/s):")
+    version = None
+    total = 0.0
+    for migration, step, rows, seconds in estimates:
+        if migration.version != version:
+            version = migration.version
+            print(f"\n{migration.version}: {migration.description}")
+        if step.kind != 'schema':
+            detail = f"{rows:,} rows pending"
+        else:
+            detail = f"{rows:,} rows in {', '.join(step.tables)}" if step.tables else 'new tables only'
+        print(f"   {step.kind:<9}{step.description:<55}~{format_seconds(seconds):>8}  ({detail})")
+        total += seconds
+    print(f"\nEstimated total: ~{format_seconds(total)}")
+
+def run_migrations(path=DEFAULT_DB, target=None, dry_run=False, chunk_size=1000, rows_per_second=5000, backup=True):
+    """Run all pending migrations"""
+    print(f"Current database version: {check_database_version(path)}")
+    migrator = Migrator(path, chunk_size, rows_per_second)
     try:
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS database_version (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                version TEXT NOT NULL,
-                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                description TEXT
-            )
-        """)
-        
-        # Insert initial version if table is empty
-        cursor.execute("SELECT COUNT(*) FROM database_version")
-        if cursor.fetchone()[0] == 0:
-            cursor.execute("""
-                INSERT INTO database_version (version, description) 
-                VALUES ('1.0.0', 'Initial database schema')
-            """)
-        
-        conn.commit()
-        conn.close()
-        print("✅ Version tracking table created")
-    except Exception as e:
-        print(f"Error creating version table: {e}")
+        if dry_run:
+            print_estimates(migrator.estimate(target), migrator)
+        else:
+            migrator.run(target, backup)
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted; completed steps and backfill chunks are saved, run again to resume")
+        sys.exit(1)
+    finally:
+        migrator.close()
 
-def migrate_to_1_1_0():
-    """Migration to version 1.1.0 - Add indexes for better performance"""
+def show_status(path=DEFAULT_DB):
+    """Applied and pending migrations, and backfills in progress"""
+    conn = sqlite3.connect(path)
     try:
-        conn = sqlite3.connect('inventory.db')
-        cursor = conn.cursor()
-        
-        # Add indexes
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_inventory_category ON inventory(category_id)",
-            "CREATE INDEX IF NOT EXISTS idx_inventory_sku ON inventory(sku)",
-            "CREATE INDEX IF NOT EXISTS idx_inventory_active ON inventory(is_active)",
-            "CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)",
-            "CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(created_at)",
-            "CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_logs(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_audit_created ON audit_logs(created_at)"
-        ]
-        
-        for index_sql in indexes:
-            cursor.execute(index_sql)
-        
-        # Update version
-        cursor.execute("""
-            INSERT INTO database_version (version, description) 
-            VALUES ('1.1.0', 'Added performance indexes')
-        """)
-        
-        conn.commit()
+        applied = applied_versions(conn)
+        print(f"Database: {path}")
+        for version, applied_at in sorted(applied.items(), key=lambda item: parse_version(item[0])):
+            print(f"  ✅ {version}  {applied_at}")
+        for migration in pending_migrations(conn):
+            print(f"  ⏳ {migration.version}  {migration.description}")
+        if table_exists(conn, 'migration_progress'):
+            for version, description, last_id, rows_done, updated_at in conn.execute("""
+                SELECT version, description, last_id, rows_done, updated_at FROM migration_progress
+                WHERE completed_at IS NULL ORDER BY version, step
+            """):
+                print(f"  ↻ {version} {description}: {rows_done:,} rows up to id {last_id} (last chunk {updated_at})")
+    finally:
         conn.close()
-        print("✅ Migrated to version 1.1.0 - Performance indexes added")
-        return True
-    except Exception as e:
-        print(f"Error migrating to 1.1.0: {e}")
-        return False
 
-def run_migrations():
-    """Run all pending migrations"""
-    current_version = check_database_version()
-    print(f"Current database version: {current_version}")
-    
-    # Create version table if it doesn't exist
-    create_version_table()
-    
-    # Create backup before migrations
-    backup_file = backup_database()
-    
-    migrations_applied = 0
-    
-    # Run migrations based on current version
-    if current_version < '1.1.0':
-        if migrate_to_1_1_0():
-            migrations_applied += 1
-    
-    if migrations_applied > 0:
-        print(f"✅ Applied {migrations_applied} migrations successfully")
-        new_version = check_database_version()
-        print(f"Database updated to version: {new_version}")
-    else:
-        print("ℹ️ Database is up to date")
-        if backup_file and os.path.exists(backup_file):
-            os.remove(backup_file)
-            print("🗑️ Backup file removed (no migrations needed)")
-
-def reset_database():
+def reset_database(path=DEFAULT_DB):
     """Reset database to initial state"""
     if input("⚠️ This will delete all data. Are you sure? (yes/no): ").lower() == 'yes':
-        if os.path.exists('inventory.db'):
-            backup_database()
-            os.remove('inventory.db')
+        if os.path.exists(path):
+            backup_database(path)
+            os.remove(path)
+            # Archived orders keep their ids, which the reinitialized tables would hand out again
+            if os.path.exists(archive_database_path(path)):
+                os.remove(archive_database_path(path))
             print("✅ Database reset")
-            
+
             # Reinitialize
             from app import app
             from database import init_database
-            
+
             with app.app_context():
                 init_database(app)
             print("✅ Database reinitialized with sample data")
@@ -152,58 +599,59 @@ def reset_database():
     else:
         print("❌ Reset cancelled")
 
-def show_database_info():
+def show_database_info(path=DEFAULT_DB):
     """Show database information"""
-    if not os.path.exists('inventory.db'):
+    if not os.path.exists(path):
         print("❌ Database file not found")
         return
-    
-    conn = sqlite3.connect('inventory.db')
+
+    conn = sqlite3.connect(path)
     cursor = conn.cursor()
-    
+
     # Get table information
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
     tables = cursor.fetchall()
-    
+
     print("\n📊 DATABASE INFORMATION")
     print("="*40)
-    print(f"Database file: inventory.db")
-    print(f"File size: {os.path.getsize('inventory.db')} bytes")
-    print(f"Version: {check_database_version()}")
+    print(f"Database file: {path}")
+    print(f"File size: {os.path.getsize(path)} bytes")
+    print(f"Version: {check_database_version(path)}")
     print(f"Tables: {len(tables)}")
-    
+
     for table in tables:
         table_name = table[0]
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+        cursor.execute(f'SELECT COUNT(*) FROM "{table_name}"')
         count = cursor.fetchone()[0]
         print(f"  - {table_name}: {count} records")
-    
+
     conn.close()
 
 def main():
-    if len(sys.argv) < 2:
-        print("Database Migration Utility")
-        print("Usage:")
-        print("  python migrate.py migrate    - Run pending migrations")
-        print("  python migrate.py reset      - Reset database")
-        print("  python migrate.py info       - Show database info")
-        print("  python migrate.py backup     - Create database backup")
-        return
-    
-    command = sys.argv[1].lower()
-    
-    if command == 'migrate':
-        run_migrations()
-    elif command == 'reset':
-        reset_database()
-    elif command == 'info':
-        show_database_info()
-    elif command == 'backup':
-        backup_file = backup_database()
+    parser = argparse.ArgumentParser(description='Database Migration Utility')
+    parser.add_argument('command', choices=['migrate', 'status', 'reset', 'info', 'backup'],
+                        help='migrate: run pending migrations; status: applied, pending and in-progress; '
+                             'reset: reset database; info: show database info; backup: create database backup')
+    parser.add_argument('--db', default=DEFAULT_DB, help='Database file (default: INVENTORY_DB or server/inventory.db)')
+    parser.add_argument('--dry-run', action='store_true', help='Estimate the time of each pending step without changing anything')
+    parser.add_argument('--target', help='Stop after this version')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per backfill transaction')
+    parser.add_argument('--rows-per-second', type=int, default=5000, help='Backfill rate limit (0 for none)')
+    parser.add_argument('--no-backup', action='store_true', help='Skip the backup taken before migrating')
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        run_migrations(args.db, args.target, args.dry_run, args.chunk_size, args.rows_per_second, not args.no_backup)
+    elif args.command == 'status':
+        show_status(args.db)
+    elif args.command == 'reset':
+        reset_database(args.db)
+    elif args.command == 'info':
+        show_database_info(args.db)
+    elif args.command == 'backup':
+        backup_file = backup_database(args.db)
         if backup_file:
             print(f"✅ Backup created: {backup_file}")
-    else:
-        print(f"❌ Unknown command: {command}")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
+from uom import registry as uom_registry
 
 db = SQLAlchemy()
 
@@ -57,6 +58,11 @@ class Category(db.Model):
 
 class Inventory(db.Model):
     __tablename__ = 'inventory'
+    __table_args__ = (
+        db.Index('idx_inventory_category', 'category_id'),
+        db.Index('idx_inventory_name_where_is_active', 'name', sqlite_where=db.text('is_active = 1')),
+        db.Index('idx_inventory_quantity_where_is_active', 'quantity', sqlite_where=db.text('is_active = 1')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -86,32 +92,27 @@ class Inventory(db.Model):
         return float(self.price_per_uom) * quantity
     
     def convert_quantity(self, quantity, from_unit, to_unit):
-        """Convert quantity from one unit to another"""
-        if from_unit == to_unit:
-            return quantity
-        
-        # Simple conversion logic - you can expand this based on your needs
-        conversion_rates = {
-            ('kg', 'g'): 1000,
-            ('g', 'kg'): 0.001,
-            ('m', 'cm'): 100,
-            ('cm', 'm'): 0.01,
-            ('lbs', 'kg'): 0.453592,
-            ('kg', 'lbs'): 2.20462,
-        }
-        
-        conversion_key = (from_unit, to_unit)
-        if conversion_key in conversion_rates:
-            return quantity * conversion_rates[conversion_key]
-        
-        return quantity  # No conversion available
+        """Convert quantity from one unit to another
+
+        Uses the shared UOM registry, falling back to this item's conversion_factor
+        (1 unit_of_measure = conversion_factor base_unit). Raises UnknownConversionError
+        when no conversion exists.
+        """
+        custom_factor = float(self.conversion_factor) if self.conversion_factor else 1
+        if from_unit == self.unit_of_measure:
+            return uom_registry.convert(quantity, from_unit, to_unit, custom_factor, self.base_unit)
+        if to_unit == self.unit_of_measure:
+            return quantity / uom_registry.factor(to_unit, from_unit, custom_factor, self.base_unit)
+        return uom_registry.convert(quantity, from_unit, to_unit)
     
     def to_dict(self):
+        from caches import category_name, vendor_name  # Cached reference lookups instead of lazy loads
+        
         vendors_data = []
         for vendor_assoc in self.vendor_associations:
             vendors_data.append({
                 'vendor_id': vendor_assoc.vendor_id,
-                'vendor_name': vendor_assoc.vendor.name if vendor_assoc.vendor else 'Unknown',
+                'vendor_name': vendor_name(vendor_assoc.vendor_id) or 'Unknown',
                 'unit_price': float(vendor_assoc.unit_price),
                 'is_preferred': vendor_assoc.is_preferred
             })
@@ -120,7 +121,7 @@ class Inventory(db.Model):
             'id': self.id,
             'name': self.name,
             'category_id': self.category_id,
-            'category': self.category_ref.name if self.category_ref else None,
+            'category': category_name(self.category_id),
             'quantity': self.quantity,
             'price': float(self.price),
             'unit_of_measure': self.unit_of_measure,
@@ -150,6 +151,12 @@ class Inventory(db.Model):
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('idx_orders_created', 'created_at'),
+        db.Index('idx_orders_status_created_at_total', 'status', 'created_at', 'total'),
+        # Ids are never reused, including ids of rows moved to cold storage (cold_storage.py)
+        {'sqlite_autoincrement': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     customer_name = db.Column(db.String(200), nullable=False)
@@ -179,6 +186,11 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    __table_args__ = (
+        db.Index('idx_order_items_order_id', 'order_id'),
+        db.Index('idx_order_items_inventory_id', 'inventory_id'),
+        {'sqlite_autoincrement': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
@@ -205,10 +217,17 @@ class OrderItem(db.Model):
         }
 
 class AuditLog(db.Model):
+    # Stored in its own database file (see audit_store.py); AUTOINCREMENT so ids are never
+    # reused once rotation has moved the newest rows out
     __tablename__ = 'audit_logs'
+    __bind_key__ = 'audit'
+    __table_args__ = (
+        db.Index('idx_audit_created', 'created_at'),
+        {'sqlite_autoincrement': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    user_id = db.Column(db.Integer, nullable=True)  # users.id, in the main database
     action = db.Column(db.String(100), nullable=False)
     table_name = db.Column(db.String(50))
     record_id = db.Column(db.Integer)
@@ -261,6 +280,10 @@ class Vendor(db.Model):
 
 class PurchaseOrder(db.Model):
     __tablename__ = 'purchase_orders'
+    __table_args__ = (
+        db.Index('idx_purchase_orders_created_at', db.text('created_at DESC')),
+        {'sqlite_autoincrement': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id'), nullable=False)
@@ -279,10 +302,12 @@ class PurchaseOrder(db.Model):
     creator = db.relationship('User', backref='created_purchase_orders', foreign_keys=[created_by])
     
     def to_dict(self):
+        from caches import vendor_name
+        
         return {
             'id': self.id,
             'vendor_id': self.vendor_id,
-            'vendor_name': self.vendor.name if self.vendor else None,
+            'vendor_name': vendor_name(self.vendor_id),
             'reference_number': self.reference_number,
             'status': self.status,
             'total': float(self.total),
@@ -299,6 +324,10 @@ class PurchaseOrder(db.Model):
 
 class PurchaseOrderItem(db.Model):
     __tablename__ = 'purchase_order_items'
+    __table_args__ = (
+        db.Index('idx_purchase_order_items_purchase_order_id', 'purchase_order_id'),
+        {'sqlite_autoincrement': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     purchase_order_id = db.Column(db.Integer, db.ForeignKey('purchase_orders.id'), nullable=False)
@@ -332,6 +361,9 @@ class PurchaseOrderItem(db.Model):
 class InventoryVendor(db.Model):
     """Association table for the many-to-many relationship between Inventory and Vendor"""
     __tablename__ = 'inventory_vendors'
+    __table_args__ = (
+        db.Index('idx_inventory_vendors_inventory_id_vendor_id', 'inventory_id', 'vendor_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id'), nullable=False)
@@ -346,13 +378,210 @@ class InventoryVendor(db.Model):
     vendor = db.relationship('Vendor', backref=db.backref('inventory_associations', lazy='dynamic', cascade='all, delete-orphan'))
     
     def to_dict(self):
+        from caches import vendor_name
+        
         return {
             'id': self.id,
             'inventory_id': self.inventory_id,
             'vendor_id': self.vendor_id,
-            'vendor_name': self.vendor.name if self.vendor else 'Unknown',
+            'vendor_name': vendor_name(self.vendor_id) or 'Unknown',
             'unit_price': float(self.unit_price),
             'is_preferred': self.is_preferred,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
+
+class SystemSetting(db.Model):
+    """Persisted admin setting stored as a JSON encoded value"""
+    __tablename__ = 'system_settings'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False)
+    value = db.Column(db.Text)  # JSON string
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'key': self.key,
+            'value': self.value,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class DemandForecast(db.Model):
+    """Suggested reorder point and safety stock derived from order history"""
+    __tablename__ = 'demand_forecasts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id'), unique=True, nullable=False)
+    daily_demand = db.Column(db.Float, nullable=False, default=0)
+    demand_std = db.Column(db.Float, nullable=False, default=0)  # Daily standard deviation
+    seasonality_index = db.Column(db.Float, nullable=False, default=1)
+    lead_time_days = db.Column(db.Integer, nullable=False)
+    safety_stock = db.Column(db.Integer, nullable=False, default=0)
+    reorder_point = db.Column(db.Integer, nullable=False, default=0)
+    history_days = db.Column(db.Integer, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    inventory = db.relationship('Inventory', backref=db.backref('demand_forecast', uselist=False))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'inventory_id': self.inventory_id,
+            'daily_demand': round(self.daily_demand, 4),
+            'demand_std': round(self.demand_std, 4),
+            'seasonality_index': round(self.seasonality_index, 4),
+            'lead_time_days': self.lead_time_days,
+            'safety_stock': self.safety_stock,
+            'reorder_point': self.reorder_point,
+            'history_days': self.history_days,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
+
+class StockMovement(db.Model):
+    """Append-only ledger entry for every change to an item's on-hand quantity"""
+    __tablename__ = 'stock_movements'
+    __table_args__ = (
+        db.Index('idx_stock_movements_item', 'inventory_id', 'id'),
+        db.Index('idx_stock_movements_created', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id'), nullable=False)
+    quantity_change = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(20), nullable=False)  # opening, order, po_receipt, adjustment
+    reference_id = db.Column(db.Integer)  # Order or purchase order id
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'inventory_id': self.inventory_id,
+            'quantity_change': self.quantity_change,
+            'reason': self.reason,
+            'reference_id': self.reference_id,
+            'user_id': self.user_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class StockSnapshot(db.Model):
+    """Per-SKU checkpoint of the ledger balance up to last_movement_id"""
+    __tablename__ = 'stock_snapshots'
+    __table_args__ = (
+        db.Index('idx_stock_snapshots_item', 'inventory_id', 'taken_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    last_movement_id = db.Column(db.Integer, nullable=False)
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'inventory_id': self.inventory_id,
+            'quantity': self.quantity,
+            'last_movement_id': self.last_movement_id,
+            'taken_at': self.taken_at.isoformat() if self.taken_at else None
+        }
+
+# The stock ledger is append-only: reject updates and deletes at the database level
+db.event.listen(StockMovement.__table__, 'after_create', db.DDL("""
+    CREATE TRIGGER IF NOT EXISTS stock_movements_no_update BEFORE UPDATE ON stock_movements
+    BEGIN SELECT RAISE(ABORT, 'stock_movements is append-only'); END
+"""))
+db.event.listen(StockMovement.__table__, 'after_create', db.DDL("""
+    CREATE TRIGGER IF NOT EXISTS stock_movements_no_delete BEFORE DELETE ON stock_movements
+    BEGIN SELECT RAISE(ABORT, 'stock_movements is append-only'); END
+"""))
+
+class PriceHistory(db.Model):
+    """Unit price of an item from effective_at until the next entry"""
+    __tablename__ = 'price_history'
+    __table_args__ = (
+        db.Index('idx_price_history_item', 'inventory_id', 'effective_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id'), nullable=False)
+    price_per_uom = db.Column(db.Numeric(10, 4), nullable=False)
+    effective_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'inventory_id': self.inventory_id,
+            'price_per_uom': float(self.price_per_uom),
+            'effective_at': self.effective_at.isoformat() if self.effective_at else None
+        }
+
+class ValuationSnapshot(db.Model):
+    """Precomputed inventory value of one category at a period end"""
+    __tablename__ = 'valuation_snapshots'
+    __table_args__ = (
+        db.UniqueConstraint('period_end', 'category_id', name='uq_valuation_period_category'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period_end = db.Column(db.Date, nullable=False, index=True)
+    category_id = db.Column(db.Integer, nullable=True)  # NULL for uncategorized items
+    category_name = db.Column(db.String(100))
+    total_value = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'category_id': self.category_id,
+            'category': self.category_name,
+            'value': float(self.total_value),
+            'quantity': self.total_quantity,
+            'item_count': self.item_count
+        }
+
+class ResourceVersion(db.Model):
+    """Version stamp of a table, bumped in the same transaction as every write to it"""
+    __tablename__ = 'resource_versions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(100), unique=True, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'resource': self.resource,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class StorageSnapshot(db.Model):
+    """Bytes used by one table or index (or the free list) at a point in time"""
+    __tablename__ = 'storage_snapshots'
+    __table_args__ = (
+        db.Index('idx_storage_snapshots_taken', 'taken_at', 'name'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    taken_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    name = db.Column(db.String(100), nullable=False)
+    table_name = db.Column(db.String(100))
+    kind = db.Column(db.String(10), nullable=False)  # table, index, free
+    pages = db.Column(db.Integer, nullable=False, default=0)
+    bytes = db.Column(db.Integer, nullable=False, default=0)
+    unused_bytes = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'table': self.table_name,
+            'kind': self.kind,
+            'pages': self.pages,
+            'bytes': self.bytes,
+            'unused_bytes': self.unused_bytes
+        }
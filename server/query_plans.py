@@ -0,0 +1,501 @@
+"""
+Query-plan regression check and index advisor
+
+Collects the statements the API actually runs, either by calling every endpoint once
+through the test client against a generated database (the default; see generate_data.py)
+or from a recorded query log (GET /api/admin/sql-profile output or logs/slow_queries.jsonl),
+and runs each under EXPLAIN QUERY PLAN.
+
+  check      Fails (exit 1) when a statement scans a whole table that is not in
+             SMALL_TABLES and the scan is not accepted in query_plan_baseline.json.
+             --update-baseline accepts the current scans (inherent ones such as
+             whole-catalog aggregates) and stores the planner statistics
+             (sqlite_stat1) of the generated database with them. A check against a
+             generated database plans with those statistics, so its result does not
+             depend on --items: a small, quick --items run sees the plans of the
+             baseline's size. Against --db the database's own statistics are used.
+  recommend  Derives a candidate index per scanned or sorted table from the statement's
+             predicates: equality columns first, then the range or ORDER BY columns,
+             partial (WHERE col = literal) when the query filters on a constant, and
+             covering when the query touches only a few columns. Each candidate is tried
+             on a scratch copy and kept only if the planner uses it to drop the scan or sort.
+  apply      Creates the recommended indexes on --db and refreshes its statistics.
+
+Usage:
+  python query_plans.py check [--items 5000] [--query-log sql_profile.json] [--update-baseline]
+  python query_plans.py recommend [--db inventory.db] [--sql]
+  python query_plans.py apply --db inventory.db
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+
+from sql_profiler import normalize
+from audit_store import audit_database_path
+from cold_storage import archive_database_path
+
+BASEDIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_BASELINE = os.path.join(BASEDIR, 'query_plan_baseline.json')
+
+# Reference tables that stay small enough that scanning them is cheaper than an index lookup
+SMALL_TABLES = {'users', 'categories', 'vendors', 'system_settings', 'resource_versions', 'database_version'}
+
+# A covering index is only suggested when the statement touches at most this many columns
+MAX_COVERING_COLUMNS = 6
+
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+"?([A-Za-z_]\w*)"?(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?', re.IGNORECASE)
+_NOT_ALIASES = {'where', 'join', 'left', 'right', 'inner', 'outer', 'cross', 'on', 'group', 'order', 'limit',
+                'union', 'using', 'natural', 'set', 'values', 'having', 'window'}
+_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+_TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+def connect(path):
+    """Connection to `path` with its audit and cold-storage databases attached, so statements
+    on audit_logs and the archived order tables plan too"""
+    conn = sqlite3.connect(path)
+    if os.path.exists(audit_database_path(path)):
+        conn.execute('ATTACH DATABASE ? AS audit', (audit_database_path(path),))
+    if os.path.exists(archive_database_path(path)):
+        conn.execute('ATTACH DATABASE ? AS archive', (archive_database_path(path),))
+    return conn
+
+def fingerprint(sql):
+    """Same id as the SQL profiler uses for the statement"""
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:12]
+
+class Statement:
+    def __init__(self, sql, parameters=None):
+        self.sql = sql
+        self.parameters = parameters
+        self.calls = 0
+        self.routes = set()
+        self.fingerprint = fingerprint(sql)
+
+    def bind(self):
+        if self.parameters is not None:
+            return self.parameters
+        # Normalized SQL from a log: every literal is a placeholder, NULL is enough for a plan
+        return (None,) * self.sql.count('?')
+
+# Statement sources
+def collect_from_endpoints(path):
+    """Call every GET route and the write scenarios once against `path`, recording statements"""
+    sys.path.insert(0, os.path.join(BASEDIR, 'benchmarks'))
+    os.environ['INVENTORY_DB'] = path
+    os.environ['SCHEDULER_ENABLED'] = 'false'
+    os.environ.setdefault('SQL_PROFILER_HEADERS', 'false')
+    from bench_endpoints import TestClient, read_scenarios, write_scenarios, run_scenario
+    from app import app, bus
+    from models import db
+    from flask import request, has_request_context
+    from sqlalchemy import event
+
+    statements = {}
+
+    def record(conn, cursor, sql, parameters, context, executemany):
+        if executemany:
+            return
+        # Statements differing only in the length of an IN list share a fingerprint
+        key = fingerprint(sql)
+        statement = statements.get(key)
+        if statement is None:
+            statement = statements[key] = Statement(sql, tuple(parameters) if parameters else ())
+        statement.calls += 1
+        if has_request_context() and request.url_rule is not None:
+            statement.routes.add(f'{request.method} {request.url_rule.rule}')
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', record)
+    # read_models runs statements on the raw cursor; record those through the profiler hook
+    import sql_profiler as profiler_module
+    observe = profiler_module.sql_profiler.observe
+
+    def observe_and_record(sql, parameters, seconds, dbapi_connection=None, executemany=False):
+        record(None, None, sql, parameters, None, executemany)
+        return observe(sql, parameters, seconds, dbapi_connection, executemany)
+
+    profiler_module.sql_profiler.observe = observe_and_record
+    try:
+        client = TestClient(app, 'admin', 'admin123')
+        for scenario in read_scenarios(app.url_map) + write_scenarios(client):
+            run_scenario(client, scenario, repeat=1, warmup=0)
+    finally:
+        profiler_module.sql_profiler.observe = observe
+        with app.app_context():
+            for engine in db.engines.values():
+                event.remove(engine, 'before_cursor_execute', record)
+        bus.stop()
+    return list(statements.values())
+
+def collect_from_log(path):
+    """Statements from /api/admin/sql-profile JSON or a slow query JSONL file"""
+    with open(path) as f:
+        text = f.read()
+    try:
+        report = json.loads(text)
+        entries = (report.get('top_by_total_time', []) + report.get('n_plus_one', [])
+                   + report.get('slow_queries', []))
+    except ValueError:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    statements = {}
+    for entry in entries:
+        sql = entry.get('sql')
+        if not sql:
+            continue
+        # Undo the profiler's list folding so the text parses again
+        sql = sql.replace('IN (?...)', 'IN (?)').replace('(?...)', '(?)')
+        statement = statements.setdefault(sql, Statement(sql))
+        statement.calls += entry.get('calls', 1)
+        statement.routes.update(entry.get('routes') or ([entry['route']] if entry.get('route') else []))
+    return list(statements.values())
+
+# Plans
+def explain(conn, statement):
+    try:
+        rows = conn.execute('EXPLAIN QUERY PLAN ' + statement.sql, statement.bind()).fetchall()
+    except sqlite3.Error as e:
+        return None, str(e)
+    return [row[-1] for row in rows], None
+
+def table_aliases(sql):
+    """{name used in the plan: table}"""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in _NOT_ALIASES:
+            aliases[alias] = table
+    return aliases
+
+def plan_issues(sql, plan):
+    """[(kind, table)] for bare table scans and ORDER BY sorts in a plan"""
+    aliases = table_aliases(sql)
+    issues = []
+    for line in plan:
+        match = _FULL_SCAN.match(line)
+        if match and match.group(1) in aliases:
+            issues.append(('scan', aliases[match.group(1)]))
+        elif line.startswith(_TEMP_SORT):
+            issues.append(('sort', None))
+    return issues
+
+def analyze(conn, statements):
+    """Plan every statement; returns [(statement, plan, issues)] for the ones that explain"""
+    results = []
+    for statement in statements:
+        if not statement.sql.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE')):
+            continue
+        plan, error = explain(conn, statement)
+        if plan is None:
+            print(f"  skipped (cannot explain: {error}): {statement.sql[:80]}", file=sys.stderr)
+            continue
+        results.append((statement, plan, plan_issues(statement.sql, plan)))
+    return results
+
+# Index candidates
+def _column_pattern(names):
+    qualifier = '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    return rf'\b(?:{qualifier})\."?(\w+)"?'
+
+def candidate_index(sql, table, columns):
+    """(key columns, partial WHERE, covering columns) for `table` in `sql`, or None"""
+    names = {alias for alias, target in table_aliases(sql).items() if target == table}
+    column = _column_pattern(names)
+    equality, ranges, order, partial = [], [], [], []
+
+    def add(target, name):
+        if name in columns and name not in target:
+            target.append(name)
+
+    for name, literal in re.findall(column + r"\s*=\s*(\d+|'[^']*')(?!\s*\.)", sql):
+        if f'{name} = {literal}' not in partial:
+            partial.append(f'{name} = {literal}')
+    literal_columns = {condition.split(' = ')[0] for condition in partial}
+    # Column = column conditions only help the table being joined to, not the one driving the scan
+    joined = re.search(rf'\bJOIN\s+"?{table}"?\b', sql, re.IGNORECASE) is not None
+    other_column = r'[A-Za-z_]\w*\.\w+'
+    right = r'=\s*\?|IN\s*\(' + (rf'|=\s*{other_column}' if joined else '')
+    left = r'\?' + (rf'|{other_column}' if joined else '')
+    found = re.findall(column + rf'\s*(?:{right})', sql, re.IGNORECASE) + re.findall(rf'(?:{left})\s*=\s*' + column, sql)
+    for name in found:
+        if name not in literal_columns:
+            add(equality, name)
+    for name in re.findall(column + r'\s*(?:>=|<=|<|>|\s+BETWEEN\b|\s+LIKE\b)(?!\s*[A-Za-z_]\w*\.)', sql, re.IGNORECASE):
+        add(ranges, name)
+    order_by = re.search(r'\bORDER BY\s+(.+?)(?:\bLIMIT\b|\bOFFSET\b|\)|$)', sql, re.IGNORECASE | re.DOTALL)
+    # Rows come out of an index in rowid order after its key, but not across the values of an IN list
+    in_list = re.search(column + r'\s*IN\s*\(', sql, re.IGNORECASE)
+    if order_by and not in_list:
+        for term in order_by.group(1).split(','):
+            match = re.match(r'\s*' + column + r'(\s+DESC)?\s*$', term, re.IGNORECASE)
+            if not match or match.group(1) == 'id':
+                break
+            if match.group(1) in columns and match.group(1) not in equality:
+                order.append(match.group(1) + (' DESC' if match.group(2) else ''))
+
+    key = equality + (order if order else ranges[:1])
+    if not key and not partial:
+        return None
+    referenced = [name for name in dict.fromkeys(re.findall(column, sql)) if name in columns]
+    plain_key = [name.split(' ')[0] for name in key]
+    extra = [name for name in referenced if name not in plain_key and name not in literal_columns and name != 'id']
+    covering = extra if len(referenced) <= MAX_COVERING_COLUMNS else []
+    if not key and not covering:
+        return None
+    return key, ' AND '.join(partial) or None, covering
+
+def index_sql(table, key, where, covering):
+    columns = key + covering
+    name = f"idx_{table}_{'_'.join(column.split(' ')[0] for column in columns)}"
+    if where:
+        name += '_where_' + '_'.join(condition.split(' = ')[0] for condition in where.split(' AND '))
+    sql = f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)})"
+    return name, sql + (f' WHERE {where}' if where else '')
+
+def table_columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+
+def _improves(before, after):
+    """Fewer full scans, or as many with fewer sorts"""
+    count = lambda issues, kind: sum(1 for issue_kind, _ in issues if issue_kind == kind)
+    return (count(after, 'scan'), count(after, 'sort')) < (count(before, 'scan'), count(before, 'sort'))
+
+def recommend(path, analyzed):
+    """Validated index recommendations: [{'name', 'sql', 'table', 'fixes': [...]}]"""
+    scratch = sqlite3.connect(':memory:')
+    with sqlite3.connect(path) as source:
+        source.backup(scratch)
+    candidates = {}
+    for statement, plan, issues in analyzed:
+        tables = {table for kind, table in issues if kind == 'scan'}
+        if any(kind == 'sort' for kind, _ in issues):
+            tables.update(target for target in table_aliases(statement.sql).values() if target not in SMALL_TABLES)
+        for table in tables - SMALL_TABLES:
+            candidate = candidate_index(statement.sql, table, table_columns(scratch, table))
+            if candidate is None:
+                continue
+            name, sql = index_sql(table, *candidate)
+            entry = candidates.setdefault(name, {'name': name, 'sql': sql, 'table': table, 'columns': candidate,
+                                                 'statements': []})
+            entry['statements'].append((statement, plan, issues))
+
+    accepted = []
+    for entry in candidates.values():
+        scratch.execute(entry['sql'])
+        scratch.execute(f"ANALYZE {entry['name']}")
+        fixes = []
+        for statement, before, issues in entry['statements']:
+            after, _ = explain(scratch, statement)
+            if after and any(entry['name'] in line for line in after) and _improves(issues, plan_issues(statement.sql, after)):
+                fixes.append({'fingerprint': statement.fingerprint, 'sql': statement.sql, 'calls': statement.calls,
+                              'routes': sorted(statement.routes), 'before': before, 'after': after})
+        scratch.execute(f"DROP INDEX {entry['name']}")
+        if fixes:
+            accepted.append({'name': entry['name'], 'sql': entry['sql'], 'table': entry['table'],
+                             'columns': entry['columns'], 'fixes': fixes})
+
+    # An index whose columns lead another one with the same partial condition is redundant
+    def redundant(index):
+        key, where, covering = index['columns']
+        columns = [c.split(' ')[0] for c in key + covering]
+        for other in accepted:
+            other_key, other_where, other_covering = other['columns']
+            other_columns = [c.split(' ')[0] for c in other_key + other_covering]
+            if other is not index and other['table'] == index['table'] and other_where == where \
+                    and len(other_columns) > len(columns) and other_columns[:len(columns)] == columns:
+                return True
+        return False
+
+    accepted = [index for index in accepted if not redundant(index)]
+    accepted.sort(key=lambda index: -sum(fix['calls'] for fix in index['fixes']))
+    return accepted
+
+# Baseline of accepted scans
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {(entry['fingerprint'], entry['table']): entry for entry in json.load(f)['accepted']}
+
+def load_statistics(path):
+    """Planner statistics stored with the baseline, [] for a baseline without them"""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f).get('statistics', [])
+
+def _schemas(conn):
+    """Schemas of `conn` that have planner statistics"""
+    return [name for _, name, _ in conn.execute('PRAGMA database_list')
+            if conn.execute(f"SELECT 1 FROM {name}.sqlite_master WHERE name = 'sqlite_stat1'").fetchone()]
+
+def read_statistics(path):
+    with connect(path) as conn:
+        return [{'schema': schema, 'table': table, 'index': index, 'stat': stat}
+                for schema in _schemas(conn)
+                for table, index, stat in conn.execute(
+                    f'SELECT tbl, idx, stat FROM {schema}.sqlite_stat1 ORDER BY tbl, idx')]
+
+def use_statistics(path, statistics):
+    """Replace the planner statistics of the tables and indexes in `statistics`; the ones it
+    does not cover (an index added since the baseline) keep their own"""
+    conn = connect(path)
+    try:
+        schemas = set(_schemas(conn))
+        for entry in statistics:
+            schema = entry['schema']
+            if schema not in schemas or not conn.execute(
+                    f'SELECT 1 FROM {schema}.sqlite_master WHERE name = ?',
+                    (entry['index'] or entry['table'],)).fetchone():
+                continue
+            conn.execute(f'DELETE FROM {schema}.sqlite_stat1 WHERE tbl = ? AND idx IS ?', (entry['table'], entry['index']))
+            conn.execute(f'INSERT INTO {schema}.sqlite_stat1 (tbl, idx, stat) VALUES (?, ?, ?)',
+                         (entry['table'], entry['index'], entry['stat']))
+        conn.commit()
+    finally:
+        conn.close()
+
+def save_baseline(path, scans, statistics=None):
+    entries = sorted(({
+        'fingerprint': statement.fingerprint,
+        'table': table,
+        'routes': sorted(statement.routes),
+        'sql': normalize(statement.sql)[:300]
+    } for statement, table in scans), key=lambda entry: (entry['table'], entry['fingerprint']))
+    baseline = {'updated_at': datetime.utcnow().isoformat(), 'accepted': entries}
+    if statistics is None:
+        # Accepting scans found on a real database keeps the generated statistics already stored
+        statistics = load_statistics(path)
+    if statistics:
+        baseline['statistics'] = statistics
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+# Commands
+def prepare_database(args, workdir):
+    """Path of the database to analyze: a copy of --db, or a generated one"""
+    path = os.path.join(workdir, 'plans.db')
+    if args.db:
+        shutil.copyfile(args.db, path)
+        for companion in (audit_database_path, archive_database_path):
+            if os.path.exists(companion(args.db)):
+                shutil.copyfile(companion(args.db), companion(path))
+    else:
+        from generate_data import generate
+        print(f"Generating {args.items} SKUs...", file=sys.stderr)
+        with contextlib.redirect_stdout(sys.stderr):
+            generate(path, '--skus', str(args.items), '--order-lines', str(args.items * 10), '--days', '365')
+    if not args.no_analyze:
+        with connect(path) as conn:
+            conn.execute('ANALYZE')
+    return path
+
+def collect(args, path):
+    if args.query_log:
+        return collect_from_log(args.query_log)
+    # The app's own console output (startup messages, N+1 warnings) is not part of the report
+    with contextlib.redirect_stdout(sys.stderr):
+        return collect_from_endpoints(path)
+
+def run_check(args, path, analyzed):
+    baseline = load_baseline(args.baseline)
+    scans, new = [], []
+    for statement, plan, issues in analyzed:
+        for kind, table in issues:
+            if kind != 'scan' or table in SMALL_TABLES:
+                continue
+            scans.append((statement, table))
+            if (statement.fingerprint, table) not in baseline:
+                new.append((statement, table, plan))
+    sorts = sum(1 for _, _, issues in analyzed if any(kind == 'sort' for kind, _ in issues))
+    print(f"{len(analyzed)} statements planned: {len(scans)} full scans ({len(scans) - len(new)} accepted), "
+          f"{sorts} with a temporary sort")
+
+    if args.update_baseline:
+        save_baseline(args.baseline, scans, None if args.db else read_statistics(path))
+        print(f"Accepted {len(scans)} scans in {args.baseline}")
+        return 0
+    for statement, table, plan in new:
+        print(f"\nFULL SCAN of {table} [{statement.fingerprint}] from {', '.join(sorted(statement.routes)) or 'unknown route'}")
+        print(f"  {normalize(statement.sql)[:300]}")
+        for line in plan:
+            print(f"    {line}")
+    if new:
+        print(f"\n{len(new)} new full scan(s); add an index (python query_plans.py recommend) or accept "
+              f"them with --update-baseline")
+        return 1
+    return 0
+
+def run_recommend(args, path, analyzed):
+    indexes = recommend(path, analyzed)
+    if args.sql:
+        for index in indexes:
+            print(index['sql'] + ';')
+        return 0
+    if not indexes:
+        print("No index recommendations")
+        return 0
+    for index in indexes:
+        calls = sum(fix['calls'] for fix in index['fixes'])
+        print(f"\n{index['sql']}")
+        print(f"  fixes {len(index['fixes'])} statement(s), {calls} call(s) in this run")
+        for fix in index['fixes'][:3]:
+            print(f"  [{fix['fingerprint']}] {', '.join(fix['routes']) or normalize(fix['sql'])[:100]}")
+            print(f"    before: {' | '.join(fix['before'])}")
+            print(f"    after:  {' | '.join(fix['after'])}")
+    return 0
+
+def run_apply(args, path, analyzed):
+    indexes = recommend(path, analyzed)
+    if not indexes:
+        print("No index recommendations")
+        return 0
+    conn = sqlite3.connect(args.db, timeout=60, isolation_level=None)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        for index in indexes:
+            conn.execute(index['sql'])
+            print(f"✅ {index['sql']}")
+        conn.execute('COMMIT')
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    print(f"Created {len(indexes)} index(es) on {args.db}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['check', 'recommend', 'apply'])
+    parser.add_argument('--db', help='Analyze a copy of this database (required for apply)')
+    parser.add_argument('--items', type=int, default=5000, help='SKUs in the generated database when --db is not given')
+    parser.add_argument('--query-log', help='Take statements from sql-profile JSON or slow_queries.jsonl')
+    parser.add_argument('--no-analyze', action='store_true', help='Plan without refreshing sqlite_stat1')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Accepted full scans')
+    parser.add_argument('--update-baseline', action='store_true', help='Accept all current full scans')
+    parser.add_argument('--sql', action='store_true', help='Print only the CREATE INDEX statements')
+    args = parser.parse_args()
+    if args.command == 'apply' and not args.db:
+        parser.error('apply needs --db')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = prepare_database(args, workdir)
+        statements = collect(args, path)
+        if args.command == 'check' and not args.db and not args.update_baseline:
+            use_statistics(path, load_statistics(args.baseline))
+        with connect(path) as conn:
+            analyzed = analyze(conn, statements)
+        command = {'check': run_check, 'recommend': run_recommend, 'apply': run_apply}[args.command]
+        sys.exit(command(args, path, analyzed))
+
+if __name__ == '__main__':
+    main()
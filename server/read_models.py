@@ -0,0 +1,78 @@
+"""
+Lightweight read models for list endpoints
+
+Records are named tuples (no __dict__, no identity map, no change tracking) filled straight
+from the DBAPI cursor for a Core SELECT. Reads on hot listings use these; writes keep using
+the ORM models.
+"""
+
+from models import db
+from sql_profiler import sql_profiler
+from cold_storage import cold_storage
+from sqlalchemy import select, func
+from sqlalchemy.sql.util import find_tables
+from collections import namedtuple
+import time
+
+_record_classes = {}
+
+def record_class(name, fields):
+    """Return a cached named tuple type; leading underscores become a raw_ prefix"""
+    fields = tuple('raw' + field if field.startswith('_') else field for field in fields)
+    key = (name, fields)
+    if key not in _record_classes:
+        _record_classes[key] = namedtuple(name, fields)
+    return _record_classes[key]
+
+def _compile(statement):
+    """Compile a Core statement to SQLite SQL plus positional parameters"""
+    dialect = db.engine.dialect
+    compiled = statement.compile(dialect=dialect, compile_kwargs={'render_postcompile': True})
+    params = compiled.construct_params()
+    values = []
+    for key in compiled.positiontup:
+        value = params[key]
+        processor = compiled.binds[key].type.bind_processor(dialect) if key in compiled.binds else None
+        values.append(processor(value) if processor and value is not None else value)
+    return compiled.string, values
+
+def _bound_table(statement):
+    """A table of the statement that lives in a bind of its own (audit_logs), else None"""
+    for table in find_tables(statement):
+        if 'bind_key' in table.metadata.info:
+            return table
+    return None
+
+def fetch(statement, record=None, connection=None):
+    """Execute a Core SELECT on the raw cursor; returns records (or plain tuples)
+
+    Runs on the session's connection to the database holding the statement's tables, or on
+    `connection` (a sqlite3 connection, e.g. to an audit archive). Inside
+    cold_storage.including_archived() the archived order tables also read their cold rows.
+    """
+    sql, values = _compile(cold_storage.unified(statement))
+    if connection is None:
+        connection = db.session.connection(bind_arguments={'clause': _bound_table(statement)}).connection.dbapi_connection
+    cursor = connection.cursor()
+    started = time.perf_counter()
+    try:
+        rows = cursor.execute(sql, values).fetchall()
+    finally:
+        cursor.close()
+    # The raw cursor bypasses the engine events, so report the statement directly
+    sql_profiler.observe(sql, values, time.perf_counter() - started, connection)
+    return list(map(record._make, rows)) if record else rows
+
+def fetch_page(statement, record, page, per_page):
+    """Fetch one page of records; returns (records, pagination) in the shape the list endpoints use"""
+    total = fetch(select(func.count()).select_from(statement.order_by(None).subquery()))[0][0]
+    records = fetch(statement.offset((page - 1) * per_page).limit(per_page), record)
+    pages = (total + per_page - 1) // per_page if per_page else 0
+    return records, {
+        'page': page,
+        'pages': pages,
+        'per_page': per_page,
+        'total': total,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
@@ -0,0 +1,229 @@
+"""
+Automatic reorder engine - drafts purchase orders for low-stock inventory in bulk
+"""
+
+from models import db, Inventory, InventoryVendor, Vendor, PurchaseOrder, PurchaseOrderItem
+from caches import vendors as vendor_cache
+from decimal import Decimal
+from datetime import datetime
+import numpy as np
+import uuid
+
+# Purchase order statuses whose outstanding quantity counts as already on order
+OPEN_PO_STATUSES = ('draft', 'submitted', 'approved')
+
+# Items are reordered up to reorder_point * ORDER_UP_TO_MULTIPLIER
+ORDER_UP_TO_MULTIPLIER = 2
+
+def _load_stock_arrays():
+    """Load active inventory as parallel NumPy arrays sorted by inventory id"""
+    rows = db.session.query(
+        Inventory.id, Inventory.quantity, Inventory.min_stock_level
+    ).filter(Inventory.is_active == True).order_by(Inventory.id).all()
+
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    on_hand = np.fromiter((r[1] or 0 for r in rows), dtype=np.int64, count=len(rows))
+    reorder_point = np.fromiter((r[2] if r[2] is not None else 5 for r in rows), dtype=np.int64, count=len(rows))
+    return ids, on_hand, reorder_point
+
+def _load_on_order(ids):
+    """Return outstanding quantities on open purchase orders, aligned with ids"""
+    rows = db.session.query(
+        PurchaseOrderItem.inventory_id,
+        db.func.sum(PurchaseOrderItem.quantity - db.func.coalesce(PurchaseOrderItem.received_quantity, 0))
+    ).join(PurchaseOrder).filter(
+        PurchaseOrder.status.in_(OPEN_PO_STATUSES)
+    ).group_by(PurchaseOrderItem.inventory_id).all()
+
+    on_order = np.zeros(len(ids), dtype=np.int64)
+    if rows and len(ids):
+        po_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        po_qty = np.array([max(int(r[1] or 0), 0) for r in rows], dtype=np.int64)
+        pos = np.searchsorted(ids, po_ids)
+        found = (pos < len(ids)) & (ids[np.minimum(pos, len(ids) - 1)] == po_ids)
+        on_order[pos[found]] = po_qty[found]
+    return on_order
+
+def _select_vendors(inventory_ids):
+    """Pick the preferred vendor, falling back to the cheapest, for each inventory id"""
+    rows = db.session.query(
+        InventoryVendor.inventory_id, InventoryVendor.vendor_id,
+        InventoryVendor.unit_price, InventoryVendor.is_preferred
+    ).join(Vendor).filter(Vendor.is_active == True).all()
+
+    vendor_ids = np.full(len(inventory_ids), -1, dtype=np.int64)
+    unit_prices = np.zeros(len(inventory_ids), dtype=np.float64)
+    if not rows or not len(inventory_ids):
+        return vendor_ids, unit_prices
+
+    assoc_inv = np.array([r[0] for r in rows], dtype=np.int64)
+    assoc_vendor = np.array([r[1] for r in rows], dtype=np.int64)
+    assoc_price = np.array([float(r[2]) for r in rows], dtype=np.float64)
+    assoc_not_preferred = np.array([0 if r[3] else 1 for r in rows], dtype=np.int8)
+
+    # Only keep associations for the items being reordered
+    keep = np.isin(assoc_inv, inventory_ids)
+    if not keep.any():
+        return vendor_ids, unit_prices
+    assoc_inv, assoc_vendor = assoc_inv[keep], assoc_vendor[keep]
+    assoc_price, assoc_not_preferred = assoc_price[keep], assoc_not_preferred[keep]
+
+    # Sort by inventory id, then preferred first, then cheapest; first row per item wins
+    order = np.lexsort((assoc_price, assoc_not_preferred, assoc_inv))
+    first_inv, first_idx = np.unique(assoc_inv[order], return_index=True)
+    best = order[first_idx]
+
+    pos = np.searchsorted(inventory_ids, first_inv)
+    vendor_ids[pos] = assoc_vendor[best]
+    unit_prices[pos] = assoc_price[best]
+    return vendor_ids, unit_prices
+
+def build_reorder_plan(multiplier=ORDER_UP_TO_MULTIPLIER):
+    """Compute reorder lines for every low-stock SKU, grouped per vendor"""
+    ids, on_hand, reorder_point = _load_stock_arrays()
+    on_order = _load_on_order(ids)
+
+    # One vectorized pass over the whole catalog
+    available = on_hand + on_order
+    order_up_to = np.maximum(reorder_point * multiplier, reorder_point + 1)
+    reorder_qty = order_up_to - available
+    mask = (available <= reorder_point) & (reorder_qty > 0)
+
+    candidate_idx = np.flatnonzero(mask)
+    candidate_ids = ids[candidate_idx]
+    candidate_qty = reorder_qty[candidate_idx]
+    vendor_ids, unit_prices = _select_vendors(candidate_ids)
+
+    details = {}
+    candidate_list = candidate_ids.tolist()
+    for start in range(0, len(candidate_list), 500):
+        for item in db.session.query(
+            Inventory.id, Inventory.name, Inventory.sku, Inventory.unit_of_measure
+        ).filter(Inventory.id.in_(candidate_list[start:start + 500])).all():
+            details[item.id] = item
+
+    vendor_names = {}
+    assigned = np.unique(vendor_ids[vendor_ids >= 0])
+    if len(assigned):
+        vendor_names = {
+            vendor_id: vendor.name if vendor else None
+            for vendor_id, vendor in vendor_cache.get_many(assigned.tolist()).items()
+        }
+
+    groups = {}
+    unassigned = []
+    for i in range(len(candidate_ids)):
+        inventory_id = int(candidate_ids[i])
+        item = details.get(inventory_id)
+        idx = candidate_idx[i]
+        line = {
+            'inventory_id': inventory_id,
+            'name': item.name if item else None,
+            'sku': item.sku if item else None,
+            'unit_of_measure': item.unit_of_measure if item else 'pcs',
+            'on_hand': int(on_hand[idx]),
+            'on_order': int(on_order[idx]),
+            'reorder_point': int(reorder_point[idx]),
+            'quantity': int(candidate_qty[i])
+        }
+
+        vendor_id = int(vendor_ids[i])
+        if vendor_id < 0:
+            unassigned.append(line)
+            continue
+
+        line['unit_price'] = round(float(unit_prices[i]), 2)
+        line['total_price'] = round(line['unit_price'] * line['quantity'], 2)
+        group = groups.setdefault(vendor_id, {
+            'vendor_id': vendor_id,
+            'vendor_name': vendor_names.get(vendor_id),
+            'items': [],
+            'total': 0
+        })
+        group['items'].append(line)
+        group['total'] = round(group['total'] + line['total_price'], 2)
+
+    vendors = sorted(groups.values(), key=lambda g: g['vendor_id'])
+    return {
+        'generated_at': datetime.utcnow().isoformat(),
+        'vendors': vendors,
+        'unassigned': unassigned,
+        'summary': {
+            'skus_checked': int(len(ids)),
+            'skus_to_reorder': int(len(candidate_ids)),
+            'purchase_orders': len(vendors),
+            'unassigned_items': len(unassigned),
+            'total_value': round(sum(g['total'] for g in vendors), 2)
+        }
+    }
+
+def create_purchase_orders(plan, created_by=None):
+    """Create draft purchase orders for a reorder plan in bulk (caller commits)"""
+    # The timestamp alone repeats for runs within the same second; reference_number is unique
+    timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    run_id = uuid.uuid4().hex[:8]
+    purchase_orders = []
+
+    for group in plan['vendors']:
+        purchase_order = PurchaseOrder(
+            vendor_id=group['vendor_id'],
+            reference_number=f"AUTO-{timestamp}-{run_id}-{group['vendor_id']}",
+            status='draft',
+            total=Decimal(str(group['total'])),
+            notes=f"Auto-generated by reorder engine for {len(group['items'])} low-stock items",
+            created_by=created_by
+        )
+        purchase_orders.append(purchase_order)
+        db.session.add(purchase_order)
+
+    db.session.flush()  # Get PO IDs
+
+    po_items = []
+    for purchase_order, group in zip(purchase_orders, plan['vendors']):
+        for line in group['items']:
+            unit_price = Decimal(str(line['unit_price']))
+            po_items.append({
+                'purchase_order_id': purchase_order.id,
+                'inventory_id': line['inventory_id'],
+                'quantity': line['quantity'],
+                'unit_price': unit_price,
+                'total_price': unit_price * line['quantity'],
+                'received_quantity': 0,
+                'unit_of_measure': line['unit_of_measure'],
+                'price_per_uom': unit_price
+            })
+
+    if po_items:
+        db.session.bulk_insert_mappings(PurchaseOrderItem, po_items)
+
+    return [po.id for po in purchase_orders]
+
+def run_auto_reorder(dry_run=True, created_by=None):
+    """Build the reorder plan and, unless dry_run, draft its purchase orders"""
+    plan = build_reorder_plan()
+    plan['dry_run'] = dry_run
+    plan['purchase_order_ids'] = []
+
+    if not dry_run and plan['vendors']:
+        plan['purchase_order_ids'] = create_purchase_orders(plan, created_by)
+        db.session.commit()
+
+    return plan
+
+def scheduled_auto_reorder():
+    """Scheduler entry point - drafts purchase orders when the auto_reorder setting is on"""
+    from settings import get_setting
+    from database import create_audit_log
+
+    if not get_setting('auto_reorder'):
+        return None
+
+    plan = run_auto_reorder(dry_run=False)
+    if plan['purchase_order_ids']:
+        create_audit_log('AUTO_REORDER', 'purchase_orders', None, None, None, {
+            'purchase_order_ids': plan['purchase_order_ids'],
+            'summary': plan['summary']
+        })
+        db.session.commit()
+        print(f"✅ Auto reorder drafted {len(plan['purchase_order_ids'])} purchase orders")
+    return plan
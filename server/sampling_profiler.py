@@ -0,0 +1,159 @@
+"""
+On-demand sampling profiler for live requests
+
+An admin starts a session naming routes, a sample rate and a budget. Each matching request
+is picked with that probability and its thread registered; one background thread then
+reads the registered threads' current frames every few milliseconds and counts the stacks.
+Requests that are not picked only pay a dictionary lookup. The session stops itself when
+its time or sample budget runs out, and the counts render as collapsed stacks
+("frame;frame;frame count"), the input format of flamegraph.pl and speedscope.
+
+Sessions are per process: with several workers, each one profiles only its own requests.
+"""
+
+from flask.globals import request_ctx
+from datetime import datetime
+import os
+import random
+import sys
+import threading
+import time
+
+MAX_DEPTH = 128
+
+class SamplingProfiler:
+    """Samples the stacks of selected requests while a session is active"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._threads = {}   # thread id -> route label of the request being sampled
+        self._stacks = {}    # collapsed stack -> samples
+        self._thread = None
+        self._stop = threading.Event()
+        self.session = None
+
+    def init_app(self, app):
+        app.before_request(self._select_request)
+        app.teardown_request(self._release_request)
+
+    # Session control
+    def start(self, routes=None, sample_rate=0.1, duration_seconds=300, max_samples=10000, interval_ms=5):
+        """Begin a session, replacing any previous one and its samples"""
+        if routes is not None and (not isinstance(routes, list) or not all(isinstance(route, str) for route in routes)):
+            raise ValueError('routes must be a list of strings, e.g. ["GET /api/inventory"]')
+        if not 0 < sample_rate <= 1:
+            raise ValueError('sample_rate must be in (0, 1]')
+        if duration_seconds <= 0 or max_samples <= 0 or interval_ms <= 0:
+            raise ValueError('duration_seconds, max_samples and interval_ms must be positive')
+        self.stop('restarted')
+        now = time.time()
+        with self._lock:
+            self._stacks = {}
+            self.session = {
+                'routes': sorted(set(routes or [])),
+                'sample_rate': sample_rate,
+                'interval_ms': interval_ms,
+                'max_samples': max_samples,
+                'started_at': now,
+                'deadline': now + duration_seconds,
+                'samples': 0,
+                'requests_profiled': 0,
+                'active': True,
+                'stopped_reason': None
+            }
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self.status()
+
+    def stop(self, reason='stopped'):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+        with self._lock:
+            self._threads.clear()
+            if self.session and self.session['active']:
+                self.session['active'] = False
+                self.session['stopped_reason'] = reason
+
+    def status(self):
+        with self._lock:
+            if self.session is None:
+                return {'active': False}
+            session = dict(self.session)
+        return {
+            **session,
+            'started_at': datetime.utcfromtimestamp(session['started_at']).isoformat(),
+            'deadline': datetime.utcfromtimestamp(session['deadline']).isoformat(),
+            'unique_stacks': len(self._stacks)
+        }
+
+    def collapsed(self):
+        """Collapsed-stack text, one 'root;...;leaf count' line per distinct stack"""
+        with self._lock:
+            stacks = sorted(self._stacks.items(), key=lambda item: -item[1])
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+    # Request hooks
+    def _select_request(self):
+        session = self.session
+        if session is None or not session['active']:
+            return
+        req = request_ctx.request
+        rule = req.url_rule
+        if rule is None:
+            return
+        label = f'{req.method} {rule.rule}'
+        routes = session['routes']
+        if routes and label not in routes and rule.rule not in routes:
+            return
+        if random.random() >= session['sample_rate']:
+            return
+        with self._lock:
+            if session['active']:
+                self._threads[threading.get_ident()] = label
+                session['requests_profiled'] += 1
+
+    def _release_request(self, exc=None):
+        if self._threads:
+            with self._lock:
+                self._threads.pop(threading.get_ident(), None)
+
+    # Sampler thread
+    def _run(self):
+        session = self.session
+        interval = session['interval_ms'] / 1000
+        while not self._stop.wait(interval):
+            if time.time() >= session['deadline']:
+                self.stop('time budget reached')
+                return
+            with self._lock:
+                targets = dict(self._threads)
+            if not targets:
+                continue
+            frames = sys._current_frames()
+            stacks = [(label, frames.get(thread_id)) for thread_id, label in targets.items()]
+            collapsed = [_collapse(label, frame) for label, frame in stacks if frame is not None]
+            del frames, stacks
+            with self._lock:
+                for stack in collapsed:
+                    self._stacks[stack] = self._stacks.get(stack, 0) + 1
+                session['samples'] += len(collapsed)
+                exhausted = session['samples'] >= session['max_samples']
+            if exhausted:
+                self.stop('sample budget reached')
+                return
+
+def _collapse(label, frame):
+    """Render a frame chain root-first as 'route;file:function;...'"""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    names.append(label)
+    return ';'.join(reversed(names)).replace(' ', '_')
+
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,128 @@
+"""
+Lightweight background job scheduler for the Flask Inventory Management System
+
+Every process that imports the app creates the scheduler, but only the one holding the lock
+file runs jobs; the others keep trying the lock and take over when its holder exits.
+"""
+
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, every started scheduler runs jobs
+    fcntl = None
+
+class JobScheduler:
+    """Runs registered jobs periodically on a single daemon thread inside the app context"""
+
+    def __init__(self, app, tick_seconds=5, lock_path=None):
+        self.app = app
+        self.tick_seconds = tick_seconds
+        self.lock_path = lock_path
+        self.is_leader = False
+        self._lock_file = None
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_job(self, name, func, interval_seconds, run_immediately=False):
+        """Register func to run every interval_seconds"""
+        with self._lock:
+            self.jobs[name] = {
+                'func': func,
+                'interval': interval_seconds,
+                'next_run': time.time() if run_immediately else time.time() + interval_seconds,
+                'last_run': None,
+                'last_duration_ms': None,
+                'last_error': None,
+                'run_count': 0
+            }
+
+    def run_job(self, name):
+        """Run a job now, outside of its normal interval"""
+        job = self.jobs[name]
+        started = time.perf_counter()
+        try:
+            with self.app.app_context():
+                job['func']()
+            job['last_error'] = None
+        except Exception as e:
+            job['last_error'] = str(e)
+            print(f"❌ Scheduled job '{name}' failed: {e}")
+            traceback.print_exc()
+        finally:
+            job['last_run'] = datetime.utcnow()
+            job['last_duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            job['run_count'] += 1
+            job['next_run'] = time.time() + job['interval']
+
+    def _acquire_leadership(self):
+        """Take the lock file without blocking; True once this process runs the jobs"""
+        if self.is_leader:
+            return True
+        if self.lock_path is None or fcntl is None:
+            self.is_leader = True
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.truncate(0)
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._lock_file = lock_file
+        self.is_leader = True
+        return True
+
+    def _release_leadership(self):
+        if self._lock_file:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+        self.is_leader = False
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            if not self._acquire_leadership():
+                self._stop_event.wait(self.tick_seconds)
+                continue
+            now = time.time()
+            with self._lock:
+                due = [name for name, job in self.jobs.items() if job['next_run'] <= now]
+            for name in due:
+                self.run_job(name)
+            self._stop_event.wait(self.tick_seconds)
+
+    def start(self):
+        """Start the scheduler thread (no-op if it is already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name='job-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.tick_seconds + 1)
+        self._release_leadership()
+
+    def get_jobs(self):
+        """Return the status of every registered job"""
+        return [{
+            'name': name,
+            'interval_seconds': job['interval'],
+            'run_count': job['run_count'],
+            'last_run': job['last_run'].isoformat() if job['last_run'] else None,
+            'last_duration_ms': job['last_duration_ms'],
+            'last_error': job['last_error'],
+            'next_run': datetime.utcfromtimestamp(job['next_run']).isoformat()
+        } for name, job in self.jobs.items()]
@@ -0,0 +1,546 @@
+"""
+Precompiled per-model serializers that write JSON directly from SQL row tuples
+
+Each Serializer declares its fields once. compile() turns a set of requested field names
+into a CompiledSerializer holding the SQLAlchemy Core columns to select and a generated
+encode function that concatenates JSON fragments from a row tuple, so list endpoints can
+skip ORM instances and to_dict() entirely. Only the columns and joins the requested fields
+need end up in the SELECT, and pages can be returned as rows or as column arrays.
+"""
+
+from models import db, User, Inventory, Order, OrderItem, PurchaseOrder, PurchaseOrderItem, InventoryVendor, AuditLog
+from flask import current_app, request
+from read_models import record_class, fetch, fetch_page
+from fragments import fragment_cache
+from caches import category_name, vendor_name, reference_caches
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select, type_coerce
+from json.encoder import encode_basestring_ascii
+from collections import OrderedDict
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:  # Optional dependency - falls back to the standard library encoder
+    orjson = None
+
+# Value encoders used by the generated code
+def _int(value):
+    return 'null' if value is None else str(int(value))
+
+def _float(value):
+    return 'null' if value is None else repr(float(value))
+
+def _decimal(value, scale):
+    # Matches float(Decimal) of a Numeric(precision, scale) column as returned through the ORM
+    return 'null' if value is None else repr(round(float(value), scale))
+
+def _str(value):
+    return 'null' if value is None else encode_basestring_ascii(value)
+
+def _bool(value):
+    return 'null' if value is None else ('true' if value else 'false')
+
+def _datetime(value):
+    # DateTime columns are selected as their raw SQLite text ('YYYY-MM-DD HH:MM:SS.ffffff')
+    if value is None:
+        return 'null'
+    if isinstance(value, str):
+        return '"' + value.replace(' ', 'T', 1) + '"'
+    return '"' + value.isoformat() + '"'
+
+def _value(value):
+    return json.dumps(value)
+
+# Compiled field sets kept per serializer; ?fields= is client-supplied, so the least
+# recently used shapes are dropped rather than keeping every combination ever requested
+MAX_COMPILED = 64
+
+ENCODERS = {
+    'int': '_int',
+    'float': '_float',
+    'decimal': '_decimal',
+    'str': '_str',
+    'bool': '_bool',
+    'datetime': '_datetime',
+    'json': '_value'
+}
+
+# Types the raw column is read as, so SQLAlchemy applies no per-row result processing
+RAW_TYPES = {
+    'int': db.Integer,
+    'float': db.Float,
+    'decimal': db.Float,
+    'str': db.String,
+    'bool': db.Integer,
+    'datetime': db.String,
+    'json': None
+}
+
+class Field:
+    """One output key: a selected column, a value computed from other fields, or a nested list"""
+
+    def __init__(self, name, column=None, kind='str', scale=2, join=None, compute=None, depends=(),
+                 nested=None, count=False, internal=False):
+        self.name = name
+        self.column = column
+        self.kind = kind
+        self.scale = scale
+        self.join = join
+        self.compute = compute
+        self.depends = tuple(depends)
+        self.nested = nested
+        self.count = count
+        self.internal = internal  # Only selected as a dependency, never output by default
+
+class Nested:
+    """A child list loaded with one query per page, keyed by the parent's id"""
+
+    def __init__(self, serializer, foreign_key, order_by=None):
+        self.serializer = serializer
+        self.foreign_key = foreign_key
+        self.order_by = order_by
+
+class Serializer:
+    """Field declarations for one model; compile() caches a CompiledSerializer per field set
+    (the MAX_COMPILED most recently used)
+
+    dependencies maps an output field to (table, field holding the id of the row its value
+    comes from), so cached fragments that embed values of other rows can be dropped when
+    that row changes. version names
+    the field that changes on every write to a row; it enables the fragment cache.
+    """
+
+    def __init__(self, model, fields, joins=None, nested=None, key='id', dependencies=None, version=None):
+        self.model = model
+        self.fields = fields
+        self.by_name = {field.name: field for field in fields}
+        self.joins = joins or {}
+        self.nested = nested or {}
+        self.key = key
+        self.dependencies = dependencies or {}
+        self.version = version
+        self._compiled = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def field_names(self):
+        return [field.name for field in self.fields if not field.internal]
+
+    def compile(self, field_names=None):
+        names = frozenset(field_names) if field_names else frozenset(self.field_names)
+        unknown = names - set(self.field_names)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        with self._lock:
+            compiled = self._compiled.get(names)
+            if compiled is not None:
+                self._compiled.move_to_end(names)
+                return compiled
+        compiled = CompiledSerializer(self, names)
+        with self._lock:
+            self._compiled[names] = compiled
+            while len(self._compiled) > MAX_COMPILED:
+                self._compiled.popitem(last=False)
+        return compiled
+
+class CompiledSerializer:
+    """Columns to select plus a generated row encoder for one set of output fields"""
+
+    def __init__(self, serializer, names):
+        self.serializer = serializer
+        self.output = [field for field in serializer.fields if field.name in names]
+        self.names = [field.name for field in self.output]
+
+        # Resolve every column that has to be selected, including computed dependencies
+        self.positions = {}
+        self.columns = []
+        self.joins = []
+        self.nested = []
+
+        def need(field):
+            if field.name in self.positions:
+                return
+            if field.join and field.join not in self.joins:
+                self.joins.append(field.join)
+            raw_type = RAW_TYPES.get(field.kind)
+            column = type_coerce(field.column, raw_type) if raw_type is not None else field.column
+            self.positions[field.name] = len(self.columns)
+            self.columns.append(column.label(field.name))
+
+        for field in self.output:
+            if field.nested:
+                need(serializer.by_name[serializer.key])
+                if field.nested not in self.nested:
+                    self.nested.append(field.nested)
+            elif field.compute:
+                for dependency in field.depends:
+                    need(serializer.by_name[dependency])
+            else:
+                need(field)
+
+        # Ids of other rows embedded in the output, and every table the output depends on
+        self.row_dependencies = []
+        self.dependency_tables = set()
+        for name in self.names:
+            if name in serializer.dependencies:
+                table, id_field = serializer.dependencies[name]
+                need(serializer.by_name[id_field])
+                self.row_dependencies.append((table, self.positions[id_field]))
+                self.dependency_tables.add(table)
+        for name in self.nested:
+            child = serializer.nested[name].serializer
+            self.dependency_tables.add(child.model.__tablename__)
+            self.dependency_tables.update(table for table, _ in child.dependencies.values())
+        self.dependency_tables = frozenset(self.dependency_tables)
+
+        # Fragment cache key: (table, field set, id, version)
+        self.cacheable = serializer.version is not None
+        if self.cacheable:
+            need(serializer.by_name[serializer.key])
+            need(serializer.by_name[serializer.version])
+            self.cache_prefix = (serializer.model.__tablename__, tuple(self.names))
+
+        self.encode = self._generate()
+        self.record = record_class(serializer.model.__name__ + 'Record',
+                                   [column.name for column in self.columns])
+
+    def _generate(self):
+        """Build the source of encode(row, children) and values(row, children) and compile them once"""
+        namespace = {name: globals()[name] for name in ENCODERS.values()}
+        parts = []
+        expressions = []
+        for i, field in enumerate(self.output):
+            key = encode_basestring_ascii(field.name) + ':'
+            prefix = repr(('{' if i == 0 else ',') + key)
+            if field.nested:
+                key_pos = self.positions[self.serializer.key]
+                slot = 1 if field.count else 0
+                expr = f"str(children[{field.nested!r}].get(row[{key_pos}], ('[]', 0))[{slot}])"
+            elif field.compute:
+                namespace[f'_compute_{i}'] = field.compute
+                args = ', '.join(f'row[{self.positions[d]}]' for d in field.depends)
+                value = f'_compute_{i}({args})'
+                expr = self._encode_expr(field, value)
+            else:
+                expr = self._encode_expr(field, f'row[{self.positions[field.name]}]')
+            parts.append(f'{prefix} + {expr}')
+            expressions.append(expr)
+
+        body = ' + '.join(parts) + " + '}'" if parts else "'{}'"
+        source = (
+            f'def encode(row, children):\n    return {body}\n'
+            f'def values(row, children):\n    return ({", ".join(expressions)},)\n'
+        )
+        exec(compile(source, f'<serializer {self.serializer.model.__tablename__}>', 'exec'), namespace)
+        self.values = namespace['values']
+        return namespace['encode']
+
+    @staticmethod
+    def _encode_expr(field, value):
+        if field.kind == 'decimal':
+            return f'_decimal({value}, {field.scale})'
+        return f'{ENCODERS[field.kind]}({value})'
+
+    def select(self):
+        """Core SELECT of the needed columns with only the joins the fields require"""
+        statement = select(*self.columns).select_from(self.serializer.model)
+        for join_name in self.joins:
+            target, onclause = self.serializer.joins[join_name]
+            statement = statement.outerjoin(target, onclause)
+        return statement
+
+    def load_children(self, parent_ids):
+        """Encode nested lists for a page of parent ids
+
+        Returns {name: {parent_id: (json, count, embedded rows)}} where embedded rows are the
+        (table, id) pairs of joined rows the children include.
+        """
+        children = {}
+        for name in self.nested:
+            spec = self.serializer.nested[name]
+            child = spec.serializer.compile()
+            grouped = {}
+            embedded = {}
+            if parent_ids:
+                parent = spec.foreign_key.label('_parent_id')
+                statement = child.select().add_columns(parent).where(spec.foreign_key.in_(parent_ids))
+                if spec.order_by is not None:
+                    statement = statement.order_by(spec.order_by)
+                parent_pos = len(child.columns)
+                rows = fetch(statement)
+                child.prefetch(rows)
+                for row in rows:
+                    parent_id = row[parent_pos]
+                    grouped.setdefault(parent_id, []).append(child.encode(row, {}))
+                    embedded.setdefault(parent_id, set()).update(
+                        (table, row[pos]) for table, pos in child.row_dependencies if row[pos] is not None
+                    )
+            children[name] = {
+                parent_id: ('[' + ','.join(rows) + ']', len(rows), embedded[parent_id])
+                for parent_id, rows in grouped.items()
+            }
+        return children
+
+    def prefetch(self, rows):
+        """Warm the reference caches for the ids a batch of rows embeds, one query per table"""
+        for table, pos in self.row_dependencies:
+            cache = reference_caches.get(table)
+            if cache is not None:
+                cache.get_many(list({row[pos] for row in rows if row[pos] is not None}))
+
+    def _children(self, rows):
+        if not self.nested:
+            return {}
+        key_pos = self.positions[self.serializer.key]
+        return self.load_children([row[key_pos] for row in rows])
+
+    def fetch_page(self, statement, page, per_page):
+        """Read one page of this serializer's SELECT as lightweight records"""
+        generation = fragment_cache.generation
+        records, pagination = fetch_page(statement, self.record, page, per_page)
+        return RecordPage(records, generation), pagination
+
+    def encode_rows(self, rows):
+        """Encode a list of selected rows, loading nested children in one query per relation
+
+        Cacheable rows are spliced from the fragment cache; only the misses are encoded and
+        only their nested children are loaded.
+        """
+        if not self.cacheable:
+            self.prefetch(rows)
+            children = self._children(rows)
+            return [self.encode(row, children) for row in rows]
+
+        generation = getattr(rows, 'generation', fragment_cache.generation)
+        key_pos = self.positions[self.serializer.key]
+        version_pos = self.positions[self.serializer.version]
+        table, fields = self.cache_prefix
+
+        fragments = [fragment_cache.get((table, fields, row[key_pos], row[version_pos])) for row in rows]
+        missing = [i for i, fragment in enumerate(fragments) if fragment is None]
+        if missing:
+            self.prefetch([rows[i] for i in missing])
+            children = self._children([rows[i] for i in missing])
+            for i in missing:
+                row = rows[i]
+                fragment = fragments[i] = self.encode(row, children)
+                embedded = {(table, row[key_pos])}
+                embedded.update((dep_table, row[pos]) for dep_table, pos in self.row_dependencies
+                                if row[pos] is not None)
+                for name in self.nested:
+                    child = children[name].get(row[key_pos])
+                    if child:
+                        embedded.update(child[2])
+                fragment_cache.put((table, fields, row[key_pos], row[version_pos]), fragment,
+                                   embedded, self.dependency_tables, generation)
+        return fragments
+
+    def encode_list(self, rows):
+        return '[' + ','.join(self.encode_rows(rows)) + ']'
+
+    def encode_columns(self, rows):
+        """Encode rows as {field: [values...]} so each key is sent once per page"""
+        if not self.output:
+            return '{}'
+        self.prefetch(rows)
+        children = self._children(rows)
+        columns = list(zip(*[self.values(row, children) for row in rows])) or [()] * len(self.output)
+        return '{' + ','.join(
+            encode_basestring_ascii(name) + ':[' + ','.join(column) + ']'
+            for name, column in zip(self.names, columns)
+        ) + '}'
+
+class RecordPage(list):
+    """Records of one page plus the fragment cache generation they were read at"""
+
+    def __init__(self, records, generation):
+        super().__init__(records)
+        self.generation = generation
+
+def inventory_status(is_active, quantity, min_stock_level):
+    """Same rules as Inventory.get_status"""
+    if not is_active:
+        return 'Inactive'
+    elif quantity == 0:
+        return 'Out of Stock'
+    elif quantity <= min_stock_level:
+        return 'Low Stock'
+    else:
+        return 'In Stock'
+
+def _total_value(price_per_uom, quantity):
+    return float(price_per_uom) * quantity
+
+def _conversion_factor(conversion_factor):
+    return float(conversion_factor) if conversion_factor else 1
+
+def _formatted_quantity(quantity, unit_of_measure):
+    return f'{quantity} {unit_of_measure}'
+
+def _name_or_unknown(name):
+    return name if name else 'Unknown'
+
+def _vendor_name_or_unknown(vendor_id):
+    return vendor_name(vendor_id) or 'Unknown'
+
+inventory_vendor_serializer = Serializer(InventoryVendor, [
+    Field('vendor_id', InventoryVendor.vendor_id, 'int'),
+    Field('vendor_name', kind='str', compute=_vendor_name_or_unknown, depends=('vendor_id',)),
+    Field('unit_price', InventoryVendor.unit_price, 'decimal'),
+    Field('is_preferred', InventoryVendor.is_preferred, 'bool')
+], dependencies={
+    'vendor_name': ('vendors', 'vendor_id')
+})
+
+inventory_serializer = Serializer(Inventory, [
+    Field('id', Inventory.id, 'int'),
+    Field('name', Inventory.name, 'str'),
+    Field('category_id', Inventory.category_id, 'int'),
+    Field('category', kind='str', compute=category_name, depends=('category_id',)),
+    Field('quantity', Inventory.quantity, 'int'),
+    Field('price', Inventory.price, 'decimal'),
+    Field('unit_of_measure', Inventory.unit_of_measure, 'str'),
+    Field('price_per_uom', Inventory.price_per_uom, 'decimal', scale=4),
+    Field('_conversion_factor', Inventory.conversion_factor, 'decimal', scale=4, internal=True),
+    Field('conversion_factor', kind='float', compute=_conversion_factor, depends=('_conversion_factor',)),
+    Field('base_unit', Inventory.base_unit, 'str'),
+    Field('total_value', kind='float', compute=_total_value, depends=('price_per_uom', 'quantity')),
+    Field('description', Inventory.description, 'str'),
+    Field('sku', Inventory.sku, 'str'),
+    Field('min_stock_level', Inventory.min_stock_level, 'int'),
+    Field('is_active', Inventory.is_active, 'bool'),
+    Field('status', kind='str', compute=inventory_status, depends=('is_active', 'quantity', 'min_stock_level')),
+    Field('created_at', Inventory.created_at, 'datetime'),
+    Field('updated_at', Inventory.updated_at, 'datetime'),
+    Field('vendors', nested='vendors')
+], nested={
+    'vendors': Nested(inventory_vendor_serializer, InventoryVendor.inventory_id, InventoryVendor.id)
+}, dependencies={
+    'category': ('categories', 'category_id')
+}, version='updated_at')
+
+order_item_serializer = Serializer(OrderItem, [
+    Field('id', OrderItem.id, 'int'),
+    Field('order_id', OrderItem.order_id, 'int'),
+    Field('inventory_id', OrderItem.inventory_id, 'int'),
+    Field('_product_name', Inventory.name, 'str', join='inventory', internal=True),
+    Field('product_name', kind='str', compute=_name_or_unknown, depends=('_product_name',)),
+    Field('quantity', OrderItem.quantity, 'int'),
+    Field('unit_price', OrderItem.unit_price, 'decimal'),
+    Field('total_price', OrderItem.total_price, 'decimal'),
+    Field('unit_of_measure', OrderItem.unit_of_measure, 'str'),
+    Field('price_per_uom', OrderItem.price_per_uom, 'decimal', scale=4),
+    Field('formatted_quantity', kind='str', compute=_formatted_quantity, depends=('quantity', 'unit_of_measure'))
+], joins={
+    'inventory': (Inventory, OrderItem.inventory_id == Inventory.id)
+}, dependencies={
+    'product_name': ('inventory', 'inventory_id')
+})
+
+order_serializer = Serializer(Order, [
+    Field('id', Order.id, 'int'),
+    Field('customer_name', Order.customer_name, 'str'),
+    Field('customer_email', Order.customer_email, 'str'),
+    Field('customer_phone', Order.customer_phone, 'str'),
+    Field('status', Order.status, 'str'),
+    Field('total', Order.total, 'decimal'),
+    Field('items', nested='items'),
+    Field('item_count', nested='items', count=True),
+    Field('created_at', Order.created_at, 'datetime'),
+    Field('updated_at', Order.updated_at, 'datetime')
+], nested={
+    'items': Nested(order_item_serializer, OrderItem.order_id, OrderItem.id)
+}, version='updated_at')
+
+purchase_order_item_serializer = Serializer(PurchaseOrderItem, [
+    Field('id', PurchaseOrderItem.id, 'int'),
+    Field('purchase_order_id', PurchaseOrderItem.purchase_order_id, 'int'),
+    Field('inventory_id', PurchaseOrderItem.inventory_id, 'int'),
+    Field('_product_name', Inventory.name, 'str', join='inventory', internal=True),
+    Field('product_name', kind='str', compute=_name_or_unknown, depends=('_product_name',)),
+    Field('quantity', PurchaseOrderItem.quantity, 'int'),
+    Field('unit_price', PurchaseOrderItem.unit_price, 'decimal'),
+    Field('total_price', PurchaseOrderItem.total_price, 'decimal'),
+    Field('received_quantity', PurchaseOrderItem.received_quantity, 'int'),
+    Field('unit_of_measure', PurchaseOrderItem.unit_of_measure, 'str'),
+    Field('price_per_uom', PurchaseOrderItem.price_per_uom, 'decimal', scale=4),
+    Field('formatted_quantity', kind='str', compute=_formatted_quantity, depends=('quantity', 'unit_of_measure'))
+], joins={
+    'inventory': (Inventory, PurchaseOrderItem.inventory_id == Inventory.id)
+}, dependencies={
+    'product_name': ('inventory', 'inventory_id')
+})
+
+purchase_order_serializer = Serializer(PurchaseOrder, [
+    Field('id', PurchaseOrder.id, 'int'),
+    Field('vendor_id', PurchaseOrder.vendor_id, 'int'),
+    Field('vendor_name', kind='str', compute=vendor_name, depends=('vendor_id',)),
+    Field('reference_number', PurchaseOrder.reference_number, 'str'),
+    Field('status', PurchaseOrder.status, 'str'),
+    Field('total', PurchaseOrder.total, 'decimal'),
+    Field('notes', PurchaseOrder.notes, 'str'),
+    Field('created_by', PurchaseOrder.created_by, 'int'),
+    Field('creator_name', User.username, 'str', join='creator'),
+    Field('items', nested='items'),
+    Field('item_count', nested='items', count=True),
+    Field('created_at', PurchaseOrder.created_at, 'datetime'),
+    Field('updated_at', PurchaseOrder.updated_at, 'datetime'),
+    Field('expected_delivery_date', PurchaseOrder.expected_delivery_date, 'datetime'),
+    Field('received_date', PurchaseOrder.received_date, 'datetime')
+], joins={
+    'creator': (User, PurchaseOrder.created_by == User.id)
+}, nested={
+    'items': Nested(purchase_order_item_serializer, PurchaseOrderItem.purchase_order_id, PurchaseOrderItem.id)
+}, dependencies={
+    'vendor_name': ('vendors', 'vendor_id'),
+    'creator_name': ('users', 'created_by')
+}, version='updated_at')
+
+audit_log_serializer = Serializer(AuditLog, [
+    Field('id', AuditLog.id, 'int'),
+    Field('user_id', AuditLog.user_id, 'int'),
+    Field('action', AuditLog.action, 'str'),
+    Field('table_name', AuditLog.table_name, 'str'),
+    Field('record_id', AuditLog.record_id, 'int'),
+    Field('old_values', AuditLog.old_values, 'str'),
+    Field('new_values', AuditLog.new_values, 'str'),
+    Field('ip_address', AuditLog.ip_address, 'str'),
+    Field('created_at', AuditLog.created_at, 'datetime')
+], version='created_at')  # Audit entries are never edited
+
+def json_response(body, status=200):
+    """Wrap an already encoded JSON string in a response"""
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+def list_response(key, body, **extra):
+    """Assemble {key: body, **extra} around an already encoded list or column object"""
+    parts = ['{' + encode_basestring_ascii(key) + ':' + body]
+    for name, value in extra.items():
+        parts.append(encode_basestring_ascii(name) + ':' + current_app.json.dumps(value))
+    return json_response(','.join(parts) + '}')
+
+def compile_from_request(serializer):
+    """Resolve ?fields= and ?format= for a list endpoint; raises ValueError on bad values"""
+    fields = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()]
+    response_format = request.args.get('format', 'rows')
+    if response_format not in ('rows', 'columnar'):
+        raise ValueError("format must be 'rows' or 'columnar'")
+    return serializer.compile(fields or None), response_format == 'columnar'
+
+def page_response(key, serializer, rows, columnar=False, **extra):
+    """Encode one page of rows in row or columnar form and wrap it with its metadata"""
+    if columnar:
+        return list_response(key, serializer.encode_columns(rows), format='columnar', **extra)
+    return list_response(key, serializer.encode_list(rows), **extra)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() backed by orjson when it is installed, otherwise the standard encoder"""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(
+            obj, default=self.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        ).decode()
@@ -0,0 +1,74 @@
+from models import db, SystemSetting
+from invalidation import CachedValue
+import json
+
+# Defaults returned for any setting that has not been saved yet
+DEFAULT_SETTINGS = {
+    'company_name': 'TechFlow Inventory Solutions',
+    'company_address': '123 Business Ave, Suite 100, Tech City, TC 12345',
+    'company_phone': '+1-555-INVENTORY',
+    'company_email': 'support@techflow-inventory.com',
+    'currency': 'USD',
+    'timezone': 'America/New_York',
+    'email_notifications': True,
+    'low_stock_alerts': True,
+    'order_notifications': True,
+    'system_alerts': True,
+    'max_login_attempts': 3,
+    'account_lockout_duration': 30,
+    'session_timeout': 30,
+    'password_min_length': 8,
+    'require_uppercase': True,
+    'require_numbers': True,
+    'require_special_characters': True,
+    'two_factor_authentication': False,
+    'backup_frequency': 'daily',
+    'backup_time': '02:00',
+    'backup_retention_days': 30,
+    'auto_backup_enabled': True,
+    'low_stock_threshold': 10,
+    'auto_reorder': False,
+    'default_category': 'Miscellaneous',
+    'sku_auto_generation': True,
+    'sku_prefix': 'INV',
+    'track_serial_numbers': False
+}
+
+def _load_saved_settings():
+    return {
+        setting.key: json.loads(setting.value)
+        for setting in SystemSetting.query.all() if setting.value is not None
+    }
+
+# Saved values, reloaded after any write to system_settings in any worker
+_saved_settings = CachedValue('settings', ('system_settings',), _load_saved_settings)
+
+def get_settings():
+    """Return all settings, with saved values layered over the defaults"""
+    settings = dict(DEFAULT_SETTINGS)
+    saved = _saved_settings.get()
+    settings.update({key: value for key, value in saved.items() if key in DEFAULT_SETTINGS})
+    return settings
+
+def get_setting(key, default=None):
+    """Return a single setting value"""
+    saved = _saved_settings.get()
+    if key in saved:
+        return saved[key]
+    return DEFAULT_SETTINGS.get(key, default)
+
+def save_settings(values):
+    """Persist the valid keys of values and return what was saved (caller commits)"""
+    filtered_settings = {k: v for k, v in values.items() if k in DEFAULT_SETTINGS}
+    existing = {s.key: s for s in SystemSetting.query.filter(
+        SystemSetting.key.in_(list(filtered_settings.keys()))
+    ).all()}
+
+    for key, value in filtered_settings.items():
+        setting = existing.get(key)
+        if setting is None:
+            setting = SystemSetting(key=key)
+            db.session.add(setting)
+        setting.value = json.dumps(value)
+
+    return filtered_settings
@@ -0,0 +1,249 @@
+"""
+Per-request SQL profiling, N+1 detection and a slow-query log
+
+Cursor events on the engine (and the raw-cursor read path in read_models) time every
+statement. Statements are normalized (literals and IN lists folded) and fingerprinted, so
+the same query with different ids counts as one. Per request this gives a query count and
+database time; a fingerprint repeated SQL_N_PLUS_ONE_THRESHOLD times in one request is
+reported as a likely N+1. Statements slower than SLOW_QUERY_MS are written with their
+EXPLAIN QUERY PLAN to logs/slow_queries.jsonl.
+"""
+
+from models import db
+from flask import request, g, has_request_context
+from sqlalchemy import event
+from collections import deque
+from datetime import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+# Literal and list folding for fingerprints
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'\((?:\s*\?\s*,)*\s*\?\s*\)(?:\s*,\s*\((?:\s*\?\s*,)*\s*\?\s*\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+MAX_FINGERPRINTS = 1000
+MAX_NORMALIZED_CACHE = 4000
+SLOW_LOG_MAX_BYTES = 5 * 1024 * 1024
+
+def normalize(statement):
+    """Statement text with literals replaced by ? and IN/VALUES lists folded"""
+    sql = _STRING.sub('?', statement)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (?...)', sql)
+    sql = _VALUES_LIST.sub('(?...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+class SQLProfiler:
+    """Process-wide statement statistics plus per-request counters kept on flask.g"""
+
+    def __init__(self):
+        self.enabled = True
+        self.headers = False
+        self.slow_ms = 100
+        self.n_plus_one_threshold = 10
+        self.log_path = None
+        self._normalized = {}     # statement text -> (fingerprint, normalized)
+        self._statements = {}     # fingerprint -> totals
+        self._n_plus_one = {}     # (route, fingerprint) -> occurrences
+        self._slow = deque(maxlen=100)
+        self._explained = {}      # fingerprint -> plan, so each shape is explained once
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = os.getenv('SQL_PROFILER', 'true').lower() == 'true'
+        production = os.getenv('FLASK_ENV', 'development').lower() == 'production'
+        self.headers = os.getenv('SQL_PROFILER_HEADERS', 'false' if production else 'true').lower() == 'true'
+        self.slow_ms = float(os.getenv('SLOW_QUERY_MS', self.slow_ms))
+        self.n_plus_one_threshold = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', self.n_plus_one_threshold))
+        self.log_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'logs', 'slow_queries.jsonl')
+        if not self.enabled:
+            return
+        with app.app_context():
+            # The main database and the audit database (audit_store.py)
+            for engine in db.engines.values():
+                if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+                    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._add_headers)
+        app.teardown_request(self._finish_request)
+
+    # Request lifecycle
+    def _start_request(self):
+        g.sql_profile = {'started': time.perf_counter(), 'route': _route(), 'queries': 0, 'seconds': 0.0, 'counts': {}}
+
+    def _add_headers(self, response):
+        profile = g.get('sql_profile')
+        if self.headers and profile is not None:
+            total_ms = (time.perf_counter() - profile['started']) * 1000
+            response.headers['X-Query-Count'] = str(profile['queries'])
+            response.headers['Server-Timing'] = (
+                f'db;dur={profile["seconds"] * 1000:.2f};desc="{profile["queries"]} queries", '
+                f'app;dur={total_ms:.2f}'
+            )
+        return response
+
+    def _finish_request(self, exc=None):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return
+        repeated = [(fingerprint, count) for fingerprint, count in profile['counts'].items()
+                    if count >= self.n_plus_one_threshold]
+        if not repeated:
+            return
+        route = profile['route']
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            for fingerprint, count in repeated:
+                entry = self._n_plus_one.setdefault((route, fingerprint), {'requests': 0, 'max_repeats': 0})
+                entry['requests'] += 1
+                entry['max_repeats'] = max(entry['max_repeats'], count)
+                entry['last_seen'] = now
+        for fingerprint, count in repeated:
+            sql = self._statements.get(fingerprint, {}).get('sql', '')
+            print(f"⚠️ Possible N+1 on {route}: {count}x {sql[:120]}")
+
+    # Statement recording
+    def _fingerprint(self, statement):
+        cached = self._normalized.get(statement)
+        if cached is None:
+            normalized = normalize(statement)
+            cached = (hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized)
+            if len(self._normalized) >= MAX_NORMALIZED_CACHE:
+                self._normalized.clear()
+            self._normalized[statement] = cached
+        return cached
+
+    def observe(self, statement, parameters, seconds, dbapi_connection=None, executemany=False):
+        """Record one executed statement; called from the cursor events and read_models"""
+        if not self.enabled:
+            return
+        fingerprint, normalized = self._fingerprint(statement)
+        profile = g.get('sql_profile') if has_request_context() else None
+        route = profile['route'] if profile is not None else 'background'
+
+        with self._lock:
+            stats = self._statements.get(fingerprint)
+            if stats is None:
+                if len(self._statements) >= MAX_FINGERPRINTS:
+                    self._trim()
+                stats = self._statements[fingerprint] = {
+                    'sql': normalized, 'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'routes': set()
+                }
+            stats['calls'] += 1
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            if len(stats['routes']) < 10:
+                stats['routes'].add(route)
+
+        if profile is not None:
+            profile['queries'] += 1
+            profile['seconds'] += seconds
+            profile['counts'][fingerprint] = profile['counts'].get(fingerprint, 0) + 1
+
+        if seconds * 1000 >= self.slow_ms:
+            plan = None
+            if dbapi_connection is not None and not executemany:
+                plan = self._explain(fingerprint, statement, parameters, dbapi_connection)
+            self._log_slow({
+                'time': datetime.utcnow().isoformat(),
+                'route': route,
+                'duration_ms': round(seconds * 1000, 2),
+                'fingerprint': fingerprint,
+                'sql': normalized,
+                'plan': plan
+            })
+
+    def _trim(self):
+        """Keep the half of the fingerprints with the most total time"""
+        ranked = sorted(self._statements.items(), key=lambda item: item[1]['total_seconds'], reverse=True)
+        self._statements = dict(ranked[:MAX_FINGERPRINTS // 2])
+
+    def _explain(self, fingerprint, statement, parameters, dbapi_connection):
+        if fingerprint in self._explained:
+            return self._explained[fingerprint]
+        if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                rows = cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters or ()).fetchall()
+            finally:
+                cursor.close()
+            plan = [row[-1] for row in rows]
+        except Exception as e:
+            plan = [f'EXPLAIN failed: {e}']
+        if len(self._explained) >= MAX_FINGERPRINTS:
+            self._explained.clear()
+        self._explained[fingerprint] = plan
+        return plan
+
+    def _log_slow(self, entry):
+        self._slow.append(entry)
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > SLOW_LOG_MAX_BYTES:
+                os.replace(self.log_path, self.log_path + '.1')
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        except Exception as e:
+            print(f"Error writing slow query log: {e}")
+
+    # Reporting
+    def report(self, limit=20):
+        """Top statements by total time, N+1 suspects and recent slow queries"""
+        with self._lock:
+            statements = sorted(self._statements.items(), key=lambda item: item[1]['total_seconds'], reverse=True)
+            top = [{
+                'fingerprint': fingerprint,
+                'sql': stats['sql'],
+                'calls': stats['calls'],
+                'total_ms': round(stats['total_seconds'] * 1000, 2),
+                'avg_ms': round(stats['total_seconds'] / stats['calls'] * 1000, 3),
+                'max_ms': round(stats['max_seconds'] * 1000, 2),
+                'routes': sorted(stats['routes'])
+            } for fingerprint, stats in statements[:limit]]
+            n_plus_one = sorted(({
+                'route': route,
+                'fingerprint': fingerprint,
+                'sql': self._statements.get(fingerprint, {}).get('sql'),
+                **entry
+            } for (route, fingerprint), entry in self._n_plus_one.items()),
+                key=lambda item: item['requests'], reverse=True)
+            return {
+                'enabled': self.enabled,
+                'slow_query_ms': self.slow_ms,
+                'n_plus_one_threshold': self.n_plus_one_threshold,
+                'statements': len(self._statements),
+                'top_by_total_time': top,
+                'n_plus_one': n_plus_one[:limit],
+                'slow_queries': list(self._slow)[-limit:][::-1]
+            }
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._n_plus_one.clear()
+            self._slow.clear()
+            self._explained.clear()
+
+def _route():
+    rule = request.url_rule
+    return f"{request.method} {rule.rule}" if rule is not None else 'unmatched'
+
+# Engine events: time each statement on the connection that ran it
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info['query_started'].pop()
+    sql_profiler.observe(statement, parameters, seconds, cursor.connection, executemany)
+
+sql_profiler = SQLProfiler()
@@ -0,0 +1,56 @@
+"""
+Stock ledger tests
+
+The app initializes its database when app.py is imported, so each start runs in its own
+process against a temporary INVENTORY_DB.
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CREATE_ITEM = """
+    import app as appmod
+    client = appmod.app.test_client()
+    login = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+    headers = {'Authorization': 'Bearer ' + login.get_json()['access_token']}
+    response = client.post('/api/inventory', headers=headers, json={
+        'name': 'Restart Test Item', 'quantity': 7, 'price_per_uom': 2.5, 'unit_of_measure': 'pcs'
+    })
+    assert response.status_code == 201, response.get_json()
+    print(response.get_json()['inventory']['id'])
+    appmod.bus.stop()
+"""
+
+CHECK_LEDGER = """
+    import app as appmod
+    from ledger import quantity_at, verify_ledger
+    from models import Inventory, StockMovement
+    with appmod.app.app_context():
+        item = Inventory.query.get({inventory_id})
+        opening = StockMovement.query.filter_by(inventory_id=item.id, reason='opening').one()
+        assert opening.created_at == item.created_at, (opening.created_at, item.created_at)
+        assert quantity_at(item.id, item.created_at) == 7
+        assert verify_ledger()['is_consistent']
+    appmod.bus.stop()
+"""
+
+def run_app(script, database):
+    env = dict(os.environ, INVENTORY_DB=database, SCHEDULER_ENABLED='false', TRAFFIC_CAPTURE='false')
+    return subprocess.run([sys.executable, '-c', textwrap.dedent(script)], cwd=SERVER_DIR, env=env,
+                          capture_output=True, text=True, timeout=300)
+
+def test_restart_after_creating_an_item(tmp_path):
+    database = str(tmp_path / 'inventory.db')
+
+    created = run_app(CREATE_ITEM, database)
+    assert created.returncode == 0, created.stderr
+    inventory_id = int(created.stdout.strip().splitlines()[-1])
+
+    # The second start runs ensure_opening_balances() over a ledger that already has the
+    # item's opening movement; the ledger is append-only, so it must not rewrite it
+    restarted = run_app(CHECK_LEDGER.replace('{inventory_id}', str(inventory_id)), database)
+    assert restarted.returncode == 0, restarted.stderr
@@ -0,0 +1,201 @@
+"""
+Sanitized request capture for replay
+
+When TRAFFIC_CAPTURE is on, a sample of requests (TRAFFIC_CAPTURE_SAMPLE) is written to
+logs/traffic.jsonl, one compact record per request: start time, method, URL rule, path,
+query and JSON body, the caller's role, status, duration and response size. Values are
+sanitized before they leave the request: numbers, booleans, short values of enumeration
+fields (status, role, unit_of_measure, ...) and numeric or date strings of id, quantity,
+price, paging and date fields are kept so the replay hits the same rows and code paths;
+other strings become "<str:N>" (their length only) and secrets "<secret>". Customer and
+contact fields (customer_*, email, phone, ...) are always redacted, numbers included.
+Records go through a queue to a writer thread, so requests never wait on disk; if the writer
+falls behind, records are dropped and counted. The file rotates at TRAFFIC_CAPTURE_MAX_MB
+into gzipped traffic.1.jsonl.gz ... traffic.N.jsonl.gz. With several worker processes, give
+each its own TRAFFIC_CAPTURE_PATH.
+
+benchmarks/replay_traffic.py re-issues the records against a running instance.
+"""
+
+from caches import get_principal
+from flask import request, g
+from flask_jwt_extended import get_jwt_identity
+from datetime import datetime
+import gzip
+import json
+import os
+import queue
+import random
+import re
+import shutil
+import threading
+import time
+
+# String values of these keys are low-cardinality and not personal; they are kept as sent
+ENUM_KEYS = {
+    'status', 'role', 'unit_of_measure', 'base_unit', 'from_unit', 'to_unit', 'sort', 'sort_by', 'order',
+    'direction', 'period', 'interval', 'action', 'table_name', 'reason', 'format', 'type', 'metric', 'routes'
+}
+# Numeric and date strings are kept only for these keys and for *_id, *_ids, *_date, *_days and *_at
+VALUE_KEYS = {
+    'id', 'ids', 'quantity', 'received_quantity', 'unit_price', 'price_per_uom', 'conversion_factor',
+    'min_stock_level', 'page', 'per_page', 'limit', 'months', 'days', 'date', 'interval_ms',
+    'duration_seconds', 'budget_seconds', 'max_samples', 'sample_rate'
+}
+VALUE_SUFFIXES = ('_id', '_ids', '_date', '_days', '_at')
+SECRET_KEYS = {'password', 'current_password', 'new_password', 'token', 'access_token', 'refresh_token', 'secret'}
+# Values of these keys, and of every customer_* key, never leave the request
+PERSONAL_KEYS = {'email', 'phone', 'address', 'contact_person', 'username'}
+MAX_ENUM_LENGTH = 40
+MAX_LIST_ITEMS = 200
+
+_NUMERIC = re.compile(r'-?\d+(\.\d+)?$')
+_DATE = re.compile(r'\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?Z?$')
+
+MAX_PENDING = 10000
+SKIPPED_PATHS = {'/metrics'}
+
+def _personal(key):
+    return key is not None and (key in PERSONAL_KEYS or key.startswith('customer_'))
+
+def _value_key(key):
+    return key is not None and (key in VALUE_KEYS or key.endswith(VALUE_SUFFIXES))
+
+def sanitize(value, key=None):
+    """Copy of a JSON value with personal and free-text strings replaced by placeholders"""
+    if isinstance(value, dict):
+        return {k: sanitize(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [sanitize(v, key) for v in value[:MAX_LIST_ITEMS]]
+    if _personal(key) and isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return f'<str:{len(str(value))}>'
+    if isinstance(value, str):
+        if key in SECRET_KEYS:
+            return '<secret>'
+        if _value_key(key) and (_NUMERIC.match(value) or _DATE.match(value)):
+            return value
+        if key in ENUM_KEYS and len(value) <= MAX_ENUM_LENGTH:
+            return value
+        return f'<str:{len(value)}>'
+    return value
+
+class TrafficCapture:
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.max_bytes = 20 * 1024 * 1024
+        self.max_files = 5
+        self.path = None
+        self.recorded = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=MAX_PENDING)
+        self._thread = None
+
+    def init_app(self, app):
+        self.enabled = os.getenv('TRAFFIC_CAPTURE', 'false').lower() == 'true'
+        self.sample_rate = float(os.getenv('TRAFFIC_CAPTURE_SAMPLE', self.sample_rate))
+        self.max_bytes = int(float(os.getenv('TRAFFIC_CAPTURE_MAX_MB', 20)) * 1024 * 1024)
+        self.max_files = int(os.getenv('TRAFFIC_CAPTURE_FILES', self.max_files))
+        self.path = os.getenv('TRAFFIC_CAPTURE_PATH', os.path.join(
+            os.path.abspath(os.path.dirname(__file__)), 'logs', 'traffic.jsonl'))
+        if not self.enabled:
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._record_request)
+        self._thread = threading.Thread(target=self._run, name='traffic-capture', daemon=True)
+        self._thread.start()
+
+    # Request hooks
+    def _start_request(self):
+        if request.path not in SKIPPED_PATHS and random.random() < self.sample_rate:
+            g.traffic_started = (time.time(), time.perf_counter())
+
+    def _record_request(self, response):
+        started = g.pop('traffic_started', None)
+        if started is None:
+            return response
+        wall, perf = started
+        rule = request.url_rule
+        body = request.get_json(silent=True) if request.is_json else None
+        record = {
+            't': round(wall, 4),
+            'm': request.method,
+            'r': rule.rule if rule is not None else None,
+            'p': request.path,
+            'q': sanitize(request.args.to_dict(flat=False)) or None,
+            'b': sanitize(body),
+            'role': _caller_role(),
+            's': response.status_code,
+            'd': round((time.perf_counter() - perf) * 1000, 3),
+            'n': response.calculate_content_length()
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        return response
+
+    # Writer thread
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, 'a')
+        try:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+                self.recorded += 1
+                if f.tell() >= self.max_bytes:
+                    f.close()
+                    self._rotate()
+                    f = open(self.path, 'a')
+                elif self._queue.empty():
+                    f.flush()
+        finally:
+            f.close()
+
+    def _rotate(self):
+        """traffic.jsonl -> traffic.1.jsonl.gz, shifting older archives and dropping the oldest"""
+        base, ext = os.path.splitext(self.path)
+        archive = lambda n: f'{base}.{n}{ext}.gz'
+        try:
+            if os.path.exists(archive(self.max_files)):
+                os.remove(archive(self.max_files))
+            for n in range(self.max_files - 1, 0, -1):
+                if os.path.exists(archive(n)):
+                    os.replace(archive(n), archive(n + 1))
+            with open(self.path, 'rb') as src, gzip.open(archive(1), 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.path)
+        except Exception as e:
+            print(f"Error rotating traffic capture: {e}")
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def status(self):
+        return {
+            'enabled': self.enabled,
+            'sample_rate': self.sample_rate,
+            'path': self.path,
+            'recorded': self.recorded,
+            'dropped': self.dropped,
+            'pending': self._queue.qsize(),
+            'file_bytes': os.path.getsize(self.path) if self.path and os.path.exists(self.path) else 0,
+            'checked_at': datetime.utcnow().isoformat()
+        }
+
+def _caller_role():
+    try:
+        identity = get_jwt_identity()
+    except Exception:
+        # No JWT was verified for this request (public routes, failed auth)
+        return None
+    principal = get_principal(int(identity)) if identity else None
+    return principal.role if principal else None
+
+traffic_capture = TrafficCapture()
@@ -0,0 +1,145 @@
+"""
+Unit of measure registry - precomputed transitive conversion table and vectorized conversion
+"""
+
+from collections import deque
+import numpy as np
+
+class UnknownConversionError(ValueError):
+    """Raised when no conversion path exists between two units"""
+
+# Direct conversions: 1 from_unit = factor to_unit. Everything else is derived transitively.
+DIRECT_CONVERSIONS = [
+    # Mass
+    ('t', 'kg', 1000),
+    ('kg', 'g', 1000),
+    ('g', 'mg', 1000),
+    ('lbs', 'kg', 0.45359237),
+    ('lb', 'lbs', 1),
+    ('oz', 'lbs', 1 / 16),
+    # Length
+    ('km', 'm', 1000),
+    ('m', 'cm', 100),
+    ('cm', 'mm', 10),
+    ('in', 'cm', 2.54),
+    ('ft', 'in', 12),
+    ('yd', 'ft', 3),
+    # Volume
+    ('l', 'ml', 1000),
+    ('gal', 'l', 3.785411784),
+    # Count
+    ('dozen', 'pcs', 12),
+    ('pair', 'pcs', 2),
+]
+
+class UOMRegistry:
+    """Holds every unit and the full conversion factor table between them"""
+
+    def __init__(self, conversions=DIRECT_CONVERSIONS):
+        graph = {}
+        for from_unit, to_unit, factor in conversions:
+            graph.setdefault(from_unit, {})[to_unit] = float(factor)
+            graph.setdefault(to_unit, {})[from_unit] = 1.0 / float(factor)
+
+        self.units = sorted(graph)
+        self.index = {unit: i for i, unit in enumerate(self.units)}
+
+        # Transitive closure: breadth-first search from every unit, multiplying factors along the path
+        self.matrix = np.full((len(self.units), len(self.units)), np.nan)
+        for source in self.units:
+            row = self.matrix[self.index[source]]
+            row[self.index[source]] = 1.0
+            queue = deque([(source, 1.0)])
+            while queue:
+                unit, factor = queue.popleft()
+                for neighbor, step in graph[unit].items():
+                    if np.isnan(row[self.index[neighbor]]):
+                        row[self.index[neighbor]] = factor * step
+                        queue.append((neighbor, factor * step))
+
+        self.factors = {
+            (a, b): float(self.matrix[i, j])
+            for a, i in self.index.items() for b, j in self.index.items()
+            if not np.isnan(self.matrix[i, j])
+        }
+
+    def is_known(self, unit):
+        return unit in self.index
+
+    def factor(self, from_unit, to_unit, custom_factor=None, custom_to=None):
+        """Return the multiplier converting from_unit to to_unit
+
+        custom_factor is an item-specific rate meaning 1 from_unit = custom_factor custom_to,
+        used when the standard table has no path (e.g. box -> pcs).
+        """
+        if from_unit == to_unit:
+            return 1.0
+        if (from_unit, to_unit) in self.factors:
+            return self.factors[(from_unit, to_unit)]
+        if custom_factor is not None and custom_to is not None:
+            if custom_to == to_unit:
+                return float(custom_factor)
+            if (custom_to, to_unit) in self.factors:
+                return float(custom_factor) * self.factors[(custom_to, to_unit)]
+        raise UnknownConversionError(f'No conversion from {from_unit} to {to_unit}')
+
+    def convert(self, quantity, from_unit, to_unit, custom_factor=None, custom_to=None):
+        """Convert a single quantity"""
+        return quantity * self.factor(from_unit, to_unit, custom_factor, custom_to)
+
+    def _indexes(self, units):
+        """Return the matrix index of every unit in an array (-1 for unknown units)"""
+        if not len(units):
+            return np.zeros(0, dtype=np.int64)
+        distinct, inverse = np.unique(units.astype(str), return_inverse=True)
+        return np.array([self.index.get(unit, -1) for unit in distinct], dtype=np.int64)[inverse]
+
+    def convert_column(self, quantities, from_units, to_units, custom_factors=None, custom_units=None, strict=True):
+        """Convert whole columns of quantities with one vectorized multiply
+
+        from_units/to_units may be a single unit or a sequence aligned with quantities. Rows
+        without a standard path fall back to custom_factors/custom_units (1 from = factor custom).
+        Unconvertible rows raise UnknownConversionError, or become NaN when strict is False.
+        """
+        quantities = np.asarray(quantities, dtype=np.float64)
+        n = len(quantities)
+        from_units = np.asarray([from_units] * n if isinstance(from_units, str) else from_units, dtype=object)
+        to_units = np.asarray([to_units] * n if isinstance(to_units, str) else to_units, dtype=object)
+
+        # Map unit names to matrix indexes once per distinct unit, then gather all factors at once
+        from_idx = self._indexes(from_units)
+        to_idx = self._indexes(to_units)
+        known = (from_idx >= 0) & (to_idx >= 0)
+        factors = np.full(n, np.nan)
+        factors[known] = self.matrix[from_idx[known], to_idx[known]]
+        factors[from_units == to_units] = 1.0
+
+        if custom_factors is not None and custom_units is not None:
+            custom_factors = np.asarray(custom_factors, dtype=np.float64)
+            custom_units = np.asarray(custom_units, dtype=object)
+            pending = np.isnan(factors)
+            if pending.any():
+                custom_idx = self._indexes(custom_units[pending])
+                target_idx = to_idx[pending]
+                via = np.full(pending.sum(), np.nan)
+                direct = custom_units[pending] == to_units[pending]
+                via[direct] = 1.0
+                path = ~direct & (custom_idx >= 0) & (target_idx >= 0)
+                via[path] = self.matrix[custom_idx[path], target_idx[path]]
+                factors[pending] = custom_factors[pending] * via
+
+        missing = np.isnan(factors)
+        if strict and missing.any():
+            pairs = sorted({(f, t) for f, t in zip(from_units[missing], to_units[missing])})
+            raise UnknownConversionError(
+                'No conversion for: ' + ', '.join(f'{f} -> {t}' for f, t in pairs[:10])
+            )
+        return quantities * factors
+
+    def to_base_units(self, quantities, units, base_units, conversion_factors):
+        """Convert item quantities to each item's base unit using the item's custom factor as fallback"""
+        return self.convert_column(quantities, units, base_units,
+                                   custom_factors=conversion_factors, custom_units=base_units, strict=False)
+
+# Loaded once per process
+registry = UOMRegistry()
@@ -0,0 +1,211 @@
+"""
+Historical inventory valuation from the stock ledger and price history
+"""
+
+from models import db, Inventory, PriceHistory, ValuationSnapshot
+from ledger import quantities_at, ledger_start
+from caches import category_name
+from versioning import mark_changed
+from sqlalchemy import text
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+import numpy as np
+
+# Latest unit price per item effective at or before :as_of
+PRICES_SQL = """
+    SELECT inventory_id, price_per_uom FROM (
+        SELECT inventory_id, price_per_uom,
+               ROW_NUMBER() OVER (PARTITION BY inventory_id ORDER BY effective_at DESC, id DESC) AS rn
+        FROM price_history
+        WHERE effective_at <= :as_of
+    ) WHERE rn = 1
+"""
+
+def record_price(inventory_id, price_per_uom, effective_at=None):
+    """Append a price history entry (caller commits)"""
+    entry = PriceHistory(
+        inventory_id=inventory_id,
+        price_per_uom=Decimal(str(price_per_uom)),
+        effective_at=effective_at or datetime.utcnow()
+    )
+    db.session.add(entry)
+    return entry
+
+def ensure_price_history():
+    """Seed price history from the current price for items that have none"""
+    result = db.session.execute(text("""
+        INSERT INTO price_history (inventory_id, price_per_uom, effective_at)
+        SELECT i.id, i.price_per_uom, COALESCE(i.created_at, :now)
+        FROM inventory i
+        WHERE NOT EXISTS (SELECT 1 FROM price_history p WHERE p.inventory_id = i.id)
+    """), {'now': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')})
+    if result.rowcount:
+        mark_changed('price_history')
+    db.session.commit()
+    return result.rowcount
+
+def period_end(year, month):
+    """Return the last date of the given month"""
+    if month == 12:
+        return date(year, 12, 31)
+    return date(year, month + 1, 1) - timedelta(days=1)
+
+def recent_period_ends(months, until=None):
+    """Return the last `months` completed month ends, oldest first"""
+    until = until or datetime.utcnow().date()
+    year, month = until.year, until.month
+    ends = []
+    while len(ends) < months:
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+        ends.append(period_end(year, month))
+    return list(reversed(ends))
+
+def compute_valuation(as_of):
+    """Value all stock by category at as_of from ledger quantities and historical prices"""
+    quantities = quantities_at(as_of)
+    prices = {row[0]: float(row[1]) for row in db.session.execute(
+        text(PRICES_SQL), {'as_of': as_of.strftime('%Y-%m-%d %H:%M:%S.%f')}
+    )}
+
+    items = db.session.query(Inventory.id, Inventory.category_id, Inventory.price_per_uom).all()
+    if not items:
+        return []
+
+    # Vectorized quantity * price, grouped by category (slot 0 holds uncategorized items)
+    category_ids = np.array([item[1] or 0 for item in items], dtype=np.int64)
+    quantity = np.array([quantities.get(item[0], 0) for item in items], dtype=np.int64)
+    price = np.array([prices.get(item[0], float(item[2] or 0)) for item in items], dtype=np.float64)
+
+    slots, inverse = np.unique(category_ids, return_inverse=True)
+    values = np.bincount(inverse, weights=quantity * price, minlength=len(slots))
+    totals = np.bincount(inverse, weights=quantity, minlength=len(slots))
+    counts = np.bincount(inverse, weights=(quantity != 0), minlength=len(slots))
+
+    return [{
+        'category_id': int(slot) or None,
+        'category': category_name(int(slot)) if slot else None,
+        'value': round(float(values[i]), 2),
+        'quantity': int(totals[i]),
+        'item_count': int(counts[i])
+    } for i, slot in enumerate(slots)]
+
+def _period_as_of(end_date):
+    return datetime.combine(end_date, datetime.max.time())
+
+def _covered(as_of, start):
+    """Whether the ledger reaches back to as_of (start is ledger_start())"""
+    return start is not None and as_of >= start
+
+def store_period_snapshot(end_date):
+    """Compute and store the valuation for one period end, replacing any previous one"""
+    breakdown = compute_valuation(_period_as_of(end_date))
+
+    ValuationSnapshot.query.filter_by(period_end=end_date).delete()
+    db.session.bulk_insert_mappings(ValuationSnapshot, [{
+        'period_end': end_date,
+        'category_id': row['category_id'],
+        'category_name': row['category'],
+        'total_value': Decimal(str(row['value'])),
+        'total_quantity': row['quantity'],
+        'item_count': row['item_count'],
+        'computed_at': datetime.utcnow()
+    } for row in breakdown])
+    return breakdown
+
+def build_period_snapshots(months=36, rebuild=False):
+    """Precompute valuation snapshots for completed month ends that do not have one yet
+
+    Month ends before the ledger's first movement are not stored: the ledger has no
+    quantities for them, so a zero valuation would be made up. A rebuild also drops such
+    snapshots stored by earlier versions.
+    """
+    ends = recent_period_ends(months)
+    start = ledger_start()
+    if rebuild:
+        stale = ValuationSnapshot.query
+        if start is not None:
+            stale = stale.filter(ValuationSnapshot.period_end < start.date())
+        stale.delete(synchronize_session=False)
+    existing = set() if rebuild else {
+        row[0] for row in db.session.query(ValuationSnapshot.period_end).filter(
+            ValuationSnapshot.period_end.in_(ends)
+        ).distinct().all()
+    }
+
+    built = []
+    unavailable = []
+    for end_date in ends:
+        if not _covered(_period_as_of(end_date), start):
+            unavailable.append(end_date.isoformat())
+        elif end_date not in existing:
+            store_period_snapshot(end_date)
+            built.append(end_date.isoformat())
+
+    db.session.commit()
+    return {'periods_built': built, 'periods_unavailable': unavailable, 'periods_checked': len(ends)}
+
+def _category_order(row):
+    """Uncategorized first, then by name, whichever path produced the rows"""
+    return (row['category'] is not None, row['category'] or '')
+
+def _summarize(period, rows):
+    return {
+        'period_end': period.isoformat() if isinstance(period, date) else period,
+        'available': True,
+        'total_value': round(sum(row['value'] for row in rows), 2),
+        'categories': sorted(rows, key=_category_order)
+    }
+
+def _unavailable(period):
+    """A period the ledger does not reach back to; its value is unknown, not zero"""
+    return {
+        'period_end': period.isoformat() if isinstance(period, date) else period,
+        'available': False,
+        'total_value': None,
+        'categories': None
+    }
+
+def get_valuation_series(months=36):
+    """Return month-end valuations from the snapshot table
+
+    Read-only: periods the scheduled job has not stored yet are computed for this response
+    only, and periods before the ledger's first movement are reported as unavailable.
+    """
+    ends = recent_period_ends(months)
+    start = ledger_start()
+    snapshots = ValuationSnapshot.query.filter(
+        ValuationSnapshot.period_end.in_(ends)
+    ).order_by(ValuationSnapshot.period_end, ValuationSnapshot.category_name).all()
+
+    by_period = {}
+    for snapshot in snapshots:
+        by_period.setdefault(snapshot.period_end, []).append(snapshot.to_dict())
+
+    series = []
+    for end_date in ends:
+        as_of = _period_as_of(end_date)
+        if not _covered(as_of, start):
+            series.append(_unavailable(end_date))
+        elif end_date in by_period:
+            series.append(_summarize(end_date, by_period[end_date]))
+        else:
+            series.append(_summarize(end_date, compute_valuation(as_of)))
+    return series
+
+def get_valuation_at(as_of):
+    """Return the valuation at as_of, served from a snapshot when as_of is a stored period end"""
+    if not _covered(as_of, ledger_start()):
+        return _unavailable(as_of.isoformat())
+    if as_of.time() in (datetime.min.time(), datetime.max.time()):
+        snapshots = ValuationSnapshot.query.filter_by(period_end=as_of.date()).all()
+        if snapshots:
+            return _summarize(as_of.date(), [s.to_dict() for s in snapshots])
+        as_of = datetime.combine(as_of.date(), datetime.max.time())
+
+    return _summarize(as_of.isoformat(), compute_valuation(as_of))
+
+def scheduled_valuation_snapshots():
+    """Scheduler entry point - fill in any missing month-end snapshots"""
+    return build_period_snapshots()
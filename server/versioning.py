@@ -0,0 +1,259 @@
+"""
+Per-table version stamps, conditional GET and a response cache for read endpoints
+
+Every flush bumps resource_versions for the tables it wrote, inside the same transaction.
+Committed versions are mirrored in memory (local commits directly, other workers' through
+the invalidation bus), so a cached endpoint can compute its ETag, answer 304 Not Modified,
+or serve a cached body without touching the database.
+"""
+
+from models import db, ResourceVersion
+from invalidation import bus
+from caches import get_principal
+from flask import request, current_app
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, text
+from sqlalchemy.sql import operators
+from werkzeug.http import is_resource_modified
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+import hashlib
+import os
+import threading
+
+BUMP_SQL = """
+    INSERT INTO resource_versions (resource, version, updated_at) VALUES (:resource, 1, :now)
+    ON CONFLICT(resource) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at
+"""
+
+# Committed versions: {table: (version, updated_at)}
+_versions = {}
+_versions_lock = threading.Lock()
+
+def _parse_timestamp(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+def _apply(versions, rows=None):
+    """Merge committed versions into the in-memory copy, never moving a table backwards"""
+    with _versions_lock:
+        for table, (version, updated_at) in versions.items():
+            if table not in _versions or _versions[table][0] < version:
+                _versions[table] = (version, updated_at)
+
+def bump_versions(connection, tables):
+    """Bump the given tables inside the caller's transaction; returns their new versions"""
+    tables = sorted(set(tables) - {ResourceVersion.__tablename__})
+    if not tables:
+        return {}
+    now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    connection.execute(text(BUMP_SQL), [{'resource': table, 'now': now} for table in tables])
+    rows = connection.execute(
+        text('SELECT resource, version, updated_at FROM resource_versions WHERE resource IN :tables')
+        .bindparams(db.bindparam('tables', expanding=True)), {'tables': tables}
+    )
+    return {row[0]: (row[1], _parse_timestamp(row[2])) for row in rows}
+
+def bump_connection(conn, tables, now=None):
+    """bump_versions for a raw sqlite3 connection (importer, archiver, generator) in its open transaction"""
+    now = now or datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    conn.executemany(BUMP_SQL, [{'resource': table, 'now': now} for table in sorted(set(tables))])
+
+def _mark_rows(session, table, ids=None):
+    """Remember which rows of a table changed; None means unknown (treated as any row)"""
+    changed = session.info.setdefault('changed_rows', {})
+    if ids is None or changed.get(table, set()) is None:
+        changed[table] = None
+    else:
+        changed.setdefault(table, set()).update(ids)
+
+def mark_changed(*tables):
+    """Bump tables written through the session outside the ORM (text(), its DBAPI cursor)
+
+    Call it before the commit, in the transaction that did the write.
+    """
+    session = db.session()
+    session.info.setdefault('pending_versions', {}).update(bump_versions(session.connection(), tables))
+    for table in tables:
+        _mark_rows(session, table)
+
+def load_versions():
+    """Read every stored version into memory"""
+    bus.publish({row.resource: (row.version, row.updated_at) for row in ResourceVersion.query.all()})
+
+def table_versions(tables):
+    """Committed versions of the given tables, from memory"""
+    with _versions_lock:
+        return tuple(_versions.get(table, (0, None))[0] for table in tables)
+
+def last_modified(tables):
+    with _versions_lock:
+        stamps = [_versions[table][1] for table in tables if table in _versions and _versions[table][1]]
+    return max(stamps).replace(microsecond=0) if stamps else None
+
+# Child rows that are rendered as part of their parent: (parent table, foreign key attribute)
+CHILD_TABLES = {
+    'inventory_vendors': ('inventory', 'inventory_id'),
+    'order_items': ('orders', 'order_id'),
+    'purchase_order_items': ('purchase_orders', 'purchase_order_id')
+}
+
+# Session events: bump in the write transaction, publish on commit, discard on rollback
+def _after_flush(session, flush_context):
+    changed = [obj for obj in list(session.new) + list(session.deleted)]
+    changed += [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    tables = set()
+    for obj in changed:
+        table = obj.__table__.name
+        tables.add(table)
+        _mark_rows(session, table, [getattr(obj, 'id', None)])
+        if table in CHILD_TABLES:
+            # The parent renders its children, so it changes with them
+            parent, foreign_key = CHILD_TABLES[table]
+            tables.add(parent)
+            _mark_rows(session, parent, [getattr(obj, foreign_key, None)])
+    if tables:
+        session.info.setdefault('pending_versions', {}).update(bump_versions(session.connection(), tables))
+
+def _where_equals(statement, column_name):
+    """Return [value] when the statement filters on `column_name == value`, alone or as one
+    term of an AND (conditional updates such as `id == x AND quantity >= y`), else None"""
+    where = getattr(statement, 'whereclause', None)
+    if where is None:
+        return None
+    terms = where.clauses if getattr(where, 'operator', None) is operators.and_ else [where]
+    for term in terms:
+        if getattr(term, 'operator', None) is not operators.eq:
+            continue
+        if getattr(term.left, 'name', None) == column_name and hasattr(term.right, 'value'):
+            return [term.right.value]
+    return None
+
+def _do_orm_execute(state):
+    # Query.update()/delete() and bulk statements do not go through a flush
+    if state.is_update or state.is_delete or state.is_insert:
+        table = getattr(state.statement, 'table', None)
+        if table is not None:
+            tables = [table.name]
+            _mark_rows(state.session, table.name, _where_equals(state.statement, 'id'))
+            if table.name in CHILD_TABLES:
+                parent, foreign_key = CHILD_TABLES[table.name]
+                tables.append(parent)
+                _mark_rows(state.session, parent, _where_equals(state.statement, foreign_key))
+            state.session.info.setdefault('pending_versions', {}).update(
+                bump_versions(state.session.connection(), tables)
+            )
+
+def _after_commit(session):
+    pending = session.info.pop('pending_versions', None)
+    rows = session.info.pop('changed_rows', None)
+    if pending:
+        # Tables bumped without row information count as fully changed
+        rows = {table: (rows or {}).get(table) for table in pending}
+        bus.publish(pending, rows=rows)
+
+def _after_rollback(session):
+    session.info.pop('pending_versions', None)
+    session.info.pop('changed_rows', None)
+
+def init_versioning(app):
+    """Install the session hooks and load the stored versions"""
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        bus.subscribe(None, _apply)
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'do_orm_execute', _do_orm_execute)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
+    with app.app_context():
+        load_versions()
+
+class ResponseCache:
+    """Bounded LRU of encoded response bodies keyed by resource, table versions and query"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0
+            }
+
+response_cache = ResponseCache(int(os.getenv('RESPONSE_CACHE_SIZE', 256)))
+
+def cached_resource(resource, tables, roles=None):
+    """Serve a GET endpoint with version ETags, 304 handling and the response cache
+
+    The body depends only on `tables` and the query string. When `roles` is given the
+    role check runs before the cache so cached bodies are never served to other roles.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if roles:
+                principal = get_principal(int(get_jwt_identity()))
+                if not principal or principal.role not in roles:
+                    return view(*args, **kwargs)
+
+            bus.ensure_fresh()
+            key = (resource, table_versions(tables), tuple(sorted(request.args.items(multi=True))))
+            etag = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+            modified = last_modified(tables)
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+                response_cache.not_modified += 1
+                response = current_app.response_class(status=304)
+            else:
+                entry = response_cache.get(key)
+                if entry is None:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    response_cache.put(key, (response.get_data(), response.mimetype))
+                else:
+                    response = current_app.response_class(entry[0], mimetype=entry[1])
+
+            response.set_etag(etag)
+            if modified:
+                response.last_modified = modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator